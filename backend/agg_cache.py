@@ -0,0 +1,123 @@
+"""In-process cache of the aggregated frames behind /visualize and /nlviz figures.
+
+viz_engine.build_figure groups the whole dataset for every bar, pie,
+heatmap, funnel and time-series request, although dashboards ask for the
+same few charts again and again. The grouped frame (what the figure plots)
+is kept here, so a repeated chart only costs building and encoding the
+Plotly figure.
+
+Entries are keyed by:
+- the dataset fingerprint (path, mtime, size) from dataset_registry, so a
+  rewritten file misses;
+- `config_key`, a hash of the config fields that shape the aggregation
+  (preset, columns, agg, time_grain, top_n) plus any row filter applied
+  before building. Titles and point budgets only change the figure and
+  share an entry.
+
+The cache is an LRU bounded by the frames' total in-memory size, like the
+dataset registry. Cached frames are shared between requests and must be
+treated as read-only.
+
+Config (env):
+- AGG_CACHE_MAX_BYTES: total size of cached aggregated frames (default 256 MB)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+import pandas as pd
+
+from dataset_registry import _frame_nbytes
+
+AGG_CACHE_MAX_BYTES = int(os.getenv('AGG_CACHE_MAX_BYTES', str(256 * 1024 * 1024)))
+
+# Config fields that change the aggregated frame; anything else is presentation
+AGG_FIELDS = ('preset', 'x', 'y', 'category', 'value', 'stage', 'agg', 'time_grain', 'top_n')
+
+
+def config_key(cfg: Dict[str, Any], filters: Any = None) -> str:
+    """Canonical hash of the aggregation a figure config asks for, after `filters` (any JSON-able value)."""
+    fields = {name: cfg.get(name) for name in AGG_FIELDS if cfg.get(name) is not None}
+    text = json.dumps({'config': fields, 'filters': filters}, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class AggregationCache:
+    """LRU of aggregated frames bounded by their total in-memory size."""
+
+    def __init__(self, max_bytes: int = AGG_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Tuple[Hashable, str], Tuple[pd.DataFrame, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(
+        self, fingerprint: Tuple[str, int, int], cfg: Dict[str, Any],
+        compute: Callable[[], pd.DataFrame], filters: Any = None,
+    ) -> pd.DataFrame:
+        """The aggregated frame for `cfg` on this dataset version, from `compute()` on a miss."""
+        key = (tuple(fingerprint), config_key(cfg, filters))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Aggregate outside the lock so other charts stay servable meanwhile
+        frame = compute()
+        nbytes = _frame_nbytes(frame)
+        with self._lock:
+            if nbytes > self.max_bytes:
+                return frame
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.total_bytes -= old[1]
+            self._entries[key] = (frame, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+        return frame
+
+    def invalidate(self, path: Path) -> bool:
+        """Forget the aggregations of every version of the dataset at `path`. Returns True if anything was dropped."""
+        resolved = str(Path(path).resolve())
+        with self._lock:
+            stale = [k for k in self._entries if k[0][0] == resolved]
+            for k in stale:
+                _, nbytes = self._entries.pop(k)
+                self.total_bytes -= nbytes
+            return bool(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Global cache instance
+agg_cache = AggregationCache()
@@ -9,7 +9,9 @@ from typing import Dict, List, Any, Tuple
 from datetime import datetime
 from pathlib import Path
 import json
-from scipy import stats
+
+from column_profile import get_profile
+from row_fingerprint import duplicate_report, get_row_hashes
 
 ALERTS_DIR = Path(__file__).resolve().parent / 'anomaly_alerts'
 ALERTS_DIR.mkdir(exist_ok=True)
@@ -17,11 +19,12 @@ ALERTS_DIR.mkdir(exist_ok=True)
 class AnomalyDetector:
     """Detects statistical anomalies in datasets using multiple methods"""
     
-    def __init__(self, sensitivity: str = 'medium'):
+    def __init__(self, sensitivity: str = 'medium', key_columns: List[str] | None = None):
         """
         Initialize anomaly detector
         Args:
             sensitivity: 'low', 'medium', 'high' - affects detection thresholds
+            key_columns: rows sharing these columns count as duplicates (default: whole rows)
         """
         self.thresholds = {
             'low': {'z_score': 3.5, 'iqr_multiplier': 3.0},
@@ -30,6 +33,7 @@ class AnomalyDetector:
         }
         self.sensitivity = sensitivity
         self.config = self.thresholds[sensitivity]
+        self.key_columns = key_columns
     
     def detect_statistical_anomalies(self, df: pd.DataFrame) -> List[Dict[str, Any]]:
         """
@@ -38,19 +42,26 @@ class AnomalyDetector:
         """
         anomalies = []
         numeric_cols = df.select_dtypes(include=[np.number]).columns
+        profile = get_profile(df)
         
         for col in numeric_cols:
-            data = df[col].dropna()
-            if len(data) < 10:  # Need sufficient data
+            p = profile[col]
+            if p['count'] < 10:  # Need sufficient data
                 continue
+            data = df[col].dropna()
             
-            # Z-score method
-            z_scores = np.abs(stats.zscore(data))
+            # Z-score method (population std, as scipy.stats.zscore)
+            pop_std = np.sqrt(p['m2'] / p['count'])
+            if pop_std == 0 or not np.isfinite(pop_std):
+                continue
+            z_scores = np.abs(data.to_numpy(dtype='float64') - p['mean']) / pop_std
             z_anomalies = np.where(z_scores > self.config['z_score'])[0]
+            if not len(z_anomalies):
+                continue
             
             # IQR method
-            Q1 = data.quantile(0.25)
-            Q3 = data.quantile(0.75)
+            Q1 = p['quantiles'][0.25]
+            Q3 = p['quantiles'][0.75]
             IQR = Q3 - Q1
             lower_bound = Q1 - self.config['iqr_multiplier'] * IQR
             upper_bound = Q3 + self.config['iqr_multiplier'] * IQR
@@ -68,8 +79,8 @@ class AnomalyDetector:
                     'indices': list(high_confidence)[:10],  # Limit to first 10
                     'values': [float(data.iloc[i]) for i in list(high_confidence)[:10]],
                     'normal_range': f"[{float(lower_bound):.2f}, {float(upper_bound):.2f}]",
-                    'mean': float(data.mean()),
-                    'std': float(data.std()),
+                    'mean': p['mean'],
+                    'std': p['std'],
                     'detected_at': datetime.now().isoformat()
                 })
         
@@ -116,8 +127,9 @@ class AnomalyDetector:
         """
         anomalies = []
         
+        profile = get_profile(df)
         for col in df.columns:
-            missing_pct = (df[col].isna().sum() / len(df)) * 100
+            missing_pct = (profile[col]['nulls'] / len(df)) * 100 if len(df) else 0.0
             
             # Flag columns with high missing rate
             if missing_pct > 30:
@@ -126,7 +138,7 @@ class AnomalyDetector:
                     'type': 'high_missing_data',
                     'severity': 'medium' if missing_pct < 50 else 'high',
                     'missing_percentage': float(missing_pct),
-                    'missing_count': int(df[col].isna().sum()),
+                    'missing_count': profile[col]['nulls'],
                     'total_rows': len(df),
                     'detected_at': datetime.now().isoformat()
                 })
@@ -139,14 +151,17 @@ class AnomalyDetector:
         """
         anomalies = []
         
-        # Check for exact duplicate rows
-        dup_count = df.duplicated().sum()
+        # Check for exact duplicate rows, from the frame's cached row fingerprints
+        report = duplicate_report(get_row_hashes(df, self.key_columns))
+        dup_count = report['duplicate_rows']
         if dup_count > 0:
             dup_pct = (dup_count / len(df)) * 100
             anomalies.append({
                 'type': 'duplicate_rows',
                 'severity': 'low' if dup_pct < 5 else 'medium',
                 'duplicate_count': int(dup_count),
+                'duplicate_groups': report['duplicate_groups'],
+                'key_columns': self.key_columns,
                 'duplicate_percentage': float(dup_pct),
                 'total_rows': len(df),
                 'detected_at': datetime.now().isoformat()
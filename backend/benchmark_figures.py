@@ -0,0 +1,73 @@
+"""Benchmark figure serialisation from a Plotly figure to response bytes.
+
+Compares the previous path (pio.to_json -> json.loads -> FastAPI's
+jsonable_encoder -> JSONResponse) against figure_json.figure_payload ->
+FastJSONResponse, on scatter and line figures of synthetic points. The
+figures are built without downsampling, so every point is serialised.
+
+Usage: python benchmark_figures.py [--points 100000,1000000] [--repeat 3]
+"""
+from __future__ import annotations
+import argparse
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from figure_json import FastJSONResponse, figure_payload, orjson
+
+
+def _figures(points: int):
+    rng = np.random.default_rng(42)
+    df = pd.DataFrame({
+        'when': pd.date_range('2020-01-01', periods=points, freq='min'),
+        'x': rng.normal(0, 1, points),
+        'y': rng.normal(0, 1, points),
+        'group': rng.choice(['North', 'South', 'East'], points),
+    })
+    return {
+        'scatter': px.scatter(df, x='x', y='y', color='group'),
+        'line': px.line(df, x='when', y='y'),
+    }
+
+
+def _old(fig) -> bytes:
+    return JSONResponse(jsonable_encoder({'figure': json.loads(pio.to_json(fig))})).body
+
+
+def _new(fig) -> bytes:
+    return FastJSONResponse({'figure': figure_payload(fig)}).body
+
+
+def _best(fn, fig, repeat: int) -> tuple[float, bytes]:
+    times, body = [], b''
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn(fig)
+        times.append(time.perf_counter() - start)
+    return min(times) * 1000, body
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--points', default='100000,1000000', help='comma-separated point counts')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per measurement (best is reported)')
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'json'}")
+    print(f"{'points':>10} {'figure':>8} {'old KB':>9} {'new KB':>9} {'old ms':>8} {'new ms':>8} {'speedup':>8}")
+    for points in [int(p) for p in args.points.split(',') if p]:
+        for name, fig in _figures(points).items():
+            old_ms, old_body = _best(_old, fig, args.repeat)
+            new_ms, new_body = _best(_new, fig, args.repeat)
+            print(f"{points:>10,} {name:>8} {len(old_body) / 1024:>9.0f} {len(new_body) / 1024:>9.0f} "
+                  f"{old_ms:>8.0f} {new_ms:>8.0f} {old_ms / new_ms:>7.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Benchmark CSV ingest engines on synthetic sales files.
+
+Compares the previous ingest path (pandas C parser with full inference)
+against ingest.read_csv_fast (sniffed dtypes + pyarrow multi-threaded parser).
+
+Usage: python benchmark_ingest.py [--rows 1000000,10000000] [--keep]
+"""
+from __future__ import annotations
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from ingest import read_csv_fast
+
+
+def _write_synthetic(path: Path, rows: int, chunk: int = 1_000_000) -> None:
+    rng = np.random.default_rng(42)
+    regions = np.array(['North', 'South', 'East', 'West', 'Central'])
+    products = np.array([f"SKU-{i:04d}" for i in range(500)])
+    start = np.datetime64('2020-01-01')
+    written = 0
+    while written < rows:
+        n = min(chunk, rows - written)
+        part = pd.DataFrame({
+            'Order Date': (start + rng.integers(0, 1500, n).astype('timedelta64[D]')).astype(str),
+            'Region': regions[rng.integers(0, len(regions), n)],
+            'Product': products[rng.integers(0, len(products), n)],
+            'Units': rng.integers(1, 50, n),
+            'Unit Price': rng.normal(25, 8, n).round(2),
+            'Discount': rng.random(n).round(3),
+        })
+        part.to_csv(path, mode='a' if written else 'w', header=not written, index=False)
+        written += n
+
+
+def _time(fn) -> tuple[float, pd.DataFrame]:
+    start = time.perf_counter()
+    df = fn()
+    return time.perf_counter() - start, df
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', default='1000000,10000000', help='comma-separated row counts')
+    parser.add_argument('--keep', action='store_true', help='keep the generated files')
+    args = parser.parse_args()
+
+    tmp_dir = Path(tempfile.mkdtemp(prefix='ingest_bench_'))
+    print(f"{'rows':>12} {'size MB':>9} {'c engine s':>11} {'fast s':>8} {'engine':>8} {'speedup':>8}")
+    for rows in [int(r) for r in args.rows.split(',') if r]:
+        path = tmp_dir / f"synthetic_{rows}.csv"
+        _write_synthetic(path, rows)
+        size_mb = path.stat().st_size / (1024 * 1024)
+
+        c_secs, c_df = _time(lambda: pd.read_csv(path))
+        fast_secs, (fast_df, info) = _time(lambda: read_csv_fast(path))
+        assert c_df.shape == fast_df.shape
+        assert list(c_df.dtypes) == list(fast_df.dtypes)
+        print(f"{rows:>12,} {size_mb:>9.1f} {c_secs:>11.2f} {fast_secs:>8.2f} {info['engine']:>8} {c_secs / fast_secs:>7.1f}x")
+        if not args.keep:
+            path.unlink()
+
+
+if __name__ == '__main__':
+    main()
@@ -39,7 +39,9 @@ def answer_question(df: pd.DataFrame, question: str, stats: dict, cleaning_summa
     # Add statistics
     if stats:
         context_parts.append("\nKey Statistics:")
-        for col_name, col_stats in list(stats.items())[:5]:  # Limit to first 5 columns
+        # Up to 5 columns from each section (numeric, categorical, datetime)
+        columns = [item for section in stats.values() if isinstance(section, dict) for item in list(section.items())[:5]]
+        for col_name, col_stats in columns:
             if isinstance(col_stats, dict):
                 try:
                     if 'mean' in col_stats:
@@ -52,6 +54,9 @@ def answer_question(df: pd.DataFrame, question: str, stats: dict, cleaning_summa
                     elif 'top' in col_stats:
                         context_parts.append(f"- {col_name}: most common value is '{col_stats.get('top')}' "
                                            f"({col_stats.get('freq', 0)} times)")
+                    elif 'span_days' in col_stats:
+                        context_parts.append(f"- {col_name}: dates from {col_stats.get('min')} "
+                                           f"to {col_stats.get('max')} ({col_stats['span_days']:.0f} days)")
                 except (TypeError, ValueError) as e:
                     print(f"Warning: Could not format stats for {col_name}: {e}")
                     continue
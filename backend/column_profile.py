@@ -0,0 +1,265 @@
+"""Single-pass column profiles shared by the cleaner, EDA and anomaly detector.
+
+`profile_columns` summarises every column of a frame at once:
+- all columns: kind, count, nulls, distinct
+- numeric: sum, mean, m2 (sum of squared deviations), std (ddof=1), min,
+  max and quantiles, computed block-wise over a float64 matrix instead of
+  one pandas reduction per column and statistic
+- text: most frequent value (`top`) and its count (`freq`), the TOP_VALUES
+  most frequent [value, count] pairs (`top_values`) and the string length
+  of the values (`length`: min / mean / max); `distinct` is exact
+- datetime: min / max
+
+Numeric `distinct` is exact up to DISTINCT_SKETCH_SIZE values and a KMV
+(k minimum hash values) estimate above that, within a few percent.
+
+`get_profile(df)` caches the profile for as long as the frame object
+lives, so the EDA stats, the chart helpers and AnomalyDetector share one
+pass per frame (e.g. per dataset held by the registry).
+
+Config (env):
+- PROFILE_BLOCK_CELLS: numeric cells converted to float64 at a time (default 4M)
+"""
+from __future__ import annotations
+import os
+import threading
+import weakref
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+PROFILE_BLOCK_CELLS = int(os.getenv('PROFILE_BLOCK_CELLS', str(4_000_000)))
+DISTINCT_SKETCH_SIZE = 4096
+DEFAULT_QUANTILES = (0.25, 0.5, 0.75)
+TOP_VALUES = 5
+
+# id(frame) -> {'key', 'columns'}; entries are removed when the frame is collected
+_profiles: Dict[int, Dict[str, Any]] = {}
+_profiles_lock = threading.Lock()
+
+
+def column_kind(s: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(s):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(s):
+        return 'number'
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return 'datetime'
+    return 'text'
+
+
+def _distinct(values: np.ndarray) -> int:
+    """Exact distinct count of `values`, or a KMV estimate for large inputs."""
+    hashes = pd.util.hash_array(values)
+    k = DISTINCT_SKETCH_SIZE
+    if len(hashes) <= k:
+        return int(len(np.unique(hashes)))
+    # The k smallest distinct hashes sit among the smallest 4k values unless
+    # the column is dominated by a few repeated values
+    smallest = np.unique(np.partition(hashes, 4 * k)[:4 * k + 1]) if len(hashes) > 4 * k + 1 else np.unique(hashes)
+    if len(smallest) < k:
+        smallest = np.unique(hashes)
+        if len(smallest) <= k:
+            return int(len(smallest))
+    kth = float(smallest[k - 1]) / 2.0 ** 64
+    return min(int(round((k - 1) / kth)), len(values))
+
+
+def numeric_quantiles(x: np.ndarray, counts: np.ndarray, quantiles: Sequence[float]) -> np.ndarray:
+    """Quantiles of each row of the float64 matrix `x`, skipping NaN.
+
+    Rows sharing a non-null count are handled by one vectorised call; the
+    values match Series.quantile (linear interpolation). Returns an array of
+    shape (len(quantiles), n_rows), NaN for empty rows.
+    """
+    out = np.full((len(quantiles), x.shape[0]), np.nan)
+    if not len(quantiles):
+        return out
+    n = x.shape[1]
+    for c in np.unique(counts):
+        if c == 0:
+            continue
+        idx = np.flatnonzero(counts == c)
+        block = x[idx]
+        if c < n:
+            # NaN sorts last, so partitioning at c - 1 moves the c values to the front
+            block = np.partition(block, c - 1, axis=1)[:, :c]
+        out[:, idx] = np.quantile(block, quantiles, axis=1).reshape(len(quantiles), -1)
+    return out
+
+
+def _numeric_blocks(df: pd.DataFrame, cols: List[str]):
+    """Yield (columns, float64 matrix with one contiguous row per column) in bounded blocks."""
+    step = max(1, PROFILE_BLOCK_CELLS // max(len(df), 1))
+    for start in range(0, len(cols), step):
+        block_cols = cols[start:start + step]
+        # Frames store same-dtype columns as one (columns, rows) block, so the
+        # transpose is usually a view rather than a copy
+        yield block_cols, np.ascontiguousarray(df[block_cols].to_numpy(dtype='float64', na_value=np.nan).T)
+
+
+def column_quantiles(df: pd.DataFrame, cols: List[str], quantiles: Sequence[float]) -> Dict[str, List[float]]:
+    """Quantiles of the numeric `cols` of `df`, for columns with any values."""
+    out: Dict[str, List[float]] = {}
+    for block_cols, x in _numeric_blocks(df, cols):
+        counts = (~np.isnan(x)).sum(axis=1)
+        qs = numeric_quantiles(x, counts, quantiles)
+        out.update({col: [float(v) for v in qs[:, j]] for j, col in enumerate(block_cols) if counts[j]})
+    return out
+
+
+def count_outside(df: pd.DataFrame, bounds: Dict[str, Tuple[float, float]]) -> Dict[str, Tuple[int, int]]:
+    """Per column, the number of values below and above its (lower, upper) bounds."""
+    cols = list(bounds)
+    out: Dict[str, Tuple[int, int]] = {}
+    for block_cols, x in _numeric_blocks(df, cols):
+        lower = np.array([bounds[c][0] for c in block_cols])[:, None]
+        upper = np.array([bounds[c][1] for c in block_cols])[:, None]
+        below, above = (x < lower).sum(axis=1), (x > upper).sum(axis=1)
+        out.update({col: (int(below[j]), int(above[j])) for j, col in enumerate(block_cols)})
+    return out
+
+
+def _numeric_profiles(
+    df: pd.DataFrame, cols: List[str], quantiles: Sequence[float], value_stats: bool,
+) -> Dict[str, Dict[str, Any]]:
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for block_cols, x in _numeric_blocks(df, cols):
+        valid = ~np.isnan(x)
+        counts = valid.sum(axis=1)
+        # Row-wise sums over contiguous rows add in the same order as Series.sum
+        sums = np.where(valid, x, 0.0).sum(axis=1)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            means = sums / counts
+            dev = np.where(valid, means[:, None] - x, 0.0)
+            m2 = (dev * dev).sum(axis=1)
+            std = np.sqrt(m2 / (counts - 1))
+        mins = np.where(valid, x, np.inf).min(axis=1)
+        maxs = np.where(valid, x, -np.inf).max(axis=1)
+        qs = numeric_quantiles(x, counts, quantiles)
+        for j, col in enumerate(block_cols):
+            count = int(counts[j])
+            profile: Dict[str, Any] = {
+                'kind': 'number',
+                'count': count,
+                'nulls': x.shape[1] - count,
+            }
+            if value_stats:
+                profile['distinct'] = _distinct(x[j][valid[j]]) if count else 0
+            if count:
+                profile.update({
+                    'sum': float(sums[j]),
+                    'mean': float(means[j]),
+                    'm2': float(m2[j]),
+                    'std': float(std[j]) if count > 1 else 0.0,
+                    'min': float(mins[j]),
+                    'max': float(maxs[j]),
+                    'quantiles': {float(q): float(qs[i, j]) for i, q in enumerate(quantiles)},
+                })
+            profiles[col] = profile
+    return profiles
+
+
+def _top_value(counts: pd.Series, categories: pd.Index | None = None) -> Any:
+    """Most frequent value, ties broken the way Series.mode orders them."""
+    tied = counts.index[counts.to_numpy() == counts.iloc[0]]
+    if categories is not None:
+        return categories[categories.get_indexer(tied).min()]
+    try:
+        return sorted(tied)[0]
+    except TypeError:
+        return tied[0]
+
+
+def _text_profile(s: pd.Series, with_top: bool) -> Dict[str, Any]:
+    if not with_top:
+        nulls = int(s.isna().sum())
+        return {'kind': 'text', 'count': len(s) - nulls, 'nulls': nulls}
+    # The value counts double as the null count, sparing a separate isna pass
+    counts = s.value_counts(dropna=True, sort=True)
+    counts = counts[counts.to_numpy() > 0]  # unused categories
+    categories = s.cat.categories if isinstance(s.dtype, pd.CategoricalDtype) else None
+    return text_profile(counts, len(s) - int(counts.sum()), categories)
+
+
+def text_profile(counts: pd.Series, nulls: int, categories: pd.Index | None = None) -> Dict[str, Any]:
+    """The text profile of a column from its non-null value counts (sorted by count, descending).
+
+    Lets running counts (dataset_append) be profiled without the column itself.
+    """
+    count = int(counts.sum())
+    profile: Dict[str, Any] = {'kind': 'text', 'count': count, 'nulls': nulls, 'distinct': int(len(counts))}
+    if len(counts):
+        top = _top_value(counts, categories)
+        profile['top'] = top.item() if isinstance(top, np.generic) else top
+        profile['freq'] = int(counts.iloc[0])
+        # The mode leads; the rest follow value_counts' order
+        others = counts.drop(top).head(TOP_VALUES - 1)
+        profile['top_values'] = [[profile['top'], profile['freq']]] + [
+            [v.item() if isinstance(v, np.generic) else v, int(n)] for v, n in others.items()
+        ]
+        # Lengths of the distinct values, weighted by their counts
+        lengths = np.fromiter((len(v) if isinstance(v, str) else len(str(v)) for v in counts.index), dtype='int64', count=len(counts))
+        profile['length'] = {
+            'min': int(lengths.min()),
+            'mean': float(lengths @ counts.to_numpy() / count),
+            'max': int(lengths.max()),
+        }
+    return profile
+
+
+def profile_columns(
+    df: pd.DataFrame,
+    quantiles: Sequence[float] = DEFAULT_QUANTILES,
+    *,
+    value_stats: bool = True,
+) -> Dict[str, Dict[str, Any]]:
+    """Profile every column of `df`; see the module docstring for the fields.
+
+    `value_stats=False` skips `distinct` and the value counts of text
+    columns (top, freq), the expensive part when only nulls and moments
+    are needed.
+    """
+    numeric = [c for c in df.columns if column_kind(df[c]) == 'number']
+    numeric_profiles = _numeric_profiles(df, numeric, quantiles, value_stats) if numeric else {}
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for col in df.columns:
+        if col in numeric_profiles:
+            profiles[col] = numeric_profiles[col]
+            continue
+        s = df[col]
+        kind = column_kind(s)
+        if kind == 'text':
+            profiles[col] = _text_profile(s, value_stats)
+            continue
+        nulls = int(s.isna().sum())
+        profile = {'kind': kind, 'count': len(s) - nulls, 'nulls': nulls}
+        if kind == 'datetime' and profile['count']:
+            profile.update({'min': s.min(), 'max': s.max()})
+        if value_stats:
+            profile['distinct'] = int(s.nunique())
+        profiles[col] = profile
+    return profiles
+
+
+def get_profile(df: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+    """`profile_columns(df)`, cached per frame object.
+
+    The entry is checked against the frame's shape and dtypes and dropped
+    when the frame is garbage-collected; callers that modify `df` in place
+    should `clear_profile` it.
+    """
+    key = (df.shape, tuple(str(t) for t in df.dtypes))
+    entry = _profiles.get(id(df))
+    if entry is None or entry['key'] != key:
+        entry = {'key': key, 'columns': profile_columns(df)}
+        with _profiles_lock:
+            if id(df) not in _profiles:
+                weakref.finalize(df, _profiles.pop, id(df), None)
+            _profiles[id(df)] = entry
+    return entry['columns']
+
+
+def clear_profile(df: pd.DataFrame) -> None:
+    _profiles.pop(id(df), None)
@@ -0,0 +1,183 @@
+"""Process pool for per-column work on large frames.
+
+`map_column_groups(df, fn, *args)` splits the columns of `df` into one
+group per worker and returns `fn(group_frame, *args)` for each group,
+computed in a pool of CLEAN_WORKERS processes. The columns travel as
+Arrow IPC streams written once into a shared-memory segment; each worker
+maps the segment and reads its own group's streams in place, so no column
+is pickled or copied out of the segment first.
+Only `fn`'s results (small dicts of decisions) come back through pickle.
+Columns Arrow cannot hold (objects of mixed types) form one more group,
+run in this process.
+
+Groups are balanced by the columns' encoded size, which tracks the work
+per column (text columns weigh more than numeric ones).
+
+Config (env):
+- CLEAN_WORKERS: worker processes for per-column cleaning (default 1 = in-process)
+- PARALLEL_MIN_CELLS: smallest frame (rows x columns) sent to the pool (default 2M)
+"""
+from __future__ import annotations
+import heapq
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Tuple
+
+import pandas as pd
+
+CLEAN_WORKERS = int(os.getenv('CLEAN_WORKERS', '1'))
+PARALLEL_MIN_CELLS = int(os.getenv('PARALLEL_MIN_CELLS', str(2_000_000)))
+
+_executor: ProcessPoolExecutor | None = None
+_executor_lock = threading.Lock()
+
+# (column, pandas dtype, byte offset, byte length) of each column's IPC stream in the segment
+Layout = List[Tuple[Any, str, int, int]]
+
+
+def parallel_enabled(df: pd.DataFrame, workers: int | None = None) -> bool:
+    """Whether `df` is large enough, and the pool big enough, to fan its columns out."""
+    workers = CLEAN_WORKERS if workers is None else workers
+    return workers > 1 and df.shape[1] > 1 and df.shape[0] * df.shape[1] >= PARALLEL_MIN_CELLS
+
+
+def _pool(workers: int) -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor._max_workers != workers:
+            if _executor is not None:
+                _executor.shutdown(wait=False)
+            # spawn: the API process runs threads, which fork does not copy safely
+            _executor = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _executor
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def _encode(df: pd.DataFrame) -> Tuple[Dict[Any, Any], List[Any]]:
+    """One-column Arrow record batches, and the columns Arrow rejected."""
+    import pyarrow as pa
+
+    batches, local = {}, []
+    for col in df.columns:
+        try:
+            batches[col] = pa.record_batch([pa.array(df[col], from_pandas=True)], names=['values'])
+        except (pa.ArrowException, TypeError, ValueError):
+            local.append(col)
+    return batches, local
+
+
+def _stream_size(batch) -> int:
+    import pyarrow as pa
+
+    sink = pa.MockOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.size()
+
+
+def _write_streams(shm: shared_memory.SharedMemory, batches: list) -> None:
+    """Write the batches' IPC streams back to back from the start of the segment."""
+    import pyarrow as pa
+
+    # Kept in a function so no writer outlives it: the segment cannot close while one holds its buffer
+    sink = pa.FixedSizeBufferWriter(pa.py_buffer(shm.buf))
+    for batch in batches:
+        with pa.ipc.new_stream(sink, batch.schema) as writer:
+            writer.write_batch(batch)
+    sink.close()
+
+
+def _balance(sizes: List[Tuple[Any, int]], n_groups: int) -> List[List[Any]]:
+    """Largest-first assignment of columns to the lightest group."""
+    heap = [(0, g) for g in range(n_groups)]
+    groups: List[List[Any]] = [[] for _ in range(n_groups)]
+    for i, (col, size) in sorted(enumerate(sizes), key=lambda item: -item[1][1]):
+        load, g = heapq.heappop(heap)
+        groups[g].append((i, col))
+        heapq.heappush(heap, (load + size, g))
+    # Each group keeps the frame's column order
+    return [[col for _, col in sorted(g)] for g in groups if g]
+
+
+def _read_group(buf, layout: Layout) -> pd.DataFrame:
+    import pyarrow as pa
+
+    columns = {}
+    for col, dtype, offset, length in layout:
+        s = pa.ipc.open_stream(buf.slice(offset, length)).read_next_batch().column(0).to_pandas()
+        # Arrow has no nullable-integer or string-extension dtype of its own; categories come back as they were
+        if str(s.dtype) != dtype and not isinstance(s.dtype, pd.CategoricalDtype):
+            s = s.astype(dtype)
+        columns[col] = s
+    return pd.DataFrame(columns)
+
+
+def _run_group(segment: str, layout: Layout, fn: Callable[..., Any], args: tuple) -> Any:
+    """Worker entry point: map the segment, rebuild this group's frame and run `fn` on it."""
+    import pyarrow as pa
+
+    shm = shared_memory.SharedMemory(name=segment)
+    frame = None
+    try:
+        frame = _read_group(pa.py_buffer(shm.buf), layout)
+        return fn(frame, *args)
+    finally:
+        # Columns Arrow handed over zero-copy view the segment: drop them before unmapping it
+        del frame
+        try:
+            shm.close()
+        except BufferError:
+            # A view outlived `fn` (e.g. kept in a cache); the mapping goes with the last one
+            pass
+
+
+def map_column_groups(
+    df: pd.DataFrame, fn: Callable[..., Any], *args: Any, workers: int | None = None,
+) -> List[Any]:
+    """`fn(group_frame, *args)` for groups of `df`'s columns, one group per worker.
+
+    `fn` must be a module-level function (workers import it by name) and
+    must not depend on columns outside its group. Results come back in
+    group order; which columns a group holds is up to the balancing.
+    """
+    workers = CLEAN_WORKERS if workers is None else workers
+    batches, local = _encode(df)
+    sizes = [(col, _stream_size(batch)) for col, batch in batches.items()]
+    groups = _balance(sizes, min(workers, len(sizes))) if sizes else []
+
+    size_of = dict(sizes)
+    layouts: List[Layout] = []
+    offset = 0
+    for group in groups:
+        layout = []
+        for col in group:
+            layout.append((col, str(df[col].dtype), offset, size_of[col]))
+            offset += size_of[col]
+        layouts.append(layout)
+
+    shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    try:
+        _write_streams(shm, [batches[col] for layout in layouts for col, *_ in layout])
+        del batches
+        pool = _pool(workers)
+        futures = [pool.submit(_run_group, shm.name, layout, fn, args) for layout in layouts]
+        results = [fn(df[local], *args)] if local else []
+        return [f.result() for f in futures] + results
+    except BrokenProcessPool:
+        # A worker died (e.g. out of memory): start a fresh pool next time
+        shutdown()
+        raise
+    finally:
+        shm.close()
+        shm.unlink()
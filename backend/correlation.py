@@ -0,0 +1,132 @@
+"""Pearson and Spearman correlation matrices computed in column blocks.
+
+`correlation_matrix` converts the numeric columns to float64 a block at a
+time (about PROFILE_BLOCK_CELLS cells) and fills the k x k matrix one
+block pair at a time with matrix products, so memory stays at two blocks
+plus the result however many columns there are. Missing values are
+handled pairwise, like DataFrame.corr: each pair uses the rows where both
+columns have values. Spearman correlates average ranks; ranks are taken
+per column over its non-missing values, which equals DataFrame.corr's
+result whenever the columns have no gaps (cleaned datasets).
+
+`top_pairs` picks the k strongest pairs from the upper triangle with a
+partial sort instead of sorting every pair. `get_correlations` caches the
+matrix per frame object, like column_profile.get_profile, so the upload
+pipeline, the scatter chart and the matrix endpoint share one computation.
+"""
+from __future__ import annotations
+import threading
+import weakref
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from column_profile import PROFILE_BLOCK_CELLS
+
+METHODS = ('pearson', 'spearman')
+
+# id(frame) -> {(shape, dtypes, method): (columns, matrix)}; entries are removed when the frame is collected
+_cache: Dict[int, Dict[Any, Tuple[List[Any], np.ndarray]]] = {}
+_cache_lock = threading.Lock()
+
+
+def _block(df: pd.DataFrame, cols: List[Any], method: str) -> Tuple[np.ndarray, np.ndarray | None]:
+    """(values with NaN as 0, validity mask or None without gaps), one row per row of `df`, centred per column."""
+    frame = df[cols]
+    if method == 'spearman':
+        frame = frame.rank(method='average')
+    x = frame.to_numpy(dtype='float64', na_value=np.nan)
+    valid = ~np.isnan(x)
+    x = np.where(valid, x, 0.0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        means = x.sum(axis=0) / valid.sum(axis=0)
+    # Centring first keeps the sums of products from cancelling on large values
+    x = np.where(valid, x - np.nan_to_num(means), 0.0)
+    return x, None if valid.all() else valid.astype('float64')
+
+
+def correlation_matrix(df: pd.DataFrame, method: str = 'pearson') -> Tuple[List[Any], np.ndarray]:
+    """(numeric columns, their correlation matrix); NaN where a pair has under two rows or no spread."""
+    if method not in METHODS:
+        raise ValueError(f"Unknown correlation method '{method}'; use one of {list(METHODS)}")
+    cols = list(df.select_dtypes(include=['number']).columns)
+    k = len(cols)
+    corr = np.full((k, k), np.nan)
+    step = max(1, PROFILE_BLOCK_CELLS // max(len(df), 1))
+    starts = list(range(0, k, step))
+    for a in starts:
+        xa, ma = _block(df, cols[a:a + step], method)
+        for b in starts:
+            if b < a:
+                continue
+            xb, mb = (xa, ma) if b == a else _block(df, cols[b:b + step], method)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                if ma is None and mb is None:
+                    # No gaps: one product, with the column sums and squares as vectors
+                    n = np.full((xa.shape[1], xb.shape[1]), float(len(xa)))
+                    sa, sb = xa.sum(axis=0)[:, None], xb.sum(axis=0)[None, :]
+                    var_a = (xa * xa).sum(axis=0)[:, None] - sa * sa / n
+                    var_b = (xb * xb).sum(axis=0)[None, :] - sb * sb / n
+                else:
+                    # Pairwise-complete sums: each product only counts rows where both columns have values
+                    ma = np.ones_like(xa) if ma is None else ma
+                    mb = np.ones_like(xb) if mb is None else mb
+                    n = ma.T @ mb
+                    sa, sb = xa.T @ mb, ma.T @ xb
+                    var_a = (xa * xa).T @ mb - sa * sa / n
+                    var_b = ma.T @ (xb * xb) - sb * sb / n
+                cov = xa.T @ xb - sa * sb / n
+                r = np.clip(cov / np.sqrt(var_a * var_b), -1.0, 1.0)
+            r[n < 2] = np.nan
+            corr[a:a + xa.shape[1], b:b + xb.shape[1]] = r
+            corr[b:b + xb.shape[1], a:a + xa.shape[1]] = r.T
+    diag = np.arange(k)
+    corr[diag, diag] = np.where(np.isfinite(corr[diag, diag]), 1.0, np.nan)
+    return cols, corr
+
+
+def get_correlations(df: pd.DataFrame, method: str = 'pearson') -> Tuple[List[Any], np.ndarray]:
+    """`correlation_matrix(df, method)`, cached per frame object; treat the matrix as read-only."""
+    key = (df.shape, tuple(str(t) for t in df.dtypes), method)
+    entry = _cache.get(id(df))
+    if entry is None or key not in entry:
+        result = correlation_matrix(df, method)
+        with _cache_lock:
+            if id(df) not in _cache:
+                weakref.finalize(df, _cache.pop, id(df), None)
+                _cache[id(df)] = {}
+            entry = _cache[id(df)]
+            # Keep one frame shape: a changed frame drops the other methods' entries
+            for stale in [k for k in entry if k[:2] != key[:2]]:
+                del entry[stale]
+            entry[key] = result
+    return entry[key]
+
+
+def top_pairs(cols: List[Any], corr: np.ndarray, k: int = 3) -> List[Dict[str, Any]]:
+    """The k pairs with the largest |corr|, ties in column order (as a stable sort would give)."""
+    iu, ju = np.triu_indices(len(cols), k=1)
+    vals = corr[iu, ju]
+    valid = np.isfinite(vals)
+    iu, ju, vals = iu[valid], ju[valid], vals[valid]
+    strength = np.abs(vals)
+    if len(strength) > k > 0:
+        threshold = np.partition(strength, len(strength) - k)[len(strength) - k]
+        above = np.flatnonzero(strength > threshold)
+        tied = np.flatnonzero(strength == threshold)[:k - len(above)]
+        chosen = np.sort(np.concatenate([above, tied]))
+    else:
+        chosen = np.arange(len(strength))[:max(k, 0)]
+    chosen = chosen[np.argsort(-strength[chosen], kind='stable')]
+    return [
+        {'x': cols[iu[i]], 'y': cols[ju[i]], 'corr': float(vals[i]), 'abs_corr': float(strength[i])}
+        for i in chosen
+    ]
+
+
+def matrix_payload(corr: np.ndarray) -> List[List[float | None]]:
+    """The matrix as JSON-ready nested lists, None for undefined pairs."""
+    values = corr.astype(object)
+    values[~np.isfinite(corr)] = None
+    return values.tolist()
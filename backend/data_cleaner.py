@@ -1,35 +1,59 @@
 """Data cleaning utilities for CSV uploads.
 
 Rules:
-- Drop duplicates
+- Drop duplicates (of whole rows, or of the `dedup_subset` key columns),
+  found by 64-bit row fingerprints (row_fingerprint)
 - Fill missing numeric values with MEAN
 - Fill missing categorical values with MODE
-- Attempt to convert date-like columns via pandas.to_datetime
+- Convert date-like columns, detected on a sample with an explicit format
 - Return a human-readable cleaning summary
+
+Each run also emits its decisions as a JSON recipe (summary['recipe']):
+fill constants, date formats, clip bounds and the dedup key.
+`apply_recipe` replays one on a file with the same columns in a single
+vectorised pass, without profiling it again. Large frames are decided
+column group by column group in worker processes (column_workers) and
+the merged decisions replayed the same way.
 """
 from __future__ import annotations
 import pandas as pd
 import numpy as np
+from pathlib import Path
 from typing import Tuple, Dict, Any
 
+from column_workers import map_column_groups, parallel_enabled
+from column_profile import clear_profile, column_quantiles, count_outside, profile_columns
+from date_detection import DATE_SAMPLE_ROWS, datetime_profile, infer_datetime_format, parse_datetime
+from quantile_sketch import APPROX_QUANTILES, QuantileSketch, sketch_report
+from row_fingerprint import SeenHashes, first_occurrence, get_row_hashes, row_hashes
+
+
+class DedupKeyError(ValueError):
+    """The dedup key names columns the data does not have."""
+
 
-def _detect_datetime_columns(df: pd.DataFrame) -> list[str]:
-    """Detect columns that look like datetimes.
+def _check_dedup_subset(columns, subset: list[str] | None) -> None:
+    missing = [col for col in subset or [] if col not in columns]
+    if missing:
+        raise DedupKeyError(f"Duplicate key columns not found in the file: {missing}")
+
+
+def _detect_datetime_columns(df: pd.DataFrame) -> Dict[str, str]:
+    """Detect columns that look like datetimes, with the format to parse them.
 
     Important: Only consider object/category/text columns to avoid
     incorrectly converting numeric measures to datetimes.
     """
-    date_cols: list[str] = []
+    date_cols: Dict[str, str] = {}
     text_like = df.select_dtypes(include=['object', 'string', 'category']).columns
     for col in text_like:
-        s = df[col]
         try:
-            parsed = pd.to_datetime(s, errors='coerce')
-            # Heuristic: at least 70% parseable and at least 10 unique non-null values
-            if parsed.notna().mean() >= 0.7 and parsed.nunique(dropna=True) >= 10:
-                date_cols.append(col)
+            info = datetime_profile(df, col)
         except Exception:
-            pass
+            continue
+        # Heuristic: at least 70% parseable and at least 10 unique non-null values
+        if info['ratio'] >= 0.7 and info['unique'] >= 10:
+            date_cols[col] = info['format']
     return date_cols
 
 
@@ -38,26 +62,83 @@ def clean_csv_and_summary(
     *,
     auto_clean: bool = True,
     outlier_detection: bool = True,
+    dedup_subset: list[str] | None = None,
 ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
     original_rows = int(df.shape[0])
-    original_missing = int(df.isna().sum().sum())
+    source_dtypes = {col: _recipe_dtype_name(df[col]) for col in df.columns}
 
-    # Drop duplicates
+    # Drop duplicates; the fingerprints are cached on the frame for later users
     if auto_clean:
+        _check_dedup_subset(df.columns, dedup_subset)
         before_dups = int(df.shape[0])
-        df = df.drop_duplicates()
+        df = df[first_occurrence(get_row_hashes(df, dedup_subset))].copy()
         duplicates_removed = before_dups - int(df.shape[0])
     else:
         duplicates_removed = 0
 
+    # Fill values, date formats and clip bounds are decided per column; large
+    # frames fan their columns out to worker processes and replay the merged decisions
+    decisions = _parallel_decisions(df, auto_clean, outlier_detection) if parallel_enabled(df) else None
+    if decisions is None:
+        df, decisions = _clean_columns(df, auto_clean=auto_clean, outlier_detection=outlier_detection)
+        df, outliers_capped = _clip_to_bounds(df, decisions['bounds'])
+    else:
+        df, replayed = _replay(df, _make_recipe(
+            source_dtypes, decisions['fills'], decisions['date_formats'], decisions['bounds'],
+            auto_clean=auto_clean, outlier_detection=outlier_detection,
+        ))
+        outliers_capped = replayed['outliers_capped']
+        df.attrs['date_formats'] = decisions['date_formats']
+    fills, bounds = decisions['fills'], decisions['bounds']
+    numeric_missing_filled = decisions['numeric_missing_filled']
+    categorical_missing_filled = decisions['categorical_missing_filled']
+    converted_date_cols = list(df.attrs['date_formats'])
+    # Profiles cached on the input no longer describe the cleaned frame
+    clear_profile(df)
+
+    summary = _build_summary(
+        original_rows=original_rows,
+        rows_after_cleaning=int(df.shape[0]),
+        duplicates_removed=duplicates_removed,
+        numeric_missing_filled=numeric_missing_filled,
+        categorical_missing_filled=categorical_missing_filled,
+        converted_date_cols=converted_date_cols,
+        outliers_capped=outliers_capped,
+        auto_clean=auto_clean,
+        outlier_detection=outlier_detection,
+        recipe=_make_recipe(
+            source_dtypes, fills, df.attrs['date_formats'], bounds, dedup_subset,
+            auto_clean=auto_clean, outlier_detection=outlier_detection,
+        ),
+    )
+
+    return df, summary
+
+
+def _clean_columns(
+    df: pd.DataFrame, *, auto_clean: bool, outlier_detection: bool, convert_dates: bool = True,
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Fill and convert the columns of `df`; returns it with the decisions taken.
+
+    Each column is decided on its own values only, so this runs the same on
+    the whole frame or on any group of its columns. `convert_dates=False`
+    only detects the date formats (parsing coerces, so it cannot reject one).
+    """
+    # One profiling pass gives the null counts and means for every column
+    profile = profile_columns(df, quantiles=(), value_stats=False) if auto_clean else {}
+    # Fill values for every column, not only those with gaps here, so the recipe covers later files
+    fills: Dict[str, Any] = {}
+
     # Fill numeric with mean (only if auto_clean)
     num_cols = df.select_dtypes(include=['number']).columns
     numeric_missing_filled = 0
     if auto_clean:
         for col in num_cols:
-            na_count = int(df[col].isna().sum())
+            mean_val = profile[col].get('mean', np.nan)
+            if not pd.isna(mean_val):
+                fills[col] = mean_val
+            na_count = profile[col]['nulls']
             if na_count > 0:
-                mean_val = df[col].mean()
                 df[col] = df[col].fillna(mean_val)
                 numeric_missing_filled += na_count
 
@@ -66,59 +147,128 @@ def clean_csv_and_summary(
     categorical_missing_filled = 0
     if auto_clean:
         for col in cat_cols:
-            na_count = int(df[col].isna().sum())
-            if na_count > 0:
-                try:
-                    mode_val = df[col].mode(dropna=True)
-                    if not mode_val.empty:
-                        fill_val = mode_val.iloc[0]
-                    else:
-                        fill_val = ""
-                except Exception:
+            try:
+                mode_val = df[col].mode(dropna=True)
+                if not mode_val.empty:
+                    fill_val = mode_val.iloc[0]
+                else:
                     fill_val = ""
+            except Exception:
+                fill_val = ""
+            fills[col] = fill_val
+            na_count = profile[col]['nulls']
+            if na_count > 0:
+                if isinstance(df[col].dtype, pd.CategoricalDtype) and fill_val not in df[col].cat.categories:
+                    df[col] = df[col].cat.add_categories([fill_val])
                 df[col] = df[col].fillna(fill_val)
                 categorical_missing_filled += na_count
 
-    # Convert datetime columns
+    # Convert datetime columns in one pass each, with the detected format
     date_cols = _detect_datetime_columns(df)
     converted_date_cols: list[str] = []
-    for col in date_cols:
+    for col, fmt in date_cols.items():
+        if not convert_dates:
+            converted_date_cols.append(col)
+            continue
         try:
-            df[col] = pd.to_datetime(df[col], errors='coerce')
+            df[col] = parse_datetime(df[col], fmt)
             converted_date_cols.append(col)
         except Exception:
             # Ignore conversion failures
             pass
+    # Formats used, for replaying the conversion on later rows
+    df.attrs['date_formats'] = {col: date_cols[col] for col in converted_date_cols}
 
-    # Detect and cap outliers on numeric columns using IQR rule (only if enabled)
-    # Values outside [Q1 - 1.5*IQR, Q3 + 1.5*IQR] are clipped to the bounds
-    outliers_capped: Dict[str, Any] = {}
+    # IQR rule for outliers (only if enabled): values outside
+    # [Q1 - 1.5*IQR, Q3 + 1.5*IQR] are clipped to these bounds by the caller
+    bounds: Dict[str, Tuple[float, float]] = {}
     if outlier_detection:
-        num_df_cols = df.select_dtypes(include=['number']).columns
-        for col in num_df_cols:
-            s = df[col].copy()  # Fix SettingWithCopyWarning
-            if s.dropna().empty:
-                continue
-            q1 = s.quantile(0.25)
-            q3 = s.quantile(0.75)
+        num_df_cols = list(df.select_dtypes(include=['number']).columns)
+        for col, (q1, q3) in column_quantiles(df, num_df_cols, (0.25, 0.75)).items():
             iqr = q3 - q1
             if pd.isna(iqr) or iqr == 0:
                 continue
-            lower = q1 - 1.5 * iqr
-            upper = q3 + 1.5 * iqr
-            below = int((s < lower).sum())
-            above = int((s > upper).sum())
-            if below > 0 or above > 0:
-                df.loc[:, col] = s.clip(lower, upper)  # Use .loc to avoid warning
-                outliers_capped[col] = {
-                    'lower_bound': float(lower),
-                    'upper_bound': float(upper),
-                    'count_below': below,
-                    'count_above': above,
-                    'total_capped': below + above,
-                }
-
-    total_after_missing = int(df.isna().sum().sum())
+            bounds[col] = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+    return df, {
+        'fills': fills,
+        'date_formats': df.attrs['date_formats'],
+        'bounds': bounds,
+        'numeric_missing_filled': numeric_missing_filled,
+        'categorical_missing_filled': categorical_missing_filled,
+    }
+
+
+def _column_decisions(df: pd.DataFrame, auto_clean: bool, outlier_detection: bool) -> Dict[str, Any]:
+    """Worker side of `_parallel_decisions`: the decisions for one group of columns."""
+    return _clean_columns(df, auto_clean=auto_clean, outlier_detection=outlier_detection, convert_dates=False)[1]
+
+
+def _parallel_decisions(df: pd.DataFrame, auto_clean: bool, outlier_detection: bool) -> Dict[str, Any] | None:
+    """`_clean_columns` decisions computed by the column worker pool; None if the pool fails."""
+    try:
+        parts = map_column_groups(df, _column_decisions, auto_clean, outlier_detection)
+    except Exception as e:
+        print(f"[CLEAN] Parallel column cleaning failed, running in-process: {type(e).__name__}: {e}")
+        return None
+    order = {col: i for i, col in enumerate(df.columns)}
+    numeric = set(df.select_dtypes(include=['number']).columns)
+    merged: Dict[str, Any] = {'numeric_missing_filled': 0, 'categorical_missing_filled': 0}
+    for key in ('fills', 'date_formats', 'bounds'):
+        entries = [item for part in parts for item in part[key].items()]
+        # Same order as the in-process run: numeric fills first, then frame order
+        entries.sort(key=lambda item: (key == 'fills' and item[0] not in numeric, order[item[0]]))
+        merged[key] = dict(entries)
+    for part in parts:
+        merged['numeric_missing_filled'] += part['numeric_missing_filled']
+        merged['categorical_missing_filled'] += part['categorical_missing_filled']
+    return merged
+
+
+def _clip_to_bounds(
+    df: pd.DataFrame, bounds: Dict[str, Tuple[float, float]]
+) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Clip columns with values outside their (lower, upper) bounds; returns the outliers_capped summary."""
+    outliers_capped: Dict[str, Any] = {}
+    for col, (below, above) in count_outside(df, bounds).items():
+        if below > 0 or above > 0:
+            lower, upper = bounds[col]
+            outliers_capped[col] = {
+                'lower_bound': float(lower),
+                'upper_bound': float(upper),
+                'count_below': below,
+                'count_above': above,
+                'total_capped': below + above,
+            }
+    if outliers_capped:
+        # One frame-wide clip with per-column bounds instead of a clip per column
+        capped = list(outliers_capped)
+        lower = pd.Series({col: bounds[col][0] for col in capped})
+        upper = pd.Series({col: bounds[col][1] for col in capped})
+        df.loc[:, capped] = df[capped].clip(lower, upper, axis=1)
+    return df, outliers_capped
+
+
+def _merge_capped(total: Dict[str, Any], capped: Dict[str, Any]) -> None:
+    """Add one batch's outliers_capped entries (same bounds) to running totals."""
+    for col, batch in capped.items():
+        entry = total.setdefault(col, {**batch, 'count_below': 0, 'count_above': 0, 'total_capped': 0})
+        for key in ('count_below', 'count_above', 'total_capped'):
+            entry[key] += batch[key]
+
+
+def _build_summary(
+    *,
+    original_rows: int,
+    rows_after_cleaning: int,
+    duplicates_removed: int,
+    numeric_missing_filled: int,
+    categorical_missing_filled: int,
+    converted_date_cols: list[str],
+    outliers_capped: Dict[str, Any],
+    auto_clean: bool,
+    outlier_detection: bool,
+    recipe: Dict[str, Any] | None = None,
+) -> Dict[str, Any]:
     total_filled = numeric_missing_filled + categorical_missing_filled
 
     # Build human-readable summary text
@@ -138,7 +288,7 @@ def clean_csv_and_summary(
 
     summary = {
         'original_rows': original_rows,
-        'rows_after_cleaning': int(df.shape[0]),
+        'rows_after_cleaning': rows_after_cleaning,
         'duplicates_removed': duplicates_removed,
         'numeric_missing_filled': numeric_missing_filled,
         'categorical_missing_filled': categorical_missing_filled,
@@ -148,5 +298,574 @@ def clean_csv_and_summary(
         'auto_clean': auto_clean,
         'outlier_detection': outlier_detection,
     }
+    if recipe is not None:
+        summary['recipe'] = recipe
+    return summary
 
-    return df, summary
+
+# ---------------------------------------------------------------------------
+# Chunked (out-of-core) cleaning
+# ---------------------------------------------------------------------------
+
+DEFAULT_CHUNK_ROWS = 200_000
+
+
+def _column_kind(s: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(s):
+        return 'bool'
+    if pd.api.types.is_numeric_dtype(s):
+        return 'number'
+    return 'object'
+
+
+def _mode_from_counts(counts: Dict[Any, int]) -> Any:
+    """Mode with the same tie-break as Series.mode (smallest value wins)."""
+    if not counts:
+        return ""
+    best = max(counts.values())
+    tied = [v for v, c in counts.items() if c == best]
+    try:
+        return sorted(tied)[0]
+    except TypeError:
+        return tied[0]
+
+
+class _ChunkProfile:
+    """Per-column aggregates gathered by the first pass over the file."""
+
+    def __init__(self, spill_dir: Path, approx_quantiles: bool = False):
+        self.spill_dir = spill_dir
+        self.columns: list[str] = []
+        self.kinds: Dict[str, set] = {}
+        self.float_cols: set = set()
+        self.original_rows = 0
+        self.kept_rows = 0
+        self.na_counts: Dict[str, int] = {}
+        self.sums: Dict[str, float] = {}
+        self.nonnull: Dict[str, int] = {}
+        self.mins: Dict[str, float] = {}
+        self.maxs: Dict[str, float] = {}
+        # Numeric values are either spilled to disk (exact quantiles) or sketched
+        self.sketches: Dict[str, QuantileSketch] | None = {} if approx_quantiles else None
+        self.value_counts: Dict[str, Dict[Any, int]] = {}
+        self.date_parseable: Dict[str, int] = {}
+        self.date_formats: Dict[str, str | None] = {}
+        self.date_uniques: Dict[str, set] = {}
+        self.keep_mask_path = spill_dir / 'keep_mask.bin'
+
+    def values_path(self, col: str) -> Path:
+        return self.spill_dir / f"num_{self.columns.index(col)}.bin"
+
+    def mixed_columns(self) -> list[str]:
+        return [c for c, k in self.kinds.items() if len(k) > 1]
+
+    def kind(self, col: str) -> str:
+        return next(iter(self.kinds[col]))
+
+
+def _profile_pass(
+    path: Path,
+    chunksize: int,
+    pinned: list[str],
+    spill_dir: Path,
+    auto_clean: bool,
+    read_options: Dict[str, Any],
+    approx_quantiles: bool = False,
+    dedup_subset: list[str] | None = None,
+) -> _ChunkProfile:
+    profile = _ChunkProfile(spill_dir, approx_quantiles)
+    seen = SeenHashes(spill_dir / 'seen')
+    reader = pd.read_csv(path, chunksize=chunksize, dtype={c: object for c in pinned} or None, **read_options)
+    with open(profile.keep_mask_path, 'wb') as mask_out:
+        for chunk in reader:
+            if not profile.columns:
+                profile.columns = chunk.columns.tolist()
+                if auto_clean:
+                    _check_dedup_subset(profile.columns, dedup_subset)
+            profile.original_rows += len(chunk)
+            for col in chunk.columns:
+                profile.kinds.setdefault(col, set()).add(_column_kind(chunk[col]))
+                if pd.api.types.is_float_dtype(chunk[col]):
+                    profile.float_cols.add(col)
+
+            # Duplicate detection keeps the first occurrence, like drop_duplicates()
+            if auto_clean:
+                keep = seen.keep_unseen(row_hashes(chunk, dedup_subset))
+                chunk = chunk[keep]
+            else:
+                keep = np.ones(len(chunk), dtype=bool)
+            keep.tofile(mask_out)
+            profile.kept_rows += len(chunk)
+
+            for col in chunk.columns:
+                s = chunk[col]
+                na = int(s.isna().sum())
+                profile.na_counts[col] = profile.na_counts.get(col, 0) + na
+                kind = _column_kind(s)
+                if kind == 'number':
+                    values = s.dropna().to_numpy(dtype='float64')
+                    profile.sums[col] = profile.sums.get(col, 0.0) + float(values.sum())
+                    profile.nonnull[col] = profile.nonnull.get(col, 0) + len(values)
+                    if len(values):
+                        profile.mins[col] = min(profile.mins.get(col, np.inf), float(values.min()))
+                        profile.maxs[col] = max(profile.maxs.get(col, -np.inf), float(values.max()))
+                    if profile.sketches is not None:
+                        profile.sketches.setdefault(col, QuantileSketch()).update(values)
+                    else:
+                        with open(profile.values_path(col), 'ab') as spill:
+                            values.tofile(spill)
+                elif kind == 'object':
+                    counts = profile.value_counts.setdefault(col, {})
+                    for value, cnt in s.value_counts(dropna=True).items():
+                        counts[value] = counts.get(value, 0) + int(cnt)
+                    nonnull = s.dropna()
+                    if nonnull.empty:
+                        continue
+                    # One format per column, sniffed from the first chunk that has values
+                    if col not in profile.date_formats:
+                        profile.date_formats[col] = infer_datetime_format(nonnull.sample(
+                            n=min(len(nonnull), DATE_SAMPLE_ROWS), random_state=0
+                        ))
+                    fmt = profile.date_formats[col]
+                    if fmt is None:
+                        continue
+                    parsed = parse_datetime(nonnull, fmt)
+                    profile.date_parseable[col] = profile.date_parseable.get(col, 0) + int(parsed.notna().sum())
+                    uniques = profile.date_uniques.setdefault(col, set())
+                    if len(uniques) < 10:
+                        uniques.update(parsed.dropna().unique()[:10].tolist())
+    return profile
+
+
+def clean_csv_chunked(
+    path: Path,
+    output_path: Path,
+    *,
+    auto_clean: bool = True,
+    outlier_detection: bool = True,
+    chunksize: int = DEFAULT_CHUNK_ROWS,
+    read_options: Dict[str, Any] | None = None,
+    recipe: Dict[str, Any] | None = None,
+    approx_quantiles: bool | None = None,
+    dedup_subset: list[str] | None = None,
+) -> Dict[str, Any]:
+    """Clean a CSV that may not fit in memory, writing the result to `output_path`.
+
+    Pass one streams the file once to collect duplicate hashes (spilled to
+    disk past DEDUP_MEMORY_HASHES), missing counts,
+    means, modes, datetime candidates and per-column values for the IQR bounds
+    (spilled to disk, loaded one column at a time). With `approx_quantiles`
+    (default: APPROX_QUANTILES) the values go into a quantile sketch per
+    column instead, and the summary reports its error bound under
+    'approximate_quantiles'. Pass two re-reads the file
+    chunk by chunk, applies the same rules as `clean_csv_and_summary` and
+    appends each cleaned chunk to `output_path` (``.arrow`` or CSV).
+    `read_options` are extra pandas.read_csv arguments (e.g. sniffed sep/encoding).
+    With a `recipe` from an earlier run, the file is cleaned in a single
+    pass with the recipe's decisions instead.
+
+    Returns the same summary structure as `clean_csv_and_summary`.
+    """
+    import shutil
+    import tempfile
+
+    path = Path(path)
+    output_path = Path(output_path)
+    read_options = read_options or {}
+    if recipe is not None:
+        return _replay_chunked(path, output_path, recipe, chunksize, read_options)
+    if approx_quantiles is None:
+        approx_quantiles = APPROX_QUANTILES
+    with tempfile.TemporaryDirectory(prefix='clean_') as tmp:
+        spill_dir = Path(tmp)
+
+        # Columns that are numeric in some chunks and text in others are text
+        # in a full read; pin them to object and profile again
+        pinned: list[str] = []
+        while True:
+            profile = _profile_pass(
+                path, chunksize, pinned, spill_dir, auto_clean, read_options, approx_quantiles, dedup_subset
+            )
+            mixed = profile.mixed_columns()
+            if not mixed:
+                break
+            pinned = sorted(set(pinned) | set(mixed))
+            for f in spill_dir.iterdir():
+                shutil.rmtree(f) if f.is_dir() else f.unlink()
+
+        num_cols = [c for c in profile.columns if profile.kind(c) == 'number']
+        cat_cols = [c for c in profile.columns if profile.kind(c) == 'object']
+
+        # Fill values; the recipe records them for every column
+        numeric_fills: Dict[str, float] = {}
+        numeric_missing_filled = 0
+        categorical_fills: Dict[str, Any] = {}
+        categorical_missing_filled = 0
+        recipe_fills: Dict[str, Any] = {}
+        if auto_clean:
+            for col in num_cols:
+                count = profile.nonnull.get(col, 0)
+                if count:
+                    recipe_fills[col] = profile.sums[col] / count
+                na_count = profile.na_counts.get(col, 0)
+                if na_count > 0:
+                    numeric_fills[col] = profile.sums[col] / count if count else np.nan
+                    numeric_missing_filled += na_count
+            for col in cat_cols:
+                recipe_fills[col] = _mode_from_counts(profile.value_counts.get(col, {}))
+                na_count = profile.na_counts.get(col, 0)
+                if na_count > 0:
+                    categorical_fills[col] = recipe_fills[col]
+                    categorical_missing_filled += na_count
+
+        # Datetime columns, judged on the filled column like _detect_datetime_columns
+        converted_date_cols: list[str] = []
+        kept = profile.kept_rows
+        for col in cat_cols:
+            parseable = profile.date_parseable.get(col, 0)
+            fill = categorical_fills.get(col)
+            fmt = profile.date_formats.get(col)
+            if fmt is None:
+                continue
+            if fill not in (None, "") and parse_datetime(pd.Series([fill], dtype=object), fmt).notna().all():
+                parseable += profile.na_counts.get(col, 0)
+            if kept and parseable / kept >= 0.7 and len(profile.date_uniques.get(col, ())) >= 10:
+                converted_date_cols.append(col)
+
+        # IQR bounds from the spilled values, one column in memory at a time,
+        # or from the sketches
+        bounds: Dict[str, Tuple[float, float]] = {}
+        if outlier_detection:
+            for col in num_cols:
+                fill = numeric_fills.get(col, np.nan)
+                if profile.sketches is not None:
+                    sketch = profile.sketches.setdefault(col, QuantileSketch())
+                    if not np.isnan(fill):
+                        sketch.update(np.full(profile.na_counts[col], fill))
+                    if sketch.n == 0:
+                        continue
+                    q1, q3 = sketch.quantiles([0.25, 0.75])
+                else:
+                    values_file = profile.values_path(col)
+                    values = np.fromfile(values_file, dtype='float64') if values_file.exists() else np.empty(0)
+                    if not np.isnan(fill):
+                        values = np.concatenate([values, np.full(profile.na_counts[col], fill)])
+                    if values.size == 0:
+                        continue
+                    q1, q3 = np.quantile(values, [0.25, 0.75])
+                    del values
+                iqr = q3 - q1
+                if pd.isna(iqr) or iqr == 0:
+                    continue
+                bounds[col] = (q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+        # Columns with anything to clip, known from the extremes (and fill)
+        # so every chunk of them is clipped alike; pass two counts the values
+        capped_cols = [
+            col for col, (lower, upper) in bounds.items()
+            if min(profile.mins.get(col, np.inf), numeric_fills.get(col, np.inf)) < lower
+            or max(profile.maxs.get(col, -np.inf), numeric_fills.get(col, -np.inf)) > upper
+        ]
+        capped_counts = {col: [0, 0] for col in capped_cols}
+
+        # Pass two: apply everything chunk by chunk straight to the output
+        writer = _ChunkWriter(output_path)
+        keep_mask = np.memmap(profile.keep_mask_path, dtype=bool, mode='r') if profile.original_rows else None
+        offset = 0
+        try:
+            for chunk in pd.read_csv(path, chunksize=chunksize, dtype={c: object for c in pinned} or None, **read_options):
+                n = len(chunk)
+                chunk = chunk[np.asarray(keep_mask[offset:offset + n])]
+                offset += n
+                for col in num_cols:
+                    if col in profile.float_cols:
+                        chunk[col] = chunk[col].astype('float64')
+                for col, val in numeric_fills.items():
+                    chunk[col] = chunk[col].fillna(val)
+                for col, val in categorical_fills.items():
+                    chunk[col] = chunk[col].fillna(val)
+                for col in converted_date_cols:
+                    chunk[col] = parse_datetime(chunk[col], profile.date_formats[col])
+                for col in capped_cols:
+                    lower, upper = bounds[col]
+                    capped_counts[col][0] += int((chunk[col] < lower).sum())
+                    capped_counts[col][1] += int((chunk[col] > upper).sum())
+                    chunk[col] = chunk[col].clip(lower, upper)
+                writer.write(chunk)
+        finally:
+            del keep_mask
+            writer.close()
+
+    outliers_capped = {
+        col: {
+            'lower_bound': float(bounds[col][0]),
+            'upper_bound': float(bounds[col][1]),
+            'count_below': below,
+            'count_above': above,
+            'total_capped': below + above,
+        }
+        for col, (below, above) in capped_counts.items()
+    }
+    summary = _build_summary(
+        original_rows=profile.original_rows,
+        rows_after_cleaning=profile.kept_rows,
+        duplicates_removed=profile.original_rows - profile.kept_rows,
+        numeric_missing_filled=numeric_missing_filled,
+        categorical_missing_filled=categorical_missing_filled,
+        converted_date_cols=converted_date_cols,
+        outliers_capped=outliers_capped,
+        auto_clean=auto_clean,
+        outlier_detection=outlier_detection,
+        recipe=_make_recipe(
+            {col: _chunk_dtype_name(profile, col) for col in profile.columns},
+            recipe_fills, {col: profile.date_formats[col] for col in converted_date_cols}, bounds, dedup_subset,
+            auto_clean=auto_clean, outlier_detection=outlier_detection,
+        ),
+    )
+    if profile.sketches is not None and outlier_detection:
+        summary['approximate_quantiles'] = sketch_report(profile.sketches)
+    return summary
+
+
+def _recipe_dtype_name(s: pd.Series) -> str:
+    """The column's type as a recipe records it; dtype optimisation (int8, category) does not change it."""
+    kind = _column_kind(s)
+    if kind == 'number':
+        return 'int64' if pd.api.types.is_integer_dtype(s) else 'float64'
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return 'datetime64[ns]'
+    return kind
+
+
+def _chunk_dtype_name(profile: _ChunkProfile, col: str) -> str:
+    kind = profile.kind(col)
+    if kind == 'number':
+        return 'float64' if col in profile.float_cols else 'int64'
+    return 'bool' if kind == 'bool' else 'object'
+
+
+class _ChunkWriter:
+    """Appends cleaned chunks to a CSV or Arrow IPC file."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.arrow = path.suffix.lower() == '.arrow'
+        self._writer = None
+        self._schema = None
+        self._started = False
+
+    def write(self, chunk: pd.DataFrame) -> None:
+        if self.arrow:
+            import pyarrow as pa
+            if self._writer is None:
+                self._schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+                # All-null text columns in the first chunk would otherwise be typed null
+                self._schema = pa.schema([
+                    f.with_type(pa.string()) if pa.types.is_null(f.type) else f for f in self._schema
+                ]).remove_metadata()
+                self._writer = pa.ipc.new_file(str(self.path), self._schema)
+            table = pa.Table.from_pandas(chunk, schema=self._schema, preserve_index=False)
+            self._writer.write_table(table)
+        else:
+            chunk.to_csv(self.path, mode='a' if self._started else 'w', header=not self._started, index=False)
+        self._started = True
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.close()
+        elif not self._started and not self.arrow:
+            self.path.write_text('')
+
+
+# ---------------------------------------------------------------------------
+# Cleaning recipes
+# ---------------------------------------------------------------------------
+
+RECIPE_VERSION = 1
+
+
+class RecipeError(ValueError):
+    """A cleaning recipe is malformed or does not fit the data it is applied to."""
+
+
+def _json_value(value: Any) -> Any:
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
+
+
+def _is_numeric_dtype_name(name: str) -> bool:
+    try:
+        dtype = pd.api.types.pandas_dtype(name)
+    except TypeError:
+        return False
+    return pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+
+
+def _make_recipe(
+    dtypes: Dict[str, str],
+    fills: Dict[str, Any],
+    date_formats: Dict[str, str],
+    bounds: Dict[str, Tuple[float, float]],
+    dedup_subset: list[str] | None = None,
+    *,
+    auto_clean: bool,
+    outlier_detection: bool,
+) -> Dict[str, Any]:
+    """The decisions of one cleaning run as JSON-serialisable constants."""
+    return {
+        'version': RECIPE_VERSION,
+        'columns': dict(dtypes),
+        'dedup': {'subset': list(dedup_subset) if dedup_subset else None} if auto_clean else None,
+        'fill': {col: _json_value(value) for col, value in fills.items()},
+        'date_formats': dict(date_formats),
+        'clip': {col: [float(lower), float(upper)] for col, (lower, upper) in bounds.items()},
+        'options': {'autoClean': bool(auto_clean), 'outlierDetection': bool(outlier_detection)},
+    }
+
+
+def validate_recipe(recipe: Any) -> Dict[str, Any]:
+    """Check the structure of a recipe (e.g. one sent with an upload) and return it."""
+    if not isinstance(recipe, dict) or recipe.get('version') != RECIPE_VERSION:
+        raise RecipeError(f"Unsupported cleaning recipe; expected version {RECIPE_VERSION}.")
+    for key in ('columns', 'fill', 'date_formats', 'clip', 'options'):
+        if not isinstance(recipe.get(key), dict):
+            raise RecipeError(f"Cleaning recipe field '{key}' must be an object.")
+    dedup = recipe.get('dedup')
+    if dedup is not None and not (isinstance(dedup, dict) and isinstance(dedup.get('subset'), (list, type(None)))):
+        raise RecipeError("Cleaning recipe field 'dedup' must be null or {\"subset\": [columns] or null}.")
+    for col, bounds in recipe['clip'].items():
+        if not (isinstance(bounds, list) and len(bounds) == 2
+                and all(isinstance(v, (int, float)) for v in bounds) and bounds[0] <= bounds[1]):
+            raise RecipeError(f"Clip bounds for '{col}' must be [lower, upper].")
+    referenced = set(recipe['fill']) | set(recipe['date_formats']) | set(recipe['clip'])
+    referenced |= set((dedup or {}).get('subset') or [])
+    unknown = sorted(referenced - set(recipe['columns']))
+    if unknown:
+        raise RecipeError(f"Cleaning recipe refers to columns it does not list: {unknown}")
+    return recipe
+
+
+def _check_recipe_fits(df: pd.DataFrame, recipe: Dict[str, Any]) -> None:
+    missing = [col for col in recipe['columns'] if col not in df.columns]
+    if missing:
+        raise RecipeError(f"The file does not match the cleaning recipe. Missing columns: {missing}")
+    not_numeric = [
+        col for col in recipe['clip']
+        if not pd.api.types.is_numeric_dtype(df[col]) or pd.api.types.is_bool_dtype(df[col])
+    ]
+    if not_numeric:
+        raise RecipeError(f"The recipe clips these columns, but they are not numeric in the file: {not_numeric}")
+
+
+def _replay(df: pd.DataFrame, recipe: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Fill, convert and clip with the recipe's constants; returns the summary counts."""
+    numeric_missing_filled = 0
+    categorical_missing_filled = 0
+    fills = recipe['fill']
+    na_counts = df[list(fills)].isna().sum() if fills else {}
+    for col, fill_val in fills.items():
+        na_count = int(na_counts[col])
+        if not na_count:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype) and fill_val not in df[col].cat.categories:
+            df[col] = df[col].cat.add_categories([fill_val])
+        df[col] = df[col].fillna(fill_val)
+        if _is_numeric_dtype_name(recipe['columns'][col]):
+            numeric_missing_filled += na_count
+        else:
+            categorical_missing_filled += na_count
+    for col, fmt in recipe['date_formats'].items():
+        df[col] = parse_datetime(df[col], fmt)
+    df, outliers_capped = _clip_to_bounds(df, {col: tuple(b) for col, b in recipe['clip'].items()})
+    return df, {
+        'numeric_missing_filled': numeric_missing_filled,
+        'categorical_missing_filled': categorical_missing_filled,
+        'converted_date_cols': list(recipe['date_formats']),
+        'outliers_capped': outliers_capped,
+    }
+
+
+def apply_recipe(df: pd.DataFrame, recipe: Dict[str, Any]) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Clean `df` by replaying the recipe of an earlier run.
+
+    Dedup, fills, date conversions and clip bounds come from the recipe, so
+    nothing is profiled or re-decided. Returns the same (df, summary) as
+    `clean_csv_and_summary`; raises RecipeError if `df` does not fit.
+    """
+    validate_recipe(recipe)
+    _check_recipe_fits(df, recipe)
+    original_rows = int(df.shape[0])
+    if recipe['dedup'] is not None:
+        # A copy: _replay assigns columns, which on a masked slice warns (SettingWithCopyWarning)
+        df = df[first_occurrence(get_row_hashes(df, recipe['dedup']['subset']))].copy()
+    df, counts = _replay(df, recipe)
+    df.attrs['date_formats'] = dict(recipe['date_formats'])
+    clear_profile(df)
+    return df, _build_summary(
+        original_rows=original_rows,
+        rows_after_cleaning=int(df.shape[0]),
+        duplicates_removed=original_rows - int(df.shape[0]),
+        auto_clean=bool(recipe['options'].get('autoClean', True)),
+        outlier_detection=bool(recipe['options'].get('outlierDetection', True)),
+        recipe=recipe,
+        **counts,
+    )
+
+
+def _replay_chunked(
+    path: Path, output_path: Path, recipe: Dict[str, Any], chunksize: int, read_options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """`apply_recipe` over a CSV in one streaming pass, for clean_csv_chunked(recipe=...)."""
+    import tempfile
+
+    validate_recipe(recipe)
+    dtypes = recipe['columns']
+    pinned = [col for col, name in dtypes.items() if name in ('object', 'category', 'string')]
+    num_cols = [col for col, name in dtypes.items() if _is_numeric_dtype_name(name)]
+    # A fixed dtype per column keeps every chunk on the output file's schema
+    float_cols = [
+        col for col in num_cols
+        if col in recipe['clip'] or pd.api.types.is_float_dtype(pd.api.types.pandas_dtype(dtypes[col]))
+    ]
+    subset = recipe['dedup']['subset'] if recipe['dedup'] is not None else None
+    original_rows = kept_rows = 0
+    totals = {'numeric_missing_filled': 0, 'categorical_missing_filled': 0}
+    outliers_capped: Dict[str, Any] = {}
+    writer = _ChunkWriter(output_path)
+    with tempfile.TemporaryDirectory(prefix='replay_') as tmp:
+        seen = SeenHashes(Path(tmp))
+        try:
+            for chunk in pd.read_csv(path, chunksize=chunksize, dtype={c: object for c in pinned} or None, **read_options):
+                original_rows += len(chunk)
+                missing = [col for col in dtypes if col not in chunk.columns]
+                if missing:
+                    raise RecipeError(f"The file does not match the cleaning recipe. Missing columns: {missing}")
+                for col in float_cols:
+                    try:
+                        chunk[col] = chunk[col].astype('float64')
+                    except (TypeError, ValueError):
+                        raise RecipeError(f"Column '{col}' must be numeric to apply the cleaning recipe.")
+                _check_recipe_fits(chunk, recipe)
+                if recipe['dedup'] is not None:
+                    chunk = chunk[seen.keep_unseen(row_hashes(chunk, subset))].copy()
+                chunk, counts = _replay(chunk, recipe)
+                kept_rows += len(chunk)
+                for key in totals:
+                    totals[key] += counts[key]
+                _merge_capped(outliers_capped, counts['outliers_capped'])
+                writer.write(chunk)
+        finally:
+            writer.close()
+    return _build_summary(
+        original_rows=original_rows,
+        rows_after_cleaning=kept_rows,
+        duplicates_removed=original_rows - kept_rows,
+        converted_date_cols=list(recipe['date_formats']),
+        outliers_capped=outliers_capped,
+        auto_clean=bool(recipe['options'].get('autoClean', True)),
+        outlier_detection=bool(recipe['options'].get('outlierDetection', True)),
+        recipe=recipe,
+        **totals,
+    )
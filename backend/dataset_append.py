@@ -0,0 +1,555 @@
+"""Incremental appends to an uploaded dataset.
+
+POST /datasets/{name}/append cleans only the new rows and folds them into
+mergeable running aggregates kept next to the cleaned artifact in
+``<cleaned file>.state/``:
+
+- raw (pre-fill) non-null counts and sums per numeric column, and value
+  counts per text column, so mean/mode fills track the whole dataset
+- sorted 64-bit fingerprints of every kept raw row (or of its dedup key
+  columns), in append-only runs,
+  so duplicates are detected against all earlier uploads
+- per numeric column count/mean/M2/min/max and pairwise co-moments of the
+  cleaned values, merged with Chan's parallel update, which give the
+  /upload stats and Pearson correlations without touching stored rows
+- value counts of the cleaned text columns and count/min/max of the
+  datetime columns, for the categorical and datetime stats (raw counts
+  would miss the mode fills)
+
+With APPROX_QUANTILES set, a quantile sketch per numeric column is kept
+as well (``sketches.npz``) and merged with each append, so the median and
+quartiles no longer need a read of the stored column; stats then report
+the sketch's error bound.
+
+Rows already stored keep the fills and IQR clip bounds decided when they
+were cleaned; re-upload the whole file for a full recompute. Datasets
+uploaded with a cleaning recipe clean new rows with the recipe's fixed
+fills and bounds instead of the running ones. The median and quartiles
+are not mergeable, so they are read back from the memory-mapped numeric
+columns of the artifact.
+
+The daily rollup cube (see rollup) is folded forward too, when it is
+current; otherwise it is rebuilt on the next time-series request.
+"""
+from __future__ import annotations
+import json
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from column_profile import column_kind, text_profile
+from correlation import top_pairs
+from data_cleaner import _build_summary, _check_dedup_subset, _merge_capped, _mode_from_counts, _replay
+from date_detection import parse_datetime
+import rollup
+from quantile_sketch import APPROX_QUANTILES, QuantileSketch, sketch_report
+from row_fingerprint import HashRuns, first_occurrence, get_row_hashes, row_hashes
+
+STATE_VERSION = 3
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+
+class AppendSchemaError(ValueError):
+    """The appended rows do not have the dataset's columns."""
+
+
+def state_dir(cleaned_path: Path) -> Path:
+    return cleaned_path.with_name(cleaned_path.name + '.state')
+
+
+def dataset_lock(cleaned_path: Path) -> threading.Lock:
+    """Appends to one dataset are serialised; different datasets run in parallel."""
+    with _locks_guard:
+        return _locks.setdefault(str(cleaned_path), threading.Lock())
+
+
+def clear_state(cleaned_path: Path) -> None:
+    shutil.rmtree(state_dir(cleaned_path), ignore_errors=True)
+
+
+def save_pending(cleaned_path: Path, options: Dict[str, Any]) -> None:
+    """Record upload options so the first append can build the state lazily."""
+    directory = state_dir(cleaned_path)
+    directory.mkdir(exist_ok=True)
+    _write_json(directory / 'state.json', {'version': STATE_VERSION, 'pending': True, 'options': _options(options)})
+
+
+def _options(options: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        'autoClean': bool(options.get('autoClean', True)),
+        'outlierDetection': bool(options.get('outlierDetection', True)),
+        'sheet': options.get('sheet'),
+        'recipe': options.get('recipe'),
+        'dedupKeys': options.get('dedupKeys'),
+    }
+
+
+def dedup_key(options: Dict[str, Any]) -> List[str] | None:
+    """Columns rows are deduplicated on (None: whole rows); a recipe's key wins."""
+    recipe = options.get('recipe')
+    if recipe:
+        return (recipe.get('dedup') or {}).get('subset')
+    return options.get('dedupKeys')
+
+
+def _write_json(path: Path, payload: Dict[str, Any]) -> None:
+    tmp_path = path.with_name(path.name + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, default=str)
+    tmp_path.replace(path)
+
+
+def _numeric_columns(df: pd.DataFrame) -> List[str]:
+    return df.select_dtypes(include=['number']).columns.tolist()
+
+
+def _text_columns(df: pd.DataFrame) -> List[str]:
+    return df.select_dtypes(include=['object', 'category']).columns.tolist()
+
+
+# ---------------------------------------------------------------------------
+# Mergeable moments
+# ---------------------------------------------------------------------------
+
+def _comoments(df: pd.DataFrame, cols: List[str]) -> Dict[str, np.ndarray]:
+    """Pairwise-complete count, means, M2 and co-moments of `cols`.
+
+    Entry [i, j] covers the rows where both column i and column j are
+    non-null (what DataFrame.corr uses); the diagonal is the per-column
+    moment. Values are shifted by the column mean before the products to
+    keep the sums well conditioned.
+    """
+    x = df[cols].to_numpy(dtype='float64', na_value=np.nan) if cols else np.empty((len(df), 0))
+    valid = ~np.isnan(x)
+    w = valid.astype('float64')
+    x0 = np.where(valid, x, 0.0)
+    shift = x0.sum(axis=0) / np.maximum(valid.sum(axis=0), 1)
+    xc = np.where(valid, x - shift, 0.0)
+    n = w.T @ w
+    sx = xc.T @ w          # [i, j]: sum of column i over rows valid in both
+    sxx = (xc * xc).T @ w
+    sxy = xc.T @ xc
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.where(n > 0, sx / n, 0.0)
+        m2 = np.where(n > 0, sxx - sx * mean_x, 0.0)
+        c = np.where(n > 0, sxy - sx * mean_x.T, 0.0)
+    return {
+        'n': n,
+        'mean': mean_x + shift[:, None],
+        'm2': np.maximum(m2, 0.0),
+        'c': c,
+        'min': np.where(valid, x, np.inf).min(axis=0, initial=np.inf),
+        'max': np.where(valid, x, -np.inf).max(axis=0, initial=-np.inf),
+    }
+
+
+def _merge_comoments(a: Dict[str, np.ndarray], b: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    n = a['n'] + b['n']
+    delta = b['mean'] - a['mean']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        weight = np.where(n > 0, a['n'] * b['n'] / n, 0.0)
+        share = np.where(n > 0, b['n'] / n, 0.0)
+    return {
+        'n': n,
+        'mean': a['mean'] + delta * share,
+        'm2': a['m2'] + b['m2'] + delta * delta * weight,
+        'c': a['c'] + b['c'] + delta * delta.T * weight,
+        'min': np.minimum(a['min'], b['min']),
+        'max': np.maximum(a['max'], b['max']),
+    }
+
+
+# ---------------------------------------------------------------------------
+# State build / load / save
+# ---------------------------------------------------------------------------
+
+def _iqr_bounds(cleaned: pd.DataFrame, summary: Dict[str, Any]) -> Dict[str, List[float]]:
+    """Clip bounds the cleaner used, including columns where nothing was clipped."""
+    bounds: Dict[str, List[float]] = {}
+    if not summary.get('outlier_detection'):
+        return bounds
+    capped = summary.get('outliers_capped') or {}
+    for col in _numeric_columns(cleaned):
+        if col in capped:
+            bounds[col] = [capped[col]['lower_bound'], capped[col]['upper_bound']]
+            continue
+        s = cleaned[col]
+        if s.dropna().empty:
+            continue
+        q1, q3 = s.quantile(0.25), s.quantile(0.75)
+        iqr = q3 - q1
+        if pd.isna(iqr) or iqr == 0:
+            continue
+        bounds[col] = [float(q1 - 1.5 * iqr), float(q3 + 1.5 * iqr)]
+    return bounds
+
+
+def profile_raw(raw: pd.DataFrame, auto_clean: bool, dedup_subset: List[str] | None = None) -> Dict[str, Any]:
+    """Raw-side aggregates; take them before cleaning, which may modify `raw` in place.
+
+    The row fingerprints are cached on `raw`, so the cleaner's dedup reuses them.
+    """
+    _check_dedup_subset(raw.columns, dedup_subset)
+    raw_numeric = _numeric_columns(raw)
+    hashes = get_row_hashes(raw, dedup_subset)
+    if auto_clean:
+        kept = first_occurrence(hashes)
+        raw, hashes = raw[kept], hashes[kept]
+    return {
+        'columns': raw.columns.tolist(),
+        'raw_numeric': raw_numeric,
+        'fill_sums': {c: [int(raw[c].notna().sum()), float(raw[c].sum())] for c in raw_numeric},
+        'value_counts': {
+            c: [[v, int(n)] for v, n in raw[c].value_counts(dropna=True).items()] for c in _text_columns(raw)
+        },
+        'hashes': hashes,
+    }
+
+
+def _merge_counts(pairs: List[List[Any]], s: pd.Series) -> List[List[Any]]:
+    """[value, count] pairs (JSON-safe values) with the non-null values of `s` counted in."""
+    counts = {v: n for v, n in pairs}
+    for value, cnt in s.value_counts(dropna=True).items():
+        if cnt:
+            key = value if isinstance(value, (str, int, float, bool)) else str(value)
+            counts[key] = counts.get(key, 0) + int(cnt)
+    return [[v, n] for v, n in counts.items()]
+
+
+def _merge_values(values: Dict[str, Any], cleaned: pd.DataFrame) -> Dict[str, Any]:
+    """Cleaned-side text value counts and datetime count/min/max, with `cleaned`'s rows merged in."""
+    text, datetimes = values['text'], values['datetime']
+    for col in cleaned.columns:
+        kind = column_kind(cleaned[col])
+        if kind == 'text':
+            text[col] = _merge_counts(text.get(col, []), cleaned[col])
+        elif kind == 'datetime':
+            s = cleaned[col].dropna()
+            count, lo, hi = datetimes.get(col, [0, None, None])
+            if len(s):
+                lo = min(pd.Timestamp(lo), s.min()) if lo is not None else s.min()
+                hi = max(pd.Timestamp(hi), s.max()) if hi is not None else s.max()
+            datetimes[col] = [count + int(len(s)), None if lo is None else lo.isoformat(), None if hi is None else hi.isoformat()]
+    return values
+
+
+def build_state(
+    raw_profile: Dict[str, Any], cleaned: pd.DataFrame, summary: Dict[str, Any], options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """Aggregates for a freshly cleaned dataset."""
+    cleaned_numeric = _numeric_columns(cleaned)
+    recipe = options.get('recipe')
+    meta = {k: v for k, v in raw_profile.items() if k != 'hashes'}
+    meta.update({
+        'version': STATE_VERSION,
+        'options': _options(options),
+        'cleaned_numeric': cleaned_numeric,
+        'row_count': int(len(cleaned)),
+        'summary': summary,
+        'bounds': recipe['clip'] if recipe else _iqr_bounds(cleaned, summary),
+        'date_formats': dict(cleaned.attrs.get('date_formats') or {}),
+        'cleaned_values': _merge_values({'text': {}, 'datetime': {}}, cleaned),
+    })
+    sketches = None
+    if APPROX_QUANTILES:
+        sketches = {
+            col: QuantileSketch().update(cleaned[col].to_numpy(dtype='float64', na_value=np.nan))
+            for col in cleaned_numeric
+        }
+    return {
+        'meta': meta, 'hashes': raw_profile['hashes'], 'moments': _comoments(cleaned, cleaned_numeric), 'sketches': sketches,
+    }
+
+
+def save_state(cleaned_path: Path, state: Dict[str, Any]) -> None:
+    directory = state_dir(cleaned_path)
+    if state.get('hashes') is not None:
+        # A fresh build replaces every earlier run
+        shutil.rmtree(directory, ignore_errors=True)
+        directory.mkdir()
+        HashRuns(directory).add(state['hashes'])
+    tmp_path = directory / 'moments.tmp.npz'
+    np.savez(tmp_path, **state['moments'])
+    tmp_path.replace(directory / 'moments.npz')
+    sketches = state.get('sketches')
+    if sketches is not None:
+        cols = state['meta']['cleaned_numeric']
+        tmp_path = directory / 'sketches.tmp.npz'
+        np.savez(tmp_path, **{str(i): sketches[col].items() for i, col in enumerate(cols)})
+        tmp_path.replace(directory / 'sketches.npz')
+        state['meta']['sketches'] = [sketches[col].to_state() for col in cols]
+    _write_json(directory / 'state.json', state['meta'])
+
+
+def load_state(cleaned_path: Path) -> Dict[str, Any] | None:
+    """The saved state, {'pending': True, 'options': ...} before the first append, or None."""
+    directory = state_dir(cleaned_path)
+    try:
+        with open(directory / 'state.json', 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != STATE_VERSION:
+        return None
+    if meta.get('pending'):
+        return meta
+    with np.load(directory / 'moments.npz') as data:
+        moments = {k: data[k] for k in data.files}
+    sketches = None
+    if meta.get('sketches') is not None:
+        with np.load(directory / 'sketches.npz') as data:
+            sketches = {
+                col: QuantileSketch.from_state(meta['sketches'][i], data[str(i)])
+                for i, col in enumerate(meta['cleaned_numeric'])
+            }
+    return {'meta': meta, 'hashes': None, 'moments': moments, 'sketches': sketches}
+
+
+# ---------------------------------------------------------------------------
+# Applying an append
+# ---------------------------------------------------------------------------
+
+def _conform_raw(delta: pd.DataFrame, meta: Dict[str, Any]) -> pd.DataFrame:
+    columns = meta['columns']
+    missing = [c for c in columns if c not in delta.columns]
+    extra = [c for c in delta.columns if c not in columns]
+    if missing or extra:
+        raise AppendSchemaError(
+            f"Appended rows must have the dataset's columns. Missing: {missing or 'none'}; unexpected: {extra or 'none'}"
+        )
+    delta = delta[columns].copy()
+    raw_numeric = set(meta['raw_numeric'])
+    for col in columns:
+        is_numeric = pd.api.types.is_numeric_dtype(delta[col]) and not pd.api.types.is_bool_dtype(delta[col])
+        if col in raw_numeric and not is_numeric:
+            delta[col] = pd.to_numeric(delta[col], errors='coerce')
+        elif col not in raw_numeric and is_numeric:
+            delta[col] = delta[col].astype(object)
+    return delta
+
+
+def _clean_delta(delta: pd.DataFrame, state: Dict[str, Any], directory: Path) -> tuple[pd.DataFrame, np.ndarray]:
+    """Apply the dataset's cleaning decisions to new rows, updating the raw aggregates."""
+    meta = state['meta']
+    summary = meta['summary']
+    auto_clean = summary['auto_clean']
+
+    hashes = row_hashes(delta, dedup_key(meta['options']))
+    if auto_clean:
+        keep = first_occurrence(hashes) & ~HashRuns(directory).contains(hashes)
+        delta, hashes = delta[keep].copy(), hashes[keep]
+
+    # Running raw aggregates first: a full recompute would see the new rows too
+    for col in meta['raw_numeric']:
+        count, total = meta['fill_sums'][col]
+        meta['fill_sums'][col] = [count + int(delta[col].notna().sum()), total + float(delta[col].sum())]
+    for col, pairs in meta['value_counts'].items():
+        meta['value_counts'][col] = _merge_counts(pairs, delta[col])
+
+    recipe = meta['options'].get('recipe')
+    if recipe:
+        delta, counts = _replay(delta, recipe)
+        summary['numeric_missing_filled'] += counts['numeric_missing_filled']
+        summary['categorical_missing_filled'] += counts['categorical_missing_filled']
+        _merge_capped(summary['outliers_capped'], counts['outliers_capped'])
+        return delta.reset_index(drop=True), hashes
+
+    if auto_clean:
+        for col in meta['raw_numeric']:
+            na_count = int(delta[col].isna().sum())
+            if na_count:
+                count, total = meta['fill_sums'][col]
+                delta[col] = delta[col].fillna(total / count if count else np.nan)
+                summary['numeric_missing_filled'] += na_count
+        for col, pairs in meta['value_counts'].items():
+            na_count = int(delta[col].isna().sum())
+            if na_count:
+                delta[col] = delta[col].fillna(_mode_from_counts({v: n for v, n in pairs}))
+                summary['categorical_missing_filled'] += na_count
+
+    for col in summary['date_columns_converted']:
+        delta[col] = parse_datetime(delta[col], meta.get('date_formats', {}).get(col))
+
+    capped: Dict[str, Any] = {}
+    for col, (lower, upper) in meta['bounds'].items():
+        s = delta[col]
+        below, above = int((s < lower).sum()), int((s > upper).sum())
+        if below or above:
+            delta[col] = s.clip(lower, upper)
+            capped[col] = {
+                'lower_bound': lower, 'upper_bound': upper,
+                'count_below': below, 'count_above': above, 'total_capped': below + above,
+            }
+    _merge_capped(summary['outliers_capped'], capped)
+    return delta.reset_index(drop=True), hashes
+
+
+STATS_QUANTILES = [0.25, 0.5, 0.75]
+
+
+def stats_from_state(state: Dict[str, Any], quartiles: Dict[str, List[float]]) -> Dict[str, Any]:
+    """The numeric section of generate_stats() rebuilt from the merged moments.
+
+    `quartiles` maps columns to their STATS_QUANTILES values.
+    """
+    m = state['moments']
+    per_col: Dict[str, Any] = {}
+    for i, col in enumerate(state['meta']['cleaned_numeric']):
+        n = int(m['n'][i, i])
+        if n == 0:
+            continue
+        p25, median, p75 = quartiles.get(col, [np.nan] * 3)
+        per_col[col] = {
+            'mean': float(m['mean'][i, i]),
+            'median': float(median),
+            'std': float(np.sqrt(m['m2'][i, i] / (n - 1))) if n > 1 else 0.0,
+            'min': float(m['min'][i]),
+            'max': float(m['max'][i]),
+            'p25': float(p25),
+            'p75': float(p75),
+            'count': n,
+            'nulls': state['meta']['row_count'] - n,
+        }
+    return {'numeric': per_col}
+
+
+def other_stats_from_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """The categorical and datetime sections of generate_stats() rebuilt from the merged value counts."""
+    from eda_engine import stats_from_profile
+
+    row_count = state['meta']['row_count']
+    values = state['meta']['cleaned_values']
+    profiles: Dict[str, Dict[str, Any]] = {}
+    for col, pairs in values['text'].items():
+        counts = pd.Series([n for _, n in pairs], index=pd.Index([v for v, _ in pairs], dtype=object), dtype='int64')
+        counts = counts.sort_values(ascending=False, kind='stable')
+        profiles[col] = text_profile(counts, row_count - int(counts.sum()))
+    for col, (count, lo, hi) in values['datetime'].items():
+        profiles[col] = {'kind': 'datetime', 'count': count, 'nulls': row_count - count, 'min': lo, 'max': hi}
+    stats = stats_from_profile(profiles)
+    return {'categorical': stats['categorical'], 'datetime': stats['datetime']}
+
+
+def correlations_from_state(state: Dict[str, Any]) -> Dict[str, Any]:
+    """The generate_correlations() result rebuilt from the merged co-moments."""
+    cols = state['meta']['cleaned_numeric']
+    if len(cols) < 2:
+        return {'top_pairs': []}
+    m = state['moments']
+    with np.errstate(invalid='ignore', divide='ignore'):
+        corr = np.clip(m['c'] / np.sqrt(m['m2'] * m['m2'].T), -1.0, 1.0)
+    corr[m['n'] < 1] = np.nan
+    return {'top_pairs': top_pairs(cols, corr, 3)}
+
+
+def append_rows(
+    cleaned_path: Path,
+    artifact_path: Path,
+    delta: pd.DataFrame,
+    bootstrap: Any,
+) -> Dict[str, Any]:
+    """Clean `delta`, append it to the stored dataset and return updated results.
+
+    `bootstrap(options, profile)` must re-clean the stored upload with the
+    upload's options, calling `profile(raw_df)` before cleaning, and return
+    (cleaned_df, summary); it is only called
+    when no state exists yet (datasets cleaned in chunks, served from the
+    upload cache, or uploaded before appends existed).
+    """
+    from dataset_store import (
+        COLUMNAR_SUFFIX, append_columnar, append_text, concat_frames, export_text, read_columnar_table, read_dataset_file,
+    )
+
+    directory = state_dir(cleaned_path)
+    state = load_state(cleaned_path)
+    if state is None or state.get('pending'):
+        options = (state or {}).get('options') or {}
+        raw_profile = None
+
+        def _profile(raw: pd.DataFrame) -> None:
+            nonlocal raw_profile
+            raw_profile = profile_raw(raw, bool(options.get('autoClean', True)), dedup_key(options))
+
+        cleaned, summary = bootstrap(options, _profile)
+        state = build_state(raw_profile, cleaned, summary, options)
+        save_state(cleaned_path, state)
+        del cleaned
+        state['hashes'] = None
+
+    meta = state['meta']
+    rows_received = int(len(delta))
+    delta = _conform_raw(delta, meta)
+    summary = meta['summary']
+    summary['original_rows'] += rows_received
+    cleaned_delta, new_hashes = _clean_delta(delta, state, directory)
+    summary['rows_after_cleaning'] += len(cleaned_delta)
+    # Extra keys from the upload (e.g. memory_optimization) are kept
+    meta['summary'] = {**summary, **_build_summary(
+        original_rows=summary['original_rows'],
+        rows_after_cleaning=summary['rows_after_cleaning'],
+        duplicates_removed=summary['original_rows'] - summary['rows_after_cleaning'],
+        numeric_missing_filled=summary['numeric_missing_filled'],
+        categorical_missing_filled=summary['categorical_missing_filled'],
+        converted_date_cols=summary['date_columns_converted'],
+        outliers_capped=summary['outliers_capped'],
+        auto_clean=summary['auto_clean'],
+        outlier_detection=summary['outlier_detection'],
+    )}
+
+    # Store the rows: a new Arrow part, a CSV append, or (XLSX) a rewrite through a temporary file
+    cube = rollup.load_rollup(cleaned_path, artifact_path) if len(cleaned_delta) else None
+    if len(cleaned_delta):
+        if artifact_path.name.endswith(COLUMNAR_SUFFIX):
+            if not append_columnar(cleaned_delta, artifact_path):
+                raise RuntimeError(f"Could not append to {artifact_path.name}")
+        elif artifact_path.suffix.lower() == '.csv':
+            append_text(cleaned_delta, artifact_path)
+        else:
+            export_text(concat_frames(read_dataset_file(artifact_path), cleaned_delta), artifact_path)
+    if cube is not None:
+        rollup.fold(cleaned_path, cube, cleaned_delta, artifact_path)
+
+    cols = meta['cleaned_numeric']
+    state['moments'] = _merge_comoments(state['moments'], _comoments(cleaned_delta, cols))
+    if len(new_hashes) and meta['summary']['auto_clean']:
+        HashRuns(directory).add(new_hashes)
+    sketches = state.get('sketches')
+    if sketches is not None:
+        for col in cols:
+            sketches[col].update(cleaned_delta[col].to_numpy(dtype='float64', na_value=np.nan))
+    _merge_values(meta['cleaned_values'], cleaned_delta)
+    meta['row_count'] += int(len(cleaned_delta))
+    save_state(cleaned_path, state)
+
+    quartiles: Dict[str, List[float]] = {}
+    if sketches is not None:
+        quartiles = {col: [float(v) for v in sketches[col].quantiles(STATS_QUANTILES)] for col in cols if sketches[col].n}
+    elif cols:
+        if artifact_path.name.endswith(COLUMNAR_SUFFIX):
+            import pyarrow.compute as pc
+            table = read_columnar_table(artifact_path).select(cols)
+            for col in cols:
+                if table.column(col).null_count < len(table):
+                    quartiles[col] = pc.quantile(table.column(col), q=STATS_QUANTILES).to_pylist()
+        else:
+            stored = read_dataset_file(artifact_path)[cols].quantile(STATS_QUANTILES)
+            quartiles = {col: stored[col].tolist() for col in cols}
+    stats = {**stats_from_state(state, quartiles), **other_stats_from_state(state)}
+    if sketches is not None:
+        stats['approximate_quantiles'] = sketch_report(sketches)
+
+    return {
+        'rows_received': rows_received,
+        'rows_appended': int(len(cleaned_delta)),
+        'duplicates_skipped': rows_received - int(len(cleaned_delta)) if meta['summary']['auto_clean'] else 0,
+        'row_count': meta['row_count'],
+        'cleaning_summary': meta['summary'],
+        'stats': stats,
+        'correlations': correlations_from_state(state),
+    }
@@ -0,0 +1,120 @@
+"""In-process dataset registry shared by the read endpoints.
+
+Keeps parsed DataFrames in a memory-bounded LRU so /schema, /visualize,
+/nlviz and /chat stop re-parsing the same cleaned file on every request.
+
+Entries are keyed by (path, mtime, size): rewriting a file on disk
+naturally produces a new key, and /upload also invalidates explicitly so
+the stale frame is released immediately instead of waiting for eviction.
+
+Cached frames are shared between requests and must be treated as read-only.
+"""
+from __future__ import annotations
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import pandas as pd
+
+from dataset_store import read_dataset_file
+
+DEFAULT_MAX_BYTES = int(os.getenv('DATASET_CACHE_MAX_BYTES', str(1024 * 1024 * 1024)))
+
+
+def _frame_nbytes(df: pd.DataFrame) -> int:
+    try:
+        return int(df.memory_usage(index=True, deep=True).sum())
+    except Exception:
+        return 0
+
+
+class DatasetRegistry:
+    """LRU of parsed DataFrames bounded by their total in-memory size."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: OrderedDict[Tuple[str, int, int], Tuple[pd.DataFrame, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    @staticmethod
+    def _key(path: Path) -> Tuple[str, int, int]:
+        st = path.stat()
+        return (str(path.resolve()), st.st_mtime_ns, st.st_size)
+
+    def fingerprint(self, path: Path) -> Tuple[str, int, int]:
+        """(path, mtime, size) of the file's current version: the cache key of its frame."""
+        return self._key(Path(path))
+
+    def get(self, path: Path) -> pd.DataFrame:
+        """Return the parsed DataFrame for `path`, loading it on a miss."""
+        path = Path(path)
+        key = self._key(path)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+
+        # Parse outside the lock so other datasets stay servable meanwhile
+        df = read_dataset_file(path)
+        self.put(path, df, key=key)
+        return df
+
+    def put(self, path: Path, df: pd.DataFrame, key: Tuple[str, int, int] | None = None) -> None:
+        """Insert an already-parsed frame (e.g. the one /upload just wrote)."""
+        path = Path(path)
+        key = key or self._key(path)
+        nbytes = _frame_nbytes(df)
+        with self._lock:
+            # Drop older versions of the same file before inserting the new one
+            self._drop_path_locked(key[0])
+            if nbytes > self.max_bytes:
+                return
+            self._entries[key] = (df, nbytes)
+            self.total_bytes += nbytes
+            while self.total_bytes > self.max_bytes and self._entries:
+                _, (_, evicted_bytes) = self._entries.popitem(last=False)
+                self.total_bytes -= evicted_bytes
+                self.evictions += 1
+
+    def invalidate(self, path: Path) -> bool:
+        """Forget every cached version of `path`. Returns True if anything was dropped."""
+        with self._lock:
+            return self._drop_path_locked(str(Path(path).resolve()))
+
+    def _drop_path_locked(self, resolved: str) -> bool:
+        stale = [k for k in self._entries if k[0] == resolved]
+        for k in stale:
+            _, nbytes = self._entries.pop(k)
+            self.total_bytes -= nbytes
+        return bool(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': (self.hits / lookups) if lookups else 0.0,
+            }
+
+
+# Global registry instance
+registry = DatasetRegistry()
@@ -0,0 +1,223 @@
+"""On-disk storage formats for cleaned datasets.
+
+Cleaned frames are persisted as an uncompressed Arrow IPC (Feather v2)
+sidecar next to the cleaned CSV/XLSX name, e.g.
+``cleaned_outputs/cleaned_sales.csv.arrow``. Reads keep the dtypes the
+cleaner produced (datetimes, categories), so no endpoint re-parses text or
+re-infers types. The file is memory-mapped, which spares the read into an
+intermediate buffer, but `read_columnar` still converts it into a private
+pandas copy; only Arrow-level readers (`read_columnar_table`, e.g. the
+quartiles of an append) work on the mapped buffers without copying. The CSV/XLSX export is only
+materialised when someone asks for it via /download.
+
+Rows appended later (POST /datasets/{name}/append) are written as extra
+Arrow files in ``<sidecar>.parts/`` rather than rewriting the sidecar;
+reads concatenate them, and once DATASET_MAX_PARTS accumulate (or a part
+no longer fits the sidecar's schema) everything is compacted back into
+the single sidecar file.
+
+The cleaning recipe of each dataset (see data_cleaner) is kept as JSON in
+``<cleaned name>.recipe.json``, so later uploads of the same feed can
+replay it.
+
+The daily rollup cube of the time-series charts (see rollup) is kept in
+``<cleaned name>.rollup.arrow``.
+
+If pyarrow is not installed, or a frame cannot be represented in Arrow
+(e.g. mixed-type object columns), callers fall back to the text export.
+"""
+from __future__ import annotations
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.feather as feather
+except ImportError:
+    pa = None
+    pc = None
+    feather = None
+
+COLUMNAR_SUFFIX = '.arrow'
+RECIPE_SUFFIX = '.recipe.json'
+ROLLUP_SUFFIX = '.rollup.arrow'
+DATASET_MAX_PARTS = int(os.getenv('DATASET_MAX_PARTS', '16'))
+
+
+def columnar_path(cleaned_path: Path) -> Path:
+    """Sidecar location for a cleaned CSV/XLSX path."""
+    return cleaned_path.with_name(cleaned_path.name + COLUMNAR_SUFFIX)
+
+
+def export_path(columnar: Path) -> Path:
+    """CSV/XLSX export location for a sidecar path."""
+    return columnar.with_name(columnar.name[:-len(COLUMNAR_SUFFIX)])
+
+
+def recipe_path(cleaned_path: Path) -> Path:
+    """Cleaning recipe location for a cleaned CSV/XLSX path."""
+    return cleaned_path.with_name(cleaned_path.name + RECIPE_SUFFIX)
+
+
+def rollup_path(cleaned_path: Path) -> Path:
+    """Daily rollup cube location for a cleaned CSV/XLSX path."""
+    return cleaned_path.with_name(cleaned_path.name + ROLLUP_SUFFIX)
+
+
+def save_recipe(cleaned_path: Path, recipe: Dict[str, Any]) -> None:
+    path = recipe_path(cleaned_path)
+    tmp_path = path.with_name(path.name + '.tmp')
+    tmp_path.write_text(json.dumps(recipe, indent=2), encoding='utf-8')
+    tmp_path.replace(path)
+
+
+def load_recipe(cleaned_path: Path) -> Dict[str, Any] | None:
+    path = recipe_path(cleaned_path)
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding='utf-8'))
+
+
+def write_columnar(df: pd.DataFrame, path: Path) -> bool:
+    """Write `df` as an uncompressed Arrow IPC file. Returns False if not possible."""
+    if feather is None:
+        return False
+    if not all(isinstance(c, str) for c in df.columns):
+        return False
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        # Uncompressed so reads can memory-map the buffers directly
+        feather.write_feather(df.reset_index(drop=True), tmp_path, compression='uncompressed')
+        tmp_path.replace(path)
+        return True
+    except Exception as e:
+        print(f"[STORE] Columnar write failed for {path.name}: {type(e).__name__}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def columnar_parts(path: Path) -> list[Path]:
+    """Appended part files of a sidecar, oldest first."""
+    parts_dir = path.with_name(path.name + '.parts')
+    if not parts_dir.is_dir():
+        return []
+    return sorted(parts_dir.glob('*' + COLUMNAR_SUFFIX))
+
+
+def read_columnar_table(path: Path):
+    """The sidecar plus its appended parts as one memory-mapped Arrow table."""
+    tables = [feather.read_table(p, memory_map=True) for p in [path, *columnar_parts(path)]]
+    return tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+
+
+def read_columnar(path: Path) -> pd.DataFrame:
+    """The sidecar plus its parts as a DataFrame (a full copy in pandas memory)."""
+    return read_columnar_table(path).to_pandas()
+
+
+def _conform(table, schema):
+    """Cast an appended table to the sidecar schema; raises if that would lose data."""
+    columns = []
+    for field in schema:
+        col = table.column(field.name)
+        if pa.types.is_dictionary(field.type) and not pa.types.is_dictionary(col.type):
+            col = pc.dictionary_encode(col)
+        columns.append(col.cast(field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def append_columnar(df: pd.DataFrame, path: Path) -> bool:
+    """Append rows to an existing sidecar. Returns False if not possible.
+
+    The rows go to a new part file when they fit the sidecar schema;
+    otherwise (or when too many parts exist) the sidecar is rewritten with
+    all rows. The sidecar's mtime is bumped either way so registry keys
+    and /download exports see the change.
+    """
+    if feather is None or not path.exists():
+        return False
+    parts = columnar_parts(path)
+    schema = feather.read_table(path, memory_map=True).schema
+    try:
+        table = _conform(pa.Table.from_pandas(df.reset_index(drop=True), preserve_index=False), schema)
+    except (pa.ArrowInvalid, pa.ArrowNotImplementedError, pa.ArrowTypeError, KeyError):
+        table = None
+    if table is None or len(parts) + 1 >= DATASET_MAX_PARTS:
+        # Compact: widen dtypes as pandas would and fold every part into the sidecar
+        combined = concat_frames(read_columnar(path), df)
+        if not write_columnar(combined, path):
+            return False
+        remove_columnar_parts(path)
+        return True
+    parts_dir = path.with_name(path.name + '.parts')
+    parts_dir.mkdir(exist_ok=True)
+    seq = int(parts[-1].name.split('.')[0]) + 1 if parts else 1
+    part_path = parts_dir / f"{seq:06d}{COLUMNAR_SUFFIX}"
+    tmp_path = part_path.with_name(part_path.name + '.tmp')
+    feather.write_feather(table, tmp_path, compression='uncompressed')
+    tmp_path.replace(part_path)
+    os.utime(path)
+    return True
+
+
+def remove_columnar_parts(path: Path) -> None:
+    shutil.rmtree(path.with_name(path.name + '.parts'), ignore_errors=True)
+
+
+def concat_frames(base: pd.DataFrame, extra: pd.DataFrame) -> pd.DataFrame:
+    """Row-wise concat that keeps categorical columns categorical."""
+    extra = extra[base.columns]
+    for col in base.columns:
+        if isinstance(base[col].dtype, pd.CategoricalDtype):
+            cats = base[col].cat.categories.union(pd.Index(extra[col].dropna().unique()), sort=False)
+            base = base.assign(**{col: base[col].cat.set_categories(cats)})
+            extra = extra.assign(**{col: pd.Categorical(extra[col], categories=cats)})
+    return pd.concat([base, extra], ignore_index=True)
+
+
+def _text_tmp_path(path: Path) -> Path:
+    # The writers pick CSV or Excel by suffix, so the temporary name keeps it
+    return path.with_name(f".{path.stem}.tmp{path.suffix}")
+
+
+def export_text(df: pd.DataFrame, path: Path) -> None:
+    """Write the CSV/XLSX export used by /download (replacing any previous file in one step)."""
+    tmp_path = _text_tmp_path(path)
+    try:
+        if path.suffix.lower() == '.csv':
+            df.to_csv(tmp_path, index=False)
+        else:
+            df.to_excel(tmp_path, index=False)
+        tmp_path.replace(path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def append_text(df: pd.DataFrame, path: Path) -> None:
+    """Append rows to a CSV dataset in place; a failed append is cut back off."""
+    size = path.stat().st_size
+    try:
+        df.to_csv(path, mode='a', header=False, index=False)
+    except BaseException:
+        with open(path, 'r+b') as f:
+            f.truncate(size)
+        raise
+
+
+def read_dataset_file(path: Path) -> pd.DataFrame:
+    """Parse a dataset file from disk based on its extension."""
+    suffix = path.suffix.lower()
+    if suffix == COLUMNAR_SUFFIX:
+        return read_columnar(path)
+    if suffix == '.csv':
+        return pd.read_csv(path)
+    if suffix == '.xlsx':
+        from ingest import read_excel_streaming
+        return read_excel_streaming(path)[0]
+    return pd.read_excel(path)
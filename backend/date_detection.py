@@ -0,0 +1,138 @@
+"""Sample-based datetime detection with cached, explicit formats.
+
+Deciding whether a text column holds dates used to mean running
+`pd.to_datetime` over the whole column, and parsing it again to convert
+it. Here a bounded random sample (DATE_SAMPLE_ROWS) picks an explicit
+format string, the share of parseable values and the number of distinct
+dates; the format then drives one vectorised conversion. Columns no
+single format fits use pandas' per-element 'mixed' parsing, as before.
+
+Results are cached per column of each frame object (dropped when the
+frame is garbage-collected, as column_profile does), so the cleaner, the
+EDA charts, `infer_schema` and `interpret_prompt` looking at the same
+frame (e.g. one held by the dataset registry) sniff each column once.
+Not in `df.attrs`: pandas copies attrs onto derived frames, whose columns
+can differ while matching the cache key.
+
+Config (env):
+- DATE_SAMPLE_ROWS: values sampled per column for detection (default 1000)
+"""
+from __future__ import annotations
+import os
+import threading
+import weakref
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+
+try:
+    from pandas.tseries.api import guess_datetime_format
+except ImportError:  # pandas < 2.2
+    from pandas._libs.tslibs.parsing import guess_datetime_format
+
+DATE_SAMPLE_ROWS = int(os.getenv('DATE_SAMPLE_ROWS', '1000'))
+MAX_FORMAT_GUESSES = 5
+MIXED_PROBE_VALUES = 20
+# id(frame) -> column -> cached sniff result
+_profiles: Dict[int, Dict[str, Dict[str, Any]]] = {}
+_profiles_lock = threading.Lock()
+
+
+def _to_datetime(values: pd.Series, fmt: str) -> pd.Series:
+    try:
+        return pd.to_datetime(values, format=fmt, errors='coerce')
+    except (ValueError, TypeError):
+        # e.g. mixed UTC offsets under a %z format
+        return pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+
+
+def infer_datetime_format(values: pd.Series) -> str | None:
+    """Best format for non-null `values`: an explicit strftime format,
+    'mixed' when only per-element parsing works, or None if nothing parses."""
+    values = values.dropna()
+    if values.empty:
+        return None
+    candidates: list[str] = []
+    # The first value's format is what pandas itself would have inferred
+    for value in values.drop_duplicates().head(MAX_FORMAT_GUESSES):
+        if isinstance(value, str):
+            fmt = guess_datetime_format(value)
+            if fmt and fmt not in candidates:
+                candidates.append(fmt)
+    best, best_parsed = None, 0
+    for fmt in candidates:
+        parsed = int(_to_datetime(values, fmt).notna().sum())
+        if parsed > best_parsed:
+            best, best_parsed = fmt, parsed
+    if best_parsed < len(values):
+        # Per-element parsing is slow on text that is not dates; probe a few values first
+        probe = values.drop_duplicates().head(MIXED_PROBE_VALUES)
+        if best is None and _to_datetime(probe, 'mixed').isna().all():
+            return None
+        mixed = int(_to_datetime(values, 'mixed').notna().sum())
+        if mixed > best_parsed:
+            best = 'mixed'
+    return best
+
+
+def sniff_datetime(s: pd.Series, sample_rows: int = DATE_SAMPLE_ROWS) -> Dict[str, Any]:
+    """Detect dates on a sample of `s`.
+
+    Returns {'format', 'ratio', 'unique'}: the inferred format, the
+    estimated share of all rows (nulls included) that parse, and the
+    number of distinct dates seen in the sample.
+    """
+    if len(s) > sample_rows:
+        s = s.sample(n=sample_rows, random_state=0)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        s = s.astype(object)
+    fmt = infer_datetime_format(s)
+    if fmt is None or not len(s):
+        return {'format': None, 'ratio': 0.0, 'unique': 0}
+    parsed = _to_datetime(s, fmt)
+    return {'format': fmt, 'ratio': float(parsed.notna().mean()), 'unique': int(parsed.nunique(dropna=True))}
+
+
+def datetime_profile(df: pd.DataFrame, col: str) -> Dict[str, Any]:
+    """`sniff_datetime` for df[col], cached on the frame."""
+    s = df[col]
+    key = (str(s.dtype), len(s), int(s.isna().sum()))
+    cache = _profiles.get(id(df))
+    if cache is None:
+        with _profiles_lock:
+            cache = _profiles.get(id(df))
+            if cache is None:
+                cache = _profiles[id(df)] = {}
+                weakref.finalize(df, _profiles.pop, id(df), None)
+    entry = cache.get(col)
+    if entry is None or entry['key'] != key:
+        entry = {'key': key, **sniff_datetime(s)}
+        cache[col] = entry
+    return entry
+
+
+def parse_datetime(s: pd.Series, fmt: str | None = None) -> pd.Series:
+    """Convert `s` to datetime64 with one vectorised pass (format sniffed if not given)."""
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    if fmt is None:
+        fmt = sniff_datetime(s)['format']
+    if fmt is None:
+        return pd.Series(pd.NaT, index=s.index, dtype='datetime64[ns]', name=s.name)
+    if isinstance(s.dtype, pd.CategoricalDtype):
+        # Parse each category once and broadcast through the codes
+        categories = _to_datetime(pd.Series(s.cat.categories), fmt)
+        codes = s.cat.codes.to_numpy()
+        values = categories.take(np.where(codes >= 0, codes, 0)).to_numpy() if len(categories) else np.full(len(s), np.datetime64('NaT'))
+        out = pd.Series(values, index=s.index, name=s.name)
+        return out.where(codes >= 0)
+    return _to_datetime(s, fmt)
+
+
+def column_to_datetime(df: pd.DataFrame, col: str) -> pd.Series:
+    """df[col] as datetime64, reusing the cached format for text columns."""
+    s = df[col]
+    if pd.api.types.is_datetime64_any_dtype(s):
+        return s
+    return parse_datetime(s, datetime_profile(df, col)['format'])
@@ -42,6 +42,20 @@ def init_db() -> None:
         """
     )
 
+    # Stats, correlations, charts and insights per dataset version (eda_cache)
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS eda_reports (
+            cache_key TEXT PRIMARY KEY,
+            dataset TEXT NOT NULL,
+            eda_version TEXT NOT NULL,
+            report_json TEXT NOT NULL,
+            created_at INTEGER NOT NULL
+        )
+        """
+    )
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_eda_reports_dataset ON eda_reports(dataset)")
+
     conn.commit()
     conn.close()
 
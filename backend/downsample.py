@@ -0,0 +1,177 @@
+"""Server-side downsampling for point-heavy Plotly figures.
+
+Scatter and line figures embed every point in their JSON, so a
+multi-million-row dataset produces a response the browser cannot load.
+Before a figure is built its rows are reduced to a point budget:
+
+- lines: `lttb` (Largest-Triangle-Three-Buckets) keeps the points that
+  shape the curve, one per bucket, plus the first and last;
+- scatter: `sample_rows` draws a seeded uniform sample, which keeps the
+  point density; with a `color` column each colour is sampled in
+  proportion to its share, and every colour keeps at least one point;
+- scatter above PLOT_DENSITY_ROWS plottable rows (numeric axes, no colour):
+  a 2D histogram of counts replaces the points.
+
+`annotate` records {'original', 'rendered', 'method'} in the figure's
+layout.meta and, when points were dropped, says so under the plot.
+The budget comes from a request's `max_points`, else PLOT_MAX_POINTS.
+
+Config (env):
+- PLOT_MAX_POINTS: points rendered per scatter/line figure (default 5000)
+- PLOT_DENSITY_ROWS: plottable scatter rows above which a 2D histogram is drawn (default 200k)
+- PLOT_DENSITY_BINS: bins per axis of that histogram (default 100)
+"""
+from __future__ import annotations
+import os
+import threading
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+PLOT_MAX_POINTS = int(os.getenv('PLOT_MAX_POINTS', '5000'))
+PLOT_DENSITY_ROWS = int(os.getenv('PLOT_DENSITY_ROWS', str(200_000)))
+PLOT_DENSITY_BINS = int(os.getenv('PLOT_DENSITY_BINS', '100'))
+
+# plotly.express and go.Figure read the shared default template, whose child objects are
+# created on first read; two threads doing that at once break it. Hold this around px
+# calls and figure construction.
+px_lock = threading.Lock()
+
+
+def point_budget(cfg: Dict[str, Any] | None = None) -> int:
+    """The request's `max_points`, else PLOT_MAX_POINTS; raises ValueError when it is not a positive integer."""
+    value = (cfg or {}).get('max_points')
+    if value is None:
+        return PLOT_MAX_POINTS
+    try:
+        budget = int(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"max_points must be an integer, got {value!r}")
+    if budget < 1:
+        raise ValueError('max_points must be at least 1')
+    return budget
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Positions of the `n_out` points LTTB keeps from the series (x sorted, no NaN)."""
+    n = len(x)
+    if n_out >= n:
+        return np.arange(n)
+    if n_out < 3:
+        return np.array([0, n - 1][:max(n_out, 1)])
+    x = np.asarray(x, dtype='float64')
+    y = np.asarray(y, dtype='float64')
+    # Buckets between the fixed first and last points; one more "bucket" holds the last point
+    edges = np.floor(np.arange(n_out - 1) * (n - 2) / (n_out - 2)).astype(np.int64) + 1
+    edges[-1] = n - 1
+    counts = np.diff(np.append(edges, n))
+    x_avg = np.add.reduceat(x, edges) / counts
+    y_avg = np.add.reduceat(y, edges) / counts
+
+    keep = np.empty(n_out, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        start, end = edges[i], edges[i + 1]
+        # Twice the triangle area between the previous pick, each candidate and the next bucket's mean
+        area = np.abs((x[a] - x_avg[i + 1]) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (y_avg[i + 1] - y[a]))
+        a = start + int(np.argmax(area))
+        keep[i + 1] = a
+    return keep
+
+
+def sample_rows(n: int, budget: int, strata: pd.Series | None = None, seed: int = 0) -> np.ndarray:
+    """Sorted positions of a seeded sample of about `budget` of `n` rows, stratified on `strata` if given."""
+    if n <= budget:
+        return np.arange(n)
+    rng = np.random.default_rng(seed)
+    if strata is None:
+        return np.sort(rng.choice(n, size=budget, replace=False))
+    codes, _ = pd.factorize(strata, use_na_sentinel=False)
+    counts = np.bincount(codes)
+    # Proportional allocation, remainders to the largest fractions
+    share = budget * counts / n
+    alloc = np.floor(share).astype(np.int64)
+    alloc[np.argsort(-(share - alloc), kind='stable')[:budget - int(alloc.sum())]] += 1
+    if len(counts) <= budget:
+        # Rare groups keep one point so every colour stays in the legend
+        alloc = np.maximum(alloc, 1)
+    order = np.argsort(codes, kind='stable')
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+    picks = [
+        rng.choice(order[s:s + c], size=min(a, c), replace=False)
+        for s, c, a in zip(starts, counts, alloc) if a
+    ]
+    return np.sort(np.concatenate(picks))
+
+
+def annotate(fig: go.Figure, original: int, rendered: int, method: str | None) -> go.Figure:
+    """Record the point counts in layout.meta and note any reduction under the plot."""
+    fig.update_layout(meta={'points': {'original': int(original), 'rendered': int(rendered), 'method': method}})
+    if method is not None:
+        fig.add_annotation(
+            text=f"Showing {rendered:,} of {original:,} points ({method})",
+            xref='paper', yref='paper', x=1, y=-0.15, xanchor='right', showarrow=False, font={'size': 10},
+        )
+    return fig
+
+
+def line_frame(frame: pd.DataFrame, x: str, y: str, budget: int) -> pd.DataFrame:
+    """`frame` sorted by `x` and reduced with LTTB when it has more than `budget` rows."""
+    frame = frame.dropna(subset=[x, y]).sort_values(x, kind='stable')
+    if len(frame) <= budget:
+        return frame
+    xs = frame[x]
+    xs = xs.astype('int64') if pd.api.types.is_datetime64_any_dtype(xs) else xs
+    return frame.iloc[lttb(xs.to_numpy(dtype='float64'), frame[y].to_numpy(dtype='float64'), budget)]
+
+
+def line_figure(frame: pd.DataFrame, x: str, y: str, title: str, max_points: int | None = None) -> go.Figure:
+    """px.line of `y` over `x`, reduced to the point budget with LTTB."""
+    budget = PLOT_MAX_POINTS if max_points is None else max_points
+    plotted = frame.dropna(subset=[x, y])
+    reduced = line_frame(plotted, x, y, budget)
+    with px_lock:
+        fig = px.line(reduced, x=x, y=y, title=title)
+    return annotate(fig, len(plotted), len(reduced), 'lttb' if len(reduced) < len(plotted) else None)
+
+
+def _density_figure(frame: pd.DataFrame, x: str, y: str, title: str) -> go.Figure:
+    xs, ys = frame[x].to_numpy(dtype='float64'), frame[y].to_numpy(dtype='float64')
+    counts, x_edges, y_edges = np.histogram2d(xs, ys, bins=PLOT_DENSITY_BINS)
+    z = counts.T.astype(object)
+    # Empty cells stay transparent instead of drawing the lowest colour
+    z[counts.T == 0] = None
+    with px_lock:
+        fig = go.Figure(go.Heatmap(
+            x=(x_edges[:-1] + x_edges[1:]) / 2, y=(y_edges[:-1] + y_edges[1:]) / 2, z=z.tolist(),
+            colorscale='Viridis', colorbar={'title': 'count'},
+        ))
+        fig.update_layout(title=title, xaxis_title=x, yaxis_title=y)
+    return fig
+
+
+def scatter_figure(
+    df: pd.DataFrame, x: str, y: str, title: str, color: str | None = None, max_points: int | None = None,
+) -> go.Figure:
+    """px.scatter of `df`, sampled to the point budget or drawn as a 2D histogram when very large."""
+    budget = PLOT_MAX_POINTS if max_points is None else max_points
+    frame = df[[c for c in dict.fromkeys([x, y, color]) if c is not None]].dropna(subset=[x, y])
+    n = len(frame)
+    numeric_axes = all(pd.api.types.is_numeric_dtype(frame[c]) and not pd.api.types.is_bool_dtype(frame[c]) for c in (x, y))
+    if color is None and numeric_axes and n > max(PLOT_DENSITY_ROWS, budget):
+        return annotate(_density_figure(frame, x, y, title), n, PLOT_DENSITY_BINS ** 2, 'histogram2d')
+    strata = None
+    if color is not None and not pd.api.types.is_numeric_dtype(frame[color]):
+        strata = frame[color]
+    positions = sample_rows(n, budget, strata)
+    method = None
+    if len(positions) < n:
+        frame = frame.iloc[positions]
+        method = 'stratified sample' if strata is not None else 'sample'
+    with px_lock:
+        fig = px.scatter(frame, x=x, y=y, color=color, title=title)
+    return annotate(fig, n, len(frame), method)
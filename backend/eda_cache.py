@@ -0,0 +1,198 @@
+"""Persistent EDA reports (stats, correlations, charts, insights) in SQLite.
+
+/upload computes a dataset's report once; it is stored in the
+``eda_reports`` table of db.py so GET /datasets/{name}/report can serve it
+again after a page reload or to another user without re-running EDA.
+
+A report's key hashes:
+- the dataset name and its stored file's (name, mtime, size), so a
+  re-upload or an append, which rewrite or touch the file, misses;
+- the cleaning options from the dataset's recipe;
+- EDA_VERSION, a hash of the source of the modules that build reports,
+  so a code change invalidates every stored report without a manual bump.
+
+Only the newest report of each dataset is kept. Storage errors are logged
+and only cost a future recomputation.
+
+Insights come from the upload (an LLM call with the cleaning summary) and
+are never generated here: a report rebuilt after an append or a code
+change carries over the dataset's last stored insights, or has none.
+
+`refresh_exact` replaces a sampled report (eda_sampling) with the exact one,
+computed on a background thread, unless the dataset changed meanwhile. It
+recomputes stats, correlations and charts and keeps the upload's insights.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import db
+
+# Modules whose code shapes a report; editing any of them changes EDA_VERSION
+EDA_MODULES = (
+    'eda_engine.py', 'eda_sampling.py', 'column_profile.py', 'correlation.py', 'date_detection.py',
+    'downsample.py', 'figure_json.py', 'openai_summary.py', 'rollup.py', 'eda_cache.py',
+)
+REPORT_FIELDS = ('columns', 'row_count', 'stats', 'correlations', 'charts', 'insights', 'approximate', 'eda_sample')
+
+_schema_ready: set = set()  # DB paths whose eda_reports table exists
+_refresh_pool: ThreadPoolExecutor | None = None
+_refresh_lock = threading.Lock()
+
+
+def _code_version() -> str:
+    digest = hashlib.sha256()
+    here = Path(__file__).resolve().parent
+    for name in EDA_MODULES:
+        digest.update(name.encode('utf-8'))
+        digest.update((here / name).read_bytes())
+    return digest.hexdigest()[:16]
+
+
+EDA_VERSION = _code_version()
+
+
+def recipe_options(recipe: Dict[str, Any] | None) -> Dict[str, Any]:
+    """The cleaning options recorded in a dataset's recipe (empty for raw uploads)."""
+    if not recipe:
+        return {}
+    return {'options': recipe.get('options'), 'dedup': recipe.get('dedup')}
+
+
+def report_key(dataset: str, path: Path, options: Dict[str, Any]) -> str:
+    """Cache key of the report of `dataset` as currently stored at `path`."""
+    st = Path(path).stat()
+    key = json.dumps({
+        'version': EDA_VERSION,
+        'dataset': dataset,
+        'file': [Path(path).name, st.st_mtime_ns, st.st_size],
+        'options': options,
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _connect():
+    """A connection to the app database, creating the table on first use in this process (pool workers too)."""
+    if str(db.DB_PATH) not in _schema_ready:
+        db.init_db()
+        _schema_ready.add(str(db.DB_PATH))
+    return db.get_conn()
+
+
+def lookup(key: str) -> Dict[str, Any] | None:
+    """The stored report for `key`, or None."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT report_json FROM eda_reports WHERE cache_key = ?", (key,)).fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[EDA CACHE] Lookup failed: {type(e).__name__}: {e}")
+        return None
+    return json.loads(row['report_json']) if row is not None else None
+
+
+def store(key: str, dataset: str, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Save the report fields of `result` (an /upload response or a fresh report) and return them."""
+    # Responses cached before sample mode existed have no approximate/eda_sample
+    report = {field: result.get(field) for field in REPORT_FIELDS}
+    try:
+        conn = _connect()
+        try:
+            with conn:
+                # Earlier versions of the dataset can no longer be requested
+                conn.execute("DELETE FROM eda_reports WHERE dataset = ?", (dataset,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO eda_reports (cache_key, dataset, eda_version, report_json, created_at) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (key, dataset, EDA_VERSION, json.dumps(report), db.now_ts()),
+                )
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[EDA CACHE] Failed to store {dataset}: {type(e).__name__}: {e}")
+    return report
+
+
+def latest_insights(dataset: str) -> List[str] | None:
+    """The insights of the dataset's stored report, whichever version it describes; None if there is none."""
+    try:
+        conn = _connect()
+        try:
+            row = conn.execute(
+                "SELECT report_json FROM eda_reports WHERE dataset = ? ORDER BY created_at DESC LIMIT 1", (dataset,),
+            ).fetchone()
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"[EDA CACHE] Lookup failed: {type(e).__name__}: {e}")
+        return None
+    return json.loads(row['report_json']).get('insights') if row is not None else None
+
+
+def build_report(df, insights: List[str] | None = None) -> Dict[str, Any]:
+    """Compute the report fields for a cleaned frame (the /upload EDA steps, without the LLM call).
+
+    `insights` are passed through as they are (None when there are none).
+    """
+    from eda_engine import generate_charts, generate_correlations, generate_stats
+
+    return {
+        'columns': df.columns.tolist(),
+        'row_count': int(df.shape[0]),
+        'stats': generate_stats(df),
+        'correlations': generate_correlations(df),
+        'charts': generate_charts(df),
+        'insights': insights,
+        'approximate': False,
+        'eda_sample': None,
+    }
+
+
+def _refresh(
+    dataset: str, path: Path, options: Dict[str, Any], key: str, insights: List[str],
+    on_exact: Callable[[Dict[str, Any]], None] | None,
+) -> None:
+    from dataset_store import read_dataset_file
+
+    try:
+        report = build_report(read_dataset_file(path), insights)
+        # A re-upload or append while this ran has stored a newer report; keep that one
+        if report_key(dataset, path, options) == key:
+            store(key, dataset, report)
+            if on_exact is not None:
+                on_exact(report)
+            print(f"[EDA CACHE] Exact report ready for {dataset}")
+    except Exception as e:
+        print(f"[EDA CACHE] Exact report for {dataset} failed: {type(e).__name__}: {e}")
+
+
+def refresh_exact(
+    dataset: str, path: Path, options: Dict[str, Any], insights: List[str],
+    on_exact: Callable[[Dict[str, Any]], None] | None = None,
+) -> None:
+    """Compute the exact report of `dataset` in the background and store it over the current one.
+
+    The sampled report's `insights` are carried over. `on_exact(report)` is
+    called once the exact report is stored (not if the dataset changed).
+    """
+    global _refresh_pool
+    key = report_key(dataset, path, options)
+    with _refresh_lock:
+        if _refresh_pool is None:
+            # One at a time: each run reads a whole (large) dataset
+            _refresh_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='eda-exact')
+        _refresh_pool.submit(_refresh, dataset, Path(path), options, key, insights, on_exact)
+
+
+def shutdown() -> None:
+    global _refresh_pool
+    with _refresh_lock:
+        if _refresh_pool is not None:
+            _refresh_pool.shutdown(wait=False, cancel_futures=True)
+            _refresh_pool = None
@@ -1,54 +1,137 @@
 """EDA engine to compute stats, detect correlations, and generate Plotly charts.
+
+`generate_stats` reads every column's summary from the frame's single-pass
+profile (column_profile): moments and percentiles of the numeric block,
+top values, frequencies and string lengths of text columns, and the range
+of datetime columns. Correlations come from the block-wise engine in
+correlation. `cached_stats` keeps results per dataset fingerprint
+so repeated questions about one dataset (/chat) reuse them.
+
+`generate_charts` builds its charts on a small thread pool. The pandas
+groupbys and the numpy parts of encoding release the GIL for some of
+their time and overlap; Plotly figure construction is serialised by
+px_lock, so charts overlap only as far as their aggregation goes. A chart
+that fails or runs past its time budget (counted from when it starts) is
+replaced by a histogram of a row sample instead of holding up /upload.
+
+Config (env):
+- STATS_CACHE_ENTRIES: datasets whose stats are kept in memory (default 64)
+- CHART_WORKERS: threads building overview charts (default 4)
+- CHART_TIMEOUT_SECONDS: budget per overview chart; 0 waits for all (default 10)
 """
 from __future__ import annotations
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import plotly.io as pio
-import json
-from typing import Dict, Any, List
+from typing import Callable, Dict, Any, Hashable, List
+
+from column_profile import get_profile
+from correlation import get_correlations, top_pairs
+from date_detection import column_to_datetime, datetime_profile
+from downsample import line_figure, px_lock, scatter_figure
+from figure_json import figure_payload
+from rollup import time_series as rollup_series
+
+STATS_CACHE_ENTRIES = int(os.getenv('STATS_CACHE_ENTRIES', '64'))
+CHART_WORKERS = int(os.getenv('CHART_WORKERS', '4'))
+CHART_TIMEOUT_SECONDS = float(os.getenv('CHART_TIMEOUT_SECONDS', '10'))
+
+_stats_cache: OrderedDict[Hashable, Dict[str, Any]] = OrderedDict()
+_stats_lock = threading.Lock()
+
+_chart_pool: ThreadPoolExecutor | None = None
+_chart_pool_lock = threading.Lock()
+# Rows behind the histogram that stands in for a failed or late chart
+FALLBACK_CHART_ROWS = 10_000
+# How often generate_charts checks the running charts against their budgets
+_POLL_SECONDS = 0.05
+
+
+def _json_scalar(value: Any) -> Any:
+    """Top values as JSON-safe scalars (object columns can hold dates, decimals, ...)."""
+    if value is None or isinstance(value, (str, int, float, bool)):
+        return value
+    return str(value)
 
 
 def generate_stats(df: pd.DataFrame) -> Dict[str, Any]:
+    # Every section comes from the frame's cached single-pass profile
+    return stats_from_profile(get_profile(df))
+
+
+def stats_from_profile(profiles: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """The numeric, categorical and datetime sections for column profiles (column_profile's format)."""
     stats: Dict[str, Any] = {}
-    num_df = df.select_dtypes(include=['number'])
-    if not num_df.empty:
-        desc = num_df.describe().to_dict()
-        # Ensure basic stats are present explicitly per column
-        per_col = {}
-        for col in num_df.columns:
-            s = num_df[col].dropna()
-            if s.empty:
-                continue
+    per_col = {}
+    categorical = {}
+    datetimes = {}
+    for col, p in profiles.items():
+        if not p['count']:
+            continue
+        if p['kind'] == 'number':
             per_col[col] = {
-                'mean': float(s.mean()),
-                'median': float(s.median()),
-                'std': float(s.std(ddof=1)) if len(s) > 1 else 0.0,
-                'min': float(s.min()),
-                'max': float(s.max()),
+                'mean': p['mean'],
+                'median': p['quantiles'][0.5],
+                'std': p['std'],
+                'min': p['min'],
+                'max': p['max'],
+                'p25': p['quantiles'][0.25],
+                'p75': p['quantiles'][0.75],
+                'count': p['count'],
+                'nulls': p['nulls'],
+            }
+        elif p['kind'] == 'text':
+            categorical[col] = {
+                'top': _json_scalar(p['top']),
+                'freq': p['freq'],
+                'top_values': [[_json_scalar(v), n] for v, n in p['top_values']],
+                'distinct': p['distinct'],
+                'count': p['count'],
+                'nulls': p['nulls'],
+                'length': p['length'],
             }
-        stats['numeric'] = per_col
-    else:
-        stats['numeric'] = {}
+        elif p['kind'] == 'datetime':
+            lo, hi = pd.Timestamp(p['min']), pd.Timestamp(p['max'])
+            datetimes[col] = {
+                'min': lo.isoformat(),
+                'max': hi.isoformat(),
+                'span_days': (hi - lo) / pd.Timedelta(days=1),
+                'count': p['count'],
+                'nulls': p['nulls'],
+            }
+    stats['numeric'] = per_col
+    stats['categorical'] = categorical
+    stats['datetime'] = datetimes
+
+    return stats
+
 
+def cached_stats(fingerprint: Hashable, df: pd.DataFrame) -> Dict[str, Any]:
+    """`generate_stats(df)`, kept for the dataset version identified by `fingerprint`."""
+    with _stats_lock:
+        stats = _stats_cache.get(fingerprint)
+        if stats is not None:
+            _stats_cache.move_to_end(fingerprint)
+            return stats
+    stats = generate_stats(df)
+    with _stats_lock:
+        _stats_cache[fingerprint] = stats
+        while len(_stats_cache) > STATS_CACHE_ENTRIES:
+            _stats_cache.popitem(last=False)
     return stats
 
 
-def generate_correlations(df: pd.DataFrame) -> Dict[str, Any]:
-    num_df = df.select_dtypes(include=['number'])
-    if num_df.shape[1] < 2:
+def generate_correlations(df: pd.DataFrame, method: str = 'pearson', top: int = 3) -> Dict[str, Any]:
+    # The matrix is cached per frame, so the scatter chart below reuses it
+    cols, corr = get_correlations(df, method)
+    if len(cols) < 2:
         return {'top_pairs': []}
-    corr = num_df.corr(numeric_only=True)
-    pairs: List[Dict[str, Any]] = []
-    # Extract upper triangle pairs
-    cols = corr.columns
-    for i in range(len(cols)):
-        for j in range(i+1, len(cols)):
-            val = corr.iloc[i, j]
-            if pd.notna(val):
-                pairs.append({'x': cols[i], 'y': cols[j], 'corr': float(val), 'abs_corr': float(abs(val))})
-    pairs.sort(key=lambda d: d['abs_corr'], reverse=True)
-    return {'top_pairs': pairs[:3]}
+    return {'top_pairs': top_pairs(cols, corr, top)}
 
 
 def _find_datetime_column(df: pd.DataFrame) -> str | None:
@@ -56,11 +139,10 @@ def _find_datetime_column(df: pd.DataFrame) -> str | None:
     for col in df.columns:
         if pd.api.types.is_datetime64_any_dtype(df[col]):
             return col
-    # Fallback: try to parse object columns quickly
-    for col in df.select_dtypes(include=['object']).columns:
+    # Fallback: sniff text columns on a sample (cached per column)
+    for col in df.select_dtypes(include=['object', 'category']).columns:
         try:
-            parsed = pd.to_datetime(df[col], errors='coerce')
-            if parsed.notna().mean() > 0.6:
+            if datetime_profile(df, col)['ratio'] > 0.6:
                 return col
         except Exception:
             pass
@@ -69,10 +151,11 @@ def _find_datetime_column(df: pd.DataFrame) -> str | None:
 
 def _top_category_column(df: pd.DataFrame, max_unique: int = 50) -> str | None:
     cat_cols = df.select_dtypes(include=['object', 'category']).columns
+    profile = get_profile(df)
     best_col = None
     best_unique = 0
     for col in cat_cols:
-        nunique = int(df[col].nunique(dropna=True))
+        nunique = profile[col]['distinct']
         if 2 <= nunique <= max_unique and nunique > best_unique:
             best_unique = nunique
             best_col = col
@@ -84,65 +167,170 @@ def _first_numeric_column(df: pd.DataFrame) -> str | None:
     return num_cols[0] if len(num_cols) else None
 
 
-def _scatter_for_top_corr(df: pd.DataFrame) -> Dict[str, Any] | None:
-    corr_info = generate_correlations(df)
-    if not corr_info['top_pairs']:
-        return None
-    pair = corr_info['top_pairs'][0]
+def _timeseries_chart(
+    df: pd.DataFrame, date_col: str, num_col: str, scale: float = 1.0, rollup: pd.DataFrame | None = None,
+) -> Dict[str, Any]:
+    # Aggregate by date (day), from the rollup cube when it has the pair
+    tmp = rollup_series(rollup, date_col, num_col, 'D', 'sum')
+    if tmp is None:
+        tmp = df[[date_col, num_col]].dropna()
+        if not pd.api.types.is_datetime64_any_dtype(tmp[date_col]):
+            tmp[date_col] = column_to_datetime(df, date_col).loc[tmp.index]
+        tmp = tmp.dropna(subset=[date_col])
+        tmp = tmp.groupby(tmp[date_col].dt.to_period('D')).agg({num_col: 'sum'}).reset_index()
+        tmp[date_col] = tmp[date_col].dt.to_timestamp()
+    if scale != 1.0:
+        tmp[num_col] = tmp[num_col] * scale
+    fig_line = line_figure(tmp, date_col, num_col, f"{num_col} over time")
+    return {
+        'id': 'timeseries',
+        'title': f"{num_col} over time",
+        'figure': figure_payload(fig_line)
+    }
+
+
+def _top_categories_chart(df: pd.DataFrame, cat_col: str, num_col: str, scale: float = 1.0) -> Dict[str, Any]:
+    agg = df.groupby(cat_col, observed=True)[num_col].sum().sort_values(ascending=False).head(10).reset_index()
+    if scale != 1.0:
+        agg[num_col] = agg[num_col] * scale
+    with px_lock:
+        fig_bar = px.bar(agg, x=cat_col, y=num_col, title=f"Top 10 {cat_col} by {num_col}")
+    return {
+        'id': 'top_categories',
+        'title': f"Top 10 {cat_col} by {num_col}",
+        'figure': figure_payload(fig_bar)
+    }
+
+
+def _scatter_chart(df: pd.DataFrame, pair: Dict[str, Any]) -> Dict[str, Any]:
     x, y = pair['x'], pair['y']
-    fig = px.scatter(df, x=x, y=y, title=f"Scatter: {x} vs {y} (corr={pair['corr']:.2f})")
+    fig = scatter_figure(df, x, y, f"Scatter: {x} vs {y} (corr={pair['corr']:.2f})")
     return {
         'id': 'scatter_top_corr',
         'title': f"{x} vs {y}",
-        'figure': json.loads(pio.to_json(fig))
+        'figure': figure_payload(fig)
     }
 
 
-def generate_charts(df: pd.DataFrame) -> List[Dict[str, Any]]:
-    charts: List[Dict[str, Any]] = []
+def _histogram_chart(df: pd.DataFrame, num_col: str) -> Dict[str, Any]:
+    with px_lock:
+        fig_hist = px.histogram(df, x=num_col, nbins=30, title=f"Distribution of {num_col}")
+    return {
+        'id': 'histogram',
+        'title': f"Distribution of {num_col}",
+        'figure': figure_payload(fig_hist)
+    }
 
-    # 1) Time series if datetime + numeric present
+
+def _fallback_chart(df: pd.DataFrame, num_col: str) -> Dict[str, Any]:
+    """A histogram of at most FALLBACK_CHART_ROWS rows, cheap enough to build in the caller."""
+    if len(df) <= FALLBACK_CHART_ROWS:
+        return _histogram_chart(df, num_col)
+    chart = _histogram_chart(df[[num_col]].sample(n=FALLBACK_CHART_ROWS, random_state=0), num_col)
+    chart.update({'approximate': True, 'sample_rows': FALLBACK_CHART_ROWS})
+    return chart
+
+
+def _run_chart(started: Dict[str, float], name: str, build: Callable[..., Dict[str, Any]], args: tuple) -> Dict[str, Any]:
+    started[name] = time.monotonic()
+    return build(*args)
+
+
+def _chart_executor() -> ThreadPoolExecutor:
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is None:
+            _chart_pool = ThreadPoolExecutor(max_workers=max(CHART_WORKERS, 1), thread_name_prefix='charts')
+        return _chart_pool
+
+
+def shutdown_charts() -> None:
+    global _chart_pool
+    with _chart_pool_lock:
+        if _chart_pool is not None:
+            _chart_pool.shutdown(wait=False, cancel_futures=True)
+            _chart_pool = None
+
+
+def generate_charts(
+    df: pd.DataFrame, timeout: float | None = None, scale: float = 1.0, rollup: pd.DataFrame | None = None,
+) -> List[Dict[str, Any]]:
+    """Up to three overview charts, built concurrently on the chart pool.
+
+    Each chart gets `timeout` seconds (CHART_TIMEOUT_SECONDS) from when a
+    thread starts building it. A chart that runs past that, raises, or
+    still waits for a thread `timeout` seconds after its last sibling
+    finished is replaced by one histogram of a row sample (the first such
+    chart only); late threads finish in the background and their results
+    are discarded. `scale` multiplies the summed charts, for a `df` that is
+    a sample of 1/scale of the rows. The time series reads its daily sums
+    from `rollup`, the daily cube of `df`, when given.
+    """
+    timeout = CHART_TIMEOUT_SECONDS if timeout is None else timeout
     date_col = _find_datetime_column(df)
     num_col = _first_numeric_column(df)
-    if date_col and num_col:
-        tmp = df[[date_col, num_col]].dropna()
-        # Aggregate by date (day)
-        if not pd.api.types.is_datetime64_any_dtype(tmp[date_col]):
-            tmp[date_col] = pd.to_datetime(tmp[date_col], errors='coerce')
-        tmp = tmp.dropna(subset=[date_col])
-        tmp = tmp.groupby(tmp[date_col].dt.to_period('D')).agg({num_col: 'sum'}).reset_index()
-        tmp[date_col] = tmp[date_col].dt.to_timestamp()
-        fig_line = px.line(tmp, x=date_col, y=num_col, title=f"{num_col} over time")
-        charts.append({
-            'id': 'timeseries',
-            'title': f"{num_col} over time",
-            'figure': json.loads(pio.to_json(fig_line))
-        })
+    cat_col = _top_category_column(df)
+    # Sniffing, profiles and correlations are cached on the frame, so the builders only read them
+    pairs = generate_correlations(df)['top_pairs']
 
+    planned = []
+    # 1) Time series if datetime + numeric present
+    if date_col and num_col:
+        planned.append(('timeseries', _timeseries_chart, (df, date_col, num_col, scale, rollup)))
     # 2) Top categories bar chart
-    cat_col = _top_category_column(df)
     if cat_col and num_col:
-        agg = df.groupby(cat_col)[num_col].sum().sort_values(ascending=False).head(10).reset_index()
-        fig_bar = px.bar(agg, x=cat_col, y=num_col, title=f"Top 10 {cat_col} by {num_col}")
-        charts.append({
-            'id': 'top_categories',
-            'title': f"Top 10 {cat_col} by {num_col}",
-            'figure': json.loads(pio.to_json(fig_bar))
-        })
-
+        planned.append(('top_categories', _top_categories_chart, (df, cat_col, num_col, scale)))
     # 3) Scatter for top correlation pair
-    scatter = _scatter_for_top_corr(df)
-    if scatter:
-        charts.append(scatter)
-
+    if pairs:
+        planned.append(('scatter_top_corr', _scatter_chart, (df, pairs[0])))
     # Fallback: histogram of first numeric column if we have < 3 charts
-    if len(charts) < 3 and num_col:
-        fig_hist = px.histogram(df, x=num_col, nbins=30, title=f"Distribution of {num_col}")
-        charts.append({
-            'id': 'histogram',
-            'title': f"Distribution of {num_col}",
-            'figure': json.loads(pio.to_json(fig_hist))
-        })
+    if len(planned) < 3 and num_col:
+        planned.append(('histogram', _histogram_chart, (df, num_col)))
+
+    pool = _chart_executor()
+    started: Dict[str, float] = {}
+    pending = {name: pool.submit(_run_chart, started, name, build, args) for name, build, args in planned}
+    built: Dict[str, Dict[str, Any]] = {}
+    # Queued charts wait while a sibling is still running, then `timeout` more for a thread
+    idle_since = time.monotonic()
+    while pending:
+        now = time.monotonic()
+        running = False
+        for name, future in list(pending.items()):
+            if future.done():
+                del pending[name]
+                idle_since = now
+                try:
+                    built[name] = future.result()
+                except Exception as e:
+                    print(f"[CHARTS] {name} failed: {type(e).__name__}: {e}")
+            elif name in started:
+                if timeout > 0 and now - started[name] >= timeout:
+                    del pending[name]
+                    idle_since = now
+                    print(f"[CHARTS] {name} not ready after {timeout:g}s; skipped")
+                else:
+                    running = True
+        if timeout > 0 and not running and now - idle_since >= timeout:
+            for name, future in list(pending.items()):
+                if future.cancel():
+                    del pending[name]
+                    print(f"[CHARTS] {name} got no thread within {timeout:g}s; skipped")
+        if pending:
+            wait(list(pending.values()), timeout=_POLL_SECONDS if timeout > 0 else None, return_when=FIRST_COMPLETED)
+
+    charts: List[Dict[str, Any]] = []
+    fallback = num_col is not None and 'histogram' not in built
+    for name, _, _ in planned:
+        if name in built:
+            charts.append(built[name])
+        elif fallback:
+            # One stand-in: a second histogram of the same column would add nothing
+            fallback = False
+            try:
+                charts.append(_fallback_chart(df, num_col))
+            except Exception as e:
+                print(f"[CHARTS] fallback histogram failed: {type(e).__name__}: {e}")
 
     # Limit to top 3
     return charts[:3]
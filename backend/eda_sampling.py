@@ -0,0 +1,177 @@
+"""Approximate EDA on a row sample, with confidence intervals.
+
+With the `edaSample` upload option, stats, correlations and charts are
+computed on a sample of EDA_SAMPLE_ROWS rows instead of the whole cleaned
+frame. The exact report is computed in the background afterwards (see
+eda_cache.refresh_exact) and replaces the sampled one at
+GET /datasets/{name}/report.
+
+`draw_sample` takes a seeded uniform sample without replacement: every
+row has the same chance of selection, which the scaling below (every
+count and sum times population/rows) and the simple-random-sample
+intervals rely on. It is not stratified: downsample.sample_rows keeps at
+least one row per category for chart legends, which would over-weight
+rare categories here.
+
+Every sampled statistic carries its `sample_size` and a `ci` of
+[low, high] at EDA_SAMPLE_CONFIDENCE:
+- means and standard deviations use the normal approximation (the
+  latter with the sample's fourth moment, so skewed columns are covered);
+- quantiles use distribution-free order-statistic bounds;
+- null counts and top-value frequencies are binomial proportions scaled
+  to the full row count;
+- correlations use Fisher's z transform with a moment-based standard
+  error (no normality assumption).
+A finite-population correction narrows the intervals as the sample
+approaches the full frame. Counts are scaled estimates for the full frame.
+Minimums, maximums and distinct counts come from the sample as they are:
+they can only understate the full frame's range and variety.
+
+Config (env):
+- EDA_SAMPLE_ROWS: rows sampled when an upload asks for sample mode without a size (default 100k)
+- EDA_SAMPLE_CONFIDENCE: confidence level of the intervals (default 0.95)
+"""
+from __future__ import annotations
+import math
+import os
+from statistics import NormalDist
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from downsample import sample_rows
+from eda_engine import generate_charts, generate_correlations, generate_stats
+
+EDA_SAMPLE_ROWS = int(os.getenv('EDA_SAMPLE_ROWS', str(100_000)))
+EDA_SAMPLE_CONFIDENCE = float(os.getenv('EDA_SAMPLE_CONFIDENCE', '0.95'))
+
+
+def draw_sample(df: pd.DataFrame, rows: int, seed: int = 0) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """(uniform sample of `rows` rows, sample description); the frame itself when it is not larger."""
+    positions = sample_rows(len(df), rows, seed=seed)
+    info = {
+        'rows': int(len(positions)),
+        'population_rows': int(len(df)),
+        'method': 'uniform',
+        'confidence': EDA_SAMPLE_CONFIDENCE,
+    }
+    return df.iloc[positions], info
+
+
+def _z() -> float:
+    return NormalDist().inv_cdf(0.5 + EDA_SAMPLE_CONFIDENCE / 2)
+
+
+def _fpc(info: Dict[str, Any]) -> float:
+    n, total = info['rows'], info['population_rows']
+    return math.sqrt((total - n) / (total - 1)) if total > 1 else 0.0
+
+
+def _interval(estimate: float, se: float, low: float = -math.inf, high: float = math.inf) -> List[float]:
+    return [max(estimate - _z() * se, low), min(estimate + _z() * se, high)]
+
+
+def _proportion(hits: int, info: Dict[str, Any]) -> Tuple[float, List[float]]:
+    """(full-frame count estimate, its interval) for `hits` of the sampled rows."""
+    n, total = info['rows'], info['population_rows']
+    p = hits / n
+    lo, hi = _interval(p, math.sqrt(p * (1 - p) / n) * _fpc(info), 0.0, 1.0)
+    return p * total, [lo * total, hi * total]
+
+
+def _quantile_ci(values: np.ndarray, q: float) -> List[float]:
+    """Order statistics bracketing quantile `q` (no assumption on the distribution)."""
+    half = _z() * math.sqrt(q * (1 - q) / len(values))
+    return [float(v) for v in np.quantile(values, [max(q - half, 0.0), min(q + half, 1.0)])]
+
+
+def _std_se(values: np.ndarray, std: float) -> float:
+    """Standard error of the sample standard deviation from the fourth moment (valid for skewed data)."""
+    n = len(values)
+    if n < 4 or std == 0:
+        return 0.0
+    m4 = float(np.mean((values - values.mean()) ** 4))
+    var_se = math.sqrt(max(m4 - std ** 4 * (n - 3) / (n - 1), 0.0) / n)
+    return var_se / (2 * std)
+
+
+def sampled_stats(sample: pd.DataFrame, info: Dict[str, Any]) -> Dict[str, Any]:
+    """generate_stats on the sample, counts scaled to the full frame, with intervals."""
+    stats = generate_stats(sample)
+    scale = info['population_rows'] / max(info['rows'], 1)
+    fpc = _fpc(info)
+    for col, s in stats['numeric'].items():
+        n = s['count']
+        values = sample[col].to_numpy(dtype='float64', na_value=np.nan)
+        values = values[~np.isnan(values)]
+        std = s['std'] if s['std'] is not None and not math.isnan(s['std']) else 0.0
+        nulls, nulls_ci = _proportion(s['nulls'], info)
+        s['ci'] = {
+            'mean': _interval(s['mean'], std / math.sqrt(n) * fpc),
+            'std': _interval(std, _std_se(values, std) * fpc, 0.0),
+            'median': _quantile_ci(values, 0.5),
+            'p25': _quantile_ci(values, 0.25),
+            'p75': _quantile_ci(values, 0.75),
+            'nulls': nulls_ci,
+        }
+        s['sample_size'] = n
+        s['nulls'] = int(round(nulls))
+        s['count'] = info['population_rows'] - s['nulls']
+    for col, s in stats['categorical'].items():
+        freq, freq_ci = _proportion(s['freq'], info)
+        nulls, nulls_ci = _proportion(s['nulls'], info)
+        s['ci'] = {'freq': freq_ci, 'nulls': nulls_ci}
+        s['sample_size'] = s['count']
+        s['freq'] = int(round(freq))
+        s['top_values'] = [[v, int(round(c * scale))] for v, c in s['top_values']]
+        s['nulls'] = int(round(nulls))
+        s['count'] = info['population_rows'] - s['nulls']
+    for col, s in stats['datetime'].items():
+        nulls, nulls_ci = _proportion(s['nulls'], info)
+        s['ci'] = {'nulls': nulls_ci}
+        s['sample_size'] = s['count']
+        s['nulls'] = int(round(nulls))
+        s['count'] = info['population_rows'] - s['nulls']
+    stats['sample'] = info
+    return stats
+
+
+def _corr_se(x: np.ndarray, y: np.ndarray, r: float) -> float:
+    """Delta-method standard error of Pearson's r from the pair's standardised fourth moments.
+
+    Equals (1 - r^2) / sqrt(n) for bivariate normal data, and stays honest
+    for skewed or heavy-tailed columns where that formula is too narrow.
+    """
+    n = len(x)
+    if n < 4 or x.std() == 0 or y.std() == 0:
+        return 0.0
+    a = (x - x.mean()) / x.std()
+    b = (y - y.mean()) / y.std()
+    a2, b2 = a * a, b * b
+    m22, m31, m13 = np.mean(a2 * b2), np.mean(a2 * a * b), np.mean(a * b2 * b)
+    m40, m04 = np.mean(a2 * a2), np.mean(b2 * b2)
+    variance = m22 - r * (m31 + m13) + r * r / 4 * (m40 + m04 + 2 * m22)
+    return math.sqrt(max(float(variance), 0.0) / n)
+
+
+def sampled_correlations(sample: pd.DataFrame, info: Dict[str, Any]) -> Dict[str, Any]:
+    """generate_correlations on the sample, each pair with its Fisher-z interval."""
+    correlations = generate_correlations(sample)
+    for pair in correlations['top_pairs']:
+        both = sample[[pair['x'], pair['y']]].dropna().to_numpy(dtype='float64')
+        r = min(max(pair['corr'], -0.999999), 0.999999)
+        half = _z() * _corr_se(both[:, 0], both[:, 1], r) / (1 - r * r) * _fpc(info)
+        pair['ci'] = [math.tanh(math.atanh(r) - half), math.tanh(math.atanh(r) + half)]
+        pair['sample_size'] = len(both)
+    correlations['sample'] = info
+    return correlations
+
+
+def sampled_charts(sample: pd.DataFrame, info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """generate_charts on the sample, sums scaled to the full frame and charts marked approximate."""
+    charts = generate_charts(sample, scale=info['population_rows'] / max(info['rows'], 1))
+    for chart in charts:
+        chart['approximate'] = True
+        chart['sample_rows'] = info['rows']
+    return charts
@@ -0,0 +1,135 @@
+"""Plotly figures as JSON-ready dicts, and a one-pass JSON response.
+
+`figure_payload(fig)` replaces `json.loads(pio.to_json(fig))`: it walks
+the figure's properties once instead of encoding the figure to text and
+parsing it back. Numeric trace arrays become plotly.js typed arrays
+(`{'dtype': 'f8', 'bdata': <base64>}`, supported since plotly.js 2.28),
+so a 100k-point column is one base64 string rather than 100k JSON
+numbers. int64 columns are narrowed to the smallest integer type that
+holds them (plotly.js has no 64-bit integers); wider ones stay lists.
+Everything else becomes plain lists, strings and numbers, so payloads can
+still be cached and streamed with the json module. `decode_array` reads a
+typed array back into numpy.
+
+`FastJSONResponse` serialises content once with orjson when installed
+(json otherwise), skipping FastAPI's jsonable_encoder walk; return it
+from endpoints whose content is already JSON-ready.
+"""
+from __future__ import annotations
+import base64
+import datetime as dt
+import json
+import math
+from typing import Any, Dict
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+# numpy dtype -> plotly.js typed array name
+_TYPED = {
+    'int8': 'i1', 'uint8': 'u1', 'int16': 'i2', 'uint16': 'u2',
+    'int32': 'i4', 'uint32': 'u4', 'float32': 'f4', 'float64': 'f8',
+}
+_NARROW = {'int64': ('int8', 'int16', 'int32'), 'uint64': ('uint8', 'uint16', 'uint32')}
+
+
+def _typed_array(values: np.ndarray) -> Dict[str, str] | None:
+    """The plotly.js typed array spec of a numeric array, or None if it has no typed equivalent."""
+    dtype = str(values.dtype)
+    if dtype in _NARROW and values.size:
+        low, high = values.min(), values.max()
+        narrowed = next((t for t in _NARROW[dtype] if np.iinfo(t).min <= low and high <= np.iinfo(t).max), None)
+        if narrowed is None:
+            return None
+        values, dtype = values.astype(narrowed), narrowed
+    if dtype not in _TYPED:
+        return None
+    spec = {'dtype': _TYPED[dtype], 'bdata': base64.b64encode(np.ascontiguousarray(values, dtype=f"<{_TYPED[dtype]}")).decode('ascii')}
+    if values.ndim > 1:
+        spec['shape'] = ', '.join(str(d) for d in values.shape)
+    return spec
+
+
+def _iso_strings(index: pd.DatetimeIndex) -> list:
+    """Timestamp.isoformat() of every entry (None for NaT), formatted in one numpy call."""
+    wall = index.tz_localize(None) if index.tz is not None else index
+    valid = ~np.asarray(wall.isna())
+    ns = wall.asi8[valid]
+    unit = 's' if not (ns % 1_000_000_000).any() else 'us' if not (ns % 1_000).any() else 'ns'
+    text = np.datetime_as_string(wall.values, unit=unit).astype(object)
+    if index.tz is not None:
+        # isoformat's +HH:MM suffix; a zone has a handful of distinct offsets (DST)
+        offsets = (wall.asi8 - index.asi8) // 60_000_000_000
+        for minutes in np.unique(offsets[valid]):
+            sign = '+' if minutes >= 0 else '-'
+            at = valid & (offsets == minutes)
+            text[at] = text[at] + f"{sign}{abs(minutes) // 60:02d}:{abs(minutes) % 60:02d}"
+    text[~valid] = None
+    return text.tolist()
+
+
+def _plain(value: Any, typed: bool) -> Any:
+    """`value` with numpy, pandas and datetime objects turned into JSON types; NaN becomes None."""
+    if isinstance(value, dict):
+        return {k: _plain(v, typed and k != 'range') for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(v, typed) for v in value]
+    if isinstance(value, np.ndarray):
+        if typed and value.size:
+            spec = _typed_array(value)
+            if spec is not None:
+                return spec
+        if value.ndim == 1 and value.size and (
+            value.dtype.kind == 'M' or (value.dtype.kind == 'O' and isinstance(value[0], dt.datetime))
+        ):
+            try:
+                return _iso_strings(pd.DatetimeIndex(value))
+            except (TypeError, ValueError):
+                pass  # mixed zones or values: converted one by one below
+        if value.dtype.kind == 'M':
+            value = np.array(list(pd.to_datetime(value.ravel())), dtype=object).reshape(value.shape)
+        return _plain(value.tolist() if value.dtype.kind != 'O' else list(value), False)
+    if isinstance(value, (pd.Timestamp, dt.datetime, dt.date)):
+        return None if value is pd.NaT else value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if value is pd.NA or value is pd.NaT:
+        return None
+    return value
+
+
+def figure_payload(fig) -> Dict[str, Any]:
+    """`fig` as a JSON-ready dict, numeric trace arrays as typed arrays."""
+    return {
+        'data': [_plain(trace.to_plotly_json(), True) for trace in fig.data],
+        'layout': _plain(fig.layout.to_plotly_json(), False),
+    }
+
+
+def decode_array(value: Any) -> np.ndarray:
+    """A figure array as numpy, whether it is a typed array spec or a list."""
+    if isinstance(value, dict) and 'bdata' in value:
+        out = np.frombuffer(base64.b64decode(value['bdata']), dtype=f"<{value['dtype']}")
+        if 'shape' in value:
+            out = out.reshape([int(d) for d in value['shape'].split(',')])
+        return out
+    return np.asarray(value)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse that encodes JSON-ready content in one pass (orjson when available)."""
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(
+            content, ensure_ascii=False, allow_nan=False, separators=(',', ':'), default=lambda v: _plain(v, False),
+        ).encode('utf-8')
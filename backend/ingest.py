@@ -0,0 +1,362 @@
+"""Upload ingest: stream request bodies to disk, parse and compact them.
+
+Uploads are copied to disk in fixed-size chunks so a request never holds
+the whole payload in memory, and the content hash is computed while the
+bytes stream past. Parsing then reads the file on disk: CSVs are sniffed
+for encoding, delimiter, header and dtypes from a small sample, and the
+sampled dtypes are handed to the parser so inference runs only once.
+XLSX sheets are streamed row by row from a read-only workbook.
+
+Config (env):
+- UPLOAD_CHUNK_SIZE: bytes per read from the request body (default 1 MiB)
+- MAX_UPLOAD_BYTES: reject uploads larger than this; 0 disables the limit (default 1 GiB)
+- CATEGORY_MAX_RATIO: object columns with at most this share of distinct values
+  become `category` at ingest (default 0.5)
+- CSV_ENGINE: 'auto' uses pyarrow's multi-threaded parser when installed,
+  'c' forces pandas' C parser (default auto)
+"""
+from __future__ import annotations
+import codecs
+import csv
+import hashlib
+import io
+import os
+import warnings
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from fastapi import UploadFile
+
+UPLOAD_CHUNK_SIZE = int(os.getenv('UPLOAD_CHUNK_SIZE', str(1024 * 1024)))
+MAX_UPLOAD_BYTES = int(os.getenv('MAX_UPLOAD_BYTES', str(1024 * 1024 * 1024)))
+CATEGORY_MAX_RATIO = float(os.getenv('CATEGORY_MAX_RATIO', '0.5'))
+CSV_ENGINE = os.getenv('CSV_ENGINE', 'auto')
+SNIFF_BYTES = 64 * 1024
+SNIFF_ROWS = 1000
+EXCEL_BATCH_ROWS = 50_000
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds MAX_UPLOAD_BYTES."""
+
+
+class SheetNotFoundError(ValueError):
+    """The requested sheet does not exist in the uploaded workbook."""
+
+
+async def save_upload_stream(
+    file: UploadFile,
+    dest: Path,
+    *,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+    max_bytes: int = MAX_UPLOAD_BYTES,
+) -> Tuple[int, str]:
+    """Copy `file` to `dest` chunk by chunk.
+
+    Returns (bytes_written, sha256 hex digest). The copy goes to a temporary
+    name first so a rejected or interrupted upload never replaces `dest`.
+    """
+    hasher = hashlib.sha256()
+    written = 0
+    tmp_path = dest.with_name(dest.name + '.part')
+    try:
+        with open(tmp_path, 'wb') as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+                written += len(chunk)
+                if max_bytes and written > max_bytes:
+                    raise UploadTooLargeError(
+                        f'File exceeds the maximum upload size of {max_bytes // (1024 * 1024)} MB.'
+                    )
+                hasher.update(chunk)
+                out.write(chunk)
+        tmp_path.replace(dest)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+    return written, hasher.hexdigest()
+
+
+def sniff_csv(path: Path, sample_bytes: int = SNIFF_BYTES) -> Dict[str, Any]:
+    """Detect encoding, delimiter, header and column dtypes from the start of a CSV."""
+    with open(path, 'rb') as f:
+        raw = f.read(sample_bytes)
+        at_eof = not f.read(1)
+    if not at_eof and b'\n' in raw:
+        # Only keep complete lines; the newline byte is safe to cut on in any encoding we accept
+        raw = raw[:raw.rindex(b'\n') + 1]
+
+    if raw.startswith(codecs.BOM_UTF8):
+        encoding = 'utf-8-sig'
+    else:
+        try:
+            raw.decode('utf-8')
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            encoding = 'latin-1'
+    text = raw.decode(encoding)
+
+    delimiter = ','
+    has_header = True
+    try:
+        sniffer = csv.Sniffer()
+        delimiter = sniffer.sniff(text, delimiters=',;\t|').delimiter
+        if not sniffer.has_header(text):
+            # Sniffer is unreliable on all-text files; only trust "no header" when
+            # the first row itself contains numbers, which real headers rarely do
+            first_row = next(csv.reader(io.StringIO(text), delimiter=delimiter), [])
+            has_header = not any(_looks_numeric(v) for v in first_row)
+    except csv.Error:
+        pass
+
+    options = _csv_read_options(delimiter, encoding, has_header, text)
+    try:
+        sample = pd.read_csv(io.StringIO(text), nrows=SNIFF_ROWS, **{k: v for k, v in options.items() if k != 'encoding'})
+        dtypes = {c: str(t) for c, t in sample.dtypes.items()}
+    except Exception:
+        dtypes = {}
+    return {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'has_header': has_header,
+        'dtypes': dtypes,
+        'read_options': options,
+    }
+
+
+def _looks_numeric(value: str) -> bool:
+    try:
+        float(value)
+        return True
+    except ValueError:
+        return False
+
+
+def _csv_read_options(delimiter: str, encoding: str, has_header: bool, text: str) -> Dict[str, Any]:
+    """pandas.read_csv keyword arguments matching the sniffed layout."""
+    options: Dict[str, Any] = {'sep': delimiter, 'encoding': encoding}
+    if not has_header:
+        first_row = next(csv.reader(io.StringIO(text), delimiter=delimiter), [])
+        options['header'] = None
+        options['names'] = [f"Column {i + 1}" for i in range(len(first_row))]
+    return options
+
+
+_ARROW_TYPES = {
+    'object': 'string',
+    'int64': 'int64',
+    'float64': 'float64',
+    'bool': 'bool',
+}
+
+
+def _read_csv_pyarrow(path: Path, sniff: Dict[str, Any]) -> pd.DataFrame:
+    import pyarrow as pa
+    import pyarrow.csv as pacsv
+
+    options = sniff['read_options']
+    names = options.get('names')
+    read_options = pacsv.ReadOptions(encoding=sniff['encoding'], column_names=names)
+    parse_options = pacsv.ParseOptions(delimiter=sniff['delimiter'])
+    # Sampled types skip pyarrow's own inference; text columns stay strings so
+    # date-like columns are left for the cleaner to detect, as with the C engine
+    column_types = {
+        c: getattr(pa, _ARROW_TYPES[t])() for c, t in sniff['dtypes'].items() if t in _ARROW_TYPES
+    }
+    convert_options = pacsv.ConvertOptions(
+        column_types=column_types,
+        strings_can_be_null=True,
+        timestamp_parsers=[],
+    )
+    table = pacsv.read_csv(path, read_options=read_options, parse_options=parse_options, convert_options=convert_options)
+    return table.to_pandas()
+
+
+def read_csv_fast(path: Path, engine: str = CSV_ENGINE) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Read a CSV with the multi-threaded pyarrow parser, falling back to pandas' C parser.
+
+    Returns the frame and an info dict (engine used, delimiter, encoding, header).
+    """
+    sniff = sniff_csv(path)
+    info = {k: sniff[k] for k in ('encoding', 'delimiter', 'has_header')}
+    if engine != 'c' and sniff['dtypes']:
+        try:
+            df = _read_csv_pyarrow(path, sniff)
+            info['engine'] = 'pyarrow'
+            return df, info
+        except ImportError:
+            pass
+        except Exception as e:
+            # Typically a sampled type that does not hold further down the file
+            print(f"[INGEST] pyarrow CSV read failed for {path.name}, using C engine: {type(e).__name__}: {e}")
+    df = pd.read_csv(path, **sniff['read_options'])
+    info['engine'] = 'c'
+    return df, info
+
+
+def _header_names(row: tuple) -> list[str]:
+    """Column names the way pandas.read_excel builds them (Unnamed: i, a.1 for repeats)."""
+    names: list[str] = []
+    seen: Dict[str, int] = {}
+    for i, value in enumerate(row):
+        name = f"Unnamed: {i}" if value is None or (isinstance(value, str) and not value.strip()) else str(value)
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def list_excel_sheets(path: Path) -> list[str]:
+    from openpyxl import load_workbook
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        return list(wb.sheetnames)
+    finally:
+        wb.close()
+
+
+def read_excel_streaming(path: Path, sheet: str | int | None = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Read one sheet of an XLSX workbook row by row.
+
+    The workbook is opened read-only and rows are converted to typed frames
+    every EXCEL_BATCH_ROWS rows, so the whole sheet never sits in memory as
+    Python row lists. `sheet` is a sheet name or 0-based index (default first).
+    Returns the frame and {'sheet': name used, 'sheets': all sheet names}.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheets = list(wb.sheetnames)
+        if sheet is None or sheet == '':
+            name = sheets[0]
+        elif isinstance(sheet, int) or (isinstance(sheet, str) and sheet.isdigit() and sheet not in sheets):
+            idx = int(sheet)
+            if not 0 <= idx < len(sheets):
+                raise SheetNotFoundError(f"Sheet index {idx} out of range; workbook has {len(sheets)} sheet(s).")
+            name = sheets[idx]
+        elif sheet in sheets:
+            name = sheet
+        else:
+            raise SheetNotFoundError(f"Sheet '{sheet}' not found. Available sheets: {', '.join(sheets)}")
+
+        rows = wb[name].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return pd.DataFrame(), {'sheet': name, 'sheets': sheets}
+        # Trailing empty header cells with no data are dropped like pandas does
+        width = len(header)
+        columns = _header_names(header)
+
+        frames: list[pd.DataFrame] = []
+        batch: list[tuple] = []
+        pending_blank: list[tuple] = []
+        max_used = max((i + 1 for i, v in enumerate(header) if v is not None), default=0)
+        for row in rows:
+            row = tuple(row[:width]) + (None,) * (width - len(row))
+            if all(v is None for v in row):
+                # Only keep blank rows that turn out to be followed by data
+                pending_blank.append(row)
+                continue
+            if pending_blank:
+                batch.extend(pending_blank)
+                pending_blank = []
+            max_used = max(max_used, max(i + 1 for i, v in enumerate(row) if v is not None))
+            batch.append(row)
+            if len(batch) >= EXCEL_BATCH_ROWS:
+                frames.append(pd.DataFrame.from_records(batch, columns=columns))
+                batch = []
+        if batch or not frames:
+            frames.append(pd.DataFrame.from_records(batch, columns=columns))
+    finally:
+        wb.close()
+
+    if len(frames) > 1:
+        # All-empty batches are re-typed below, so the pandas 2.1 concat dtype warning does not apply
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)
+            df = pd.concat(frames, ignore_index=True)
+    else:
+        df = frames[0]
+    df = df.iloc[:, :max_used]
+    # Match pandas.read_excel: empty cells are NaN, all-empty columns are float,
+    # and batches that were entirely empty for a column are re-inferred
+    for col in df.columns[df.dtypes == object]:
+        s = df[col]
+        if s.isna().all():
+            df[col] = s.astype('float64')
+        else:
+            df[col] = s.where(s.notna(), np.nan).infer_objects()
+    return df, {'sheet': name, 'sheets': sheets}
+
+
+def read_upload(path: Path, file_ext: str, sheet: str | int | None = None) -> pd.DataFrame:
+    """Parse an upload that has already been written to disk."""
+    df, _ = read_upload_with_info(path, file_ext, sheet)
+    return df
+
+
+def read_upload_with_info(path: Path, file_ext: str, sheet: str | int | None = None) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Like read_upload, also returning reader info (CSV engine/dialect or Excel sheet)."""
+    if file_ext == 'csv':
+        return read_csv_fast(path)
+    if file_ext == 'xlsx':
+        return read_excel_streaming(path, sheet)
+    # Legacy .xls is not readable by openpyxl
+    try:
+        df = pd.read_excel(path, sheet_name=sheet if sheet not in (None, '') else 0)
+    except (ValueError, IndexError) as e:
+        if sheet in (None, ''):
+            raise
+        raise SheetNotFoundError(str(e)) from e
+    return df, {}
+
+
+def optimize_dtypes(df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    """Shrink a freshly parsed frame without changing its values.
+
+    - integer columns are downcast to the smallest integer type that fits
+    - low-cardinality object columns become `category`
+
+    Floats stay float64: pandas accumulates float32 means/sums in float32,
+    which would shift the cleaner's fills and the EDA stats. Returns the
+    compact frame and a report with before/after memory.
+    """
+    bytes_before = int(df.memory_usage(index=True, deep=True).sum())
+    changes: Dict[str, Dict[str, str]] = {}
+    converted: Dict[str, pd.Series] = {}
+    n_rows = len(df)
+    for col in df.columns:
+        s = df[col]
+        before = str(s.dtype)
+        if pd.api.types.is_integer_dtype(s) and not pd.api.types.is_extension_array_dtype(s):
+            out = pd.to_numeric(s, downcast='integer')
+        elif s.dtype == object and n_rows:
+            nunique = int(s.nunique(dropna=True))
+            if nunique == 0 or nunique > CATEGORY_MAX_RATIO * n_rows:
+                continue
+            out = s.astype('category')
+        else:
+            continue
+        if str(out.dtype) != before:
+            converted[col] = out
+            changes[col] = {'from': before, 'to': str(out.dtype)}
+    if converted:
+        df = df.copy(deep=False)
+        for col, s in converted.items():
+            df[col] = s
+    bytes_after = int(df.memory_usage(index=True, deep=True).sum())
+    report = {
+        'bytes_before': bytes_before,
+        'bytes_after': bytes_after,
+        'reduction_pct': round(100.0 * (1 - bytes_after / bytes_before), 1) if bytes_before else 0.0,
+        'columns': changes,
+    }
+    return df, report
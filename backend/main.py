@@ -4,24 +4,44 @@ Endpoint: POST /upload
 Returns: JSON containing filename, columns, row_count, cleaning_summary,
          stats, correlations, charts (Plotly JSON), insights.
 
+Figure-heavy endpoints return FastJSONResponse (figure_json) directly: their
+content is already JSON-ready, so it is encoded once without FastAPI's
+jsonable_encoder pass.
+
 Run with: uvicorn main:app --reload --port 8000
 """
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
 from pathlib import Path
 from dotenv import load_dotenv
 import pandas as pd
+import asyncio
 import json
 import os
-import io
+import uuid
+import zipfile
 from typing import Any, Dict, List
 import time
 
-from data_cleaner import clean_csv_and_summary
-from eda_engine import generate_stats, generate_correlations, generate_charts
-from openai_summary import generate_insights
+from data_cleaner import DedupKeyError, RecipeError, apply_recipe, clean_csv_and_summary, validate_recipe
+from correlation import METHODS as CORRELATION_METHODS, get_correlations, matrix_payload, top_pairs
+from date_detection import column_to_datetime
+from eda_engine import cached_stats, shutdown_charts
+from eda_sampling import EDA_SAMPLE_ROWS
+from figure_json import FastJSONResponse
 from viz_engine import infer_schema, build_figure
+from agg_cache import agg_cache
 from nlviz import interpret_prompt
+from dataset_registry import registry as dataset_registry
+from dataset_store import columnar_path, export_text, load_recipe
+from ingest import save_upload_stream, read_upload, optimize_dtypes, UploadTooLargeError, SheetNotFoundError
+import column_workers
+import dataset_append
+import eda_cache
+import rollup
+from upload_jobs import run_upload_pipeline, jobs as upload_jobs
 
 load_dotenv()
 
@@ -42,6 +62,36 @@ app.add_middleware(
     ,allow_headers=["*"]
 )
 
+def _cleaned_path(filename: str) -> Path:
+    """Cleaned export path for an uploaded `filename` (its sidecar sits next to it)."""
+    if filename.lower().endswith('.xls'):
+        # Legacy Excel uploads are cleaned into an .xlsx export name
+        return CLEANED_DIR / f"cleaned_{filename.rsplit('.', 1)[0]}.xlsx"
+    return CLEANED_DIR / f"cleaned_{filename}"
+
+
+def _resolve_dataset_path(filename: str) -> Path | None:
+    """Prefer the cleaned artifact for `filename`, falling back to the raw upload."""
+    cleaned_path = _cleaned_path(filename)
+    sidecar_path = columnar_path(cleaned_path)
+    if sidecar_path.exists():
+        return sidecar_path
+    if cleaned_path.exists():
+        return cleaned_path
+    original_path = UPLOAD_DIR / filename
+    if original_path.exists():
+        return original_path
+    return None
+
+
+def _dataset_rollup(filename: str, dataset_path: Path, df: pd.DataFrame) -> pd.DataFrame | None:
+    """The daily rollup cube of a cleaned dataset (rebuilt if stale), or None for raw uploads."""
+    cleaned_path = _cleaned_path(filename)
+    if dataset_path not in (columnar_path(cleaned_path), cleaned_path):
+        return None
+    return rollup.get_rollup(cleaned_path, dataset_path, df)
+
+
 # Initialize SQLite database for runs/metrics
 try:
     from db import init_db, get_conn, now_ts
@@ -58,6 +108,114 @@ except Exception as _e:
     print(f"[AUTH INIT] Warning: {type(_e).__name__}: {_e}")
 
 
+async def _receive_upload(
+    file: UploadFile,
+    autoClean: str | None,
+    outlierDetection: str | None,
+    aiProvider: str | None,
+    chartHeight: str | None,
+    chunkedClean: str | None = None,
+    sheet: str | None = None,
+    recipe: str | None = None,
+    recipeFrom: str | None = None,
+    dedupKeys: str | None = None,
+    edaSample: str | None = None,
+) -> tuple[Path, str, Dict[str, Any]]:
+    """Validate and stream an upload to disk; returns (save_path, file_ext, pipeline options)."""
+    file_ext = file.filename.lower().split('.')[-1]
+    if file_ext not in ['csv', 'xlsx', 'xls']:
+        raise HTTPException(status_code=400, detail='Unsupported file type. Please upload a CSV or XLSX file.')
+    # Resolve the recipe before reading the body so a bad one fails fast
+    recipe_dict = _resolve_recipe(recipe, recipeFrom)
+    dedup_keys = _parse_columns(dedupKeys, 'dedupKeys')
+    sample_rows = _parse_sample_rows(edaSample)
+    # Stream the upload to disk in chunks, hashing as it goes
+    save_path = UPLOAD_DIR / file.filename
+    try:
+        file_size, content_sha256 = await save_upload_stream(file, save_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    # Parse settings flags
+    auto_clean_flag = True if (autoClean is None or autoClean.lower() == 'true') else False
+    outlier_flag = True if (outlierDetection is None or outlierDetection.lower() == 'true') else False
+    chunked_flag = True if (chunkedClean is not None and chunkedClean.lower() == 'true') else False
+
+    options = {
+        'autoClean': auto_clean_flag,
+        'outlierDetection': outlier_flag,
+        'chunkedClean': chunked_flag,
+        'aiProvider': aiProvider,
+        'chartHeight': chartHeight,
+        'sheet': sheet or None,
+        'recipe': recipe_dict,
+        'dedupKeys': dedup_keys,
+        'edaSample': sample_rows,
+        'file_size': file_size,
+        'content_sha256': content_sha256,
+    }
+    return save_path, file_ext, options
+
+
+def _parse_columns(value: str | None, field: str) -> List[str] | None:
+    """A form field naming columns: a JSON array of names, e.g. '["Order ID", "Date"]'."""
+    if not value:
+        return None
+    try:
+        columns = json.loads(value)
+    except ValueError:
+        columns = None
+    if not isinstance(columns, list) or not all(isinstance(c, str) for c in columns):
+        raise HTTPException(status_code=400, detail=f'{field} must be a JSON array of column names.')
+    return columns or None
+
+
+def _parse_sample_rows(value: str | None) -> int | None:
+    """The edaSample form field: 'true' samples EDA_SAMPLE_ROWS rows, a number that many, 'false' none."""
+    if not value or value.lower() == 'false':
+        return None
+    if value.lower() == 'true':
+        return EDA_SAMPLE_ROWS
+    try:
+        rows = int(value)
+    except ValueError:
+        rows = 0
+    if rows < 1:
+        raise HTTPException(status_code=400, detail='edaSample must be true, false or a positive number of rows.')
+    return rows
+
+
+def _resolve_recipe(recipe: str | None, recipe_from: str | None) -> Dict[str, Any] | None:
+    """The cleaning recipe for an upload: inline JSON, or the one stored for dataset `recipe_from`."""
+    if recipe:
+        try:
+            return validate_recipe(json.loads(recipe))
+        except ValueError as e:  # bad JSON or RecipeError
+            raise HTTPException(status_code=400, detail=f'Invalid recipe: {e}')
+    if recipe_from:
+        stored = load_recipe(_cleaned_path(recipe_from))
+        if stored is None:
+            raise HTTPException(status_code=404, detail=f'No cleaning recipe stored for {recipe_from}')
+        return stored
+    return None
+
+
+def _invalidate_cleaned(cleaned_filename: str) -> None:
+    """The cleaned file was rewritten: drop any stale parsed copy and aggregations of it."""
+    cleaned_path = CLEANED_DIR / cleaned_filename
+    for path in (columnar_path(cleaned_path), cleaned_path):
+        dataset_registry.invalidate(path)
+        agg_cache.invalidate(path)
+
+
+@app.on_event('shutdown')
+def _shutdown_worker_pools():
+    upload_jobs.shutdown()
+    column_workers.shutdown()
+    shutdown_charts()
+    eda_cache.shutdown()
+
+
 @app.post('/upload')
 async def upload(
     file: UploadFile = File(...),
@@ -65,92 +223,111 @@ async def upload(
     outlierDetection: str | None = Form(default=None),
     aiProvider: str | None = Form(default=None),
     chartHeight: str | None = Form(default=None),
+    chunkedClean: str | None = Form(default=None),
+    sheet: str | None = Form(default=None),
+    recipe: str | None = Form(default=None),
+    recipeFrom: str | None = Form(default=None),
+    dedupKeys: str | None = Form(default=None),
+    edaSample: str | None = Form(default=None),
 ):
-    file_ext = file.filename.lower().split('.')[-1]
-    if file_ext not in ['csv', 'xlsx', 'xls']:
-        raise HTTPException(status_code=400, detail='Unsupported file type. Please upload a CSV or XLSX file.')
-    contents = await file.read()
-    save_path = UPLOAD_DIR / file.filename
-    with open(save_path, 'wb') as f:
-        f.write(contents)
+    save_path, file_ext, options = await _receive_upload(
+        file, autoClean, outlierDetection, aiProvider, chartHeight, chunkedClean, sheet, recipe, recipeFrom, dedupKeys,
+        edaSample,
+    )
 
-    # Load into DataFrame from bytes
-    if file_ext == 'csv':
-        df = pd.read_csv(io.BytesIO(contents))
-    else:  # xlsx or xls
-        df = pd.read_excel(io.BytesIO(contents))
+    # Run the CPU-bound pipeline off the event loop so other requests stay responsive
+    try:
+        response = await run_in_threadpool(
+            run_upload_pipeline, save_path, file.filename, file_ext, CLEANED_DIR, options
+        )
+    except (SheetNotFoundError, RecipeError, DedupKeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    _invalidate_cleaned(response['cleaned_filename'])
+    return FastJSONResponse(response)
 
-    # Parse settings flags
-    auto_clean_flag = True if (autoClean is None or autoClean.lower() == 'true') else False
-    outlier_flag = True if (outlierDetection is None or outlierDetection.lower() == 'true') else False
 
-    cleaned_df, cleaning_summary = clean_csv_and_summary(
-        df, auto_clean=auto_clean_flag, outlier_detection=outlier_flag
+@app.post('/upload/jobs')
+async def create_upload_job(
+    file: UploadFile = File(...),
+    autoClean: str | None = Form(default=None),
+    outlierDetection: str | None = Form(default=None),
+    aiProvider: str | None = Form(default=None),
+    chartHeight: str | None = Form(default=None),
+    chunkedClean: str | None = Form(default=None),
+    sheet: str | None = Form(default=None),
+    recipe: str | None = Form(default=None),
+    recipeFrom: str | None = Form(default=None),
+    dedupKeys: str | None = Form(default=None),
+    edaSample: str | None = Form(default=None),
+):
+    """Queue an upload for background processing and return its job id immediately.
+
+    Poll GET /upload/jobs/{job_id} or stream GET /upload/jobs/{job_id}/events
+    for per-stage progress; the finished job carries the /upload response.
+    """
+    save_path, file_ext, options = await _receive_upload(
+        file, autoClean, outlierDetection, aiProvider, chartHeight, chunkedClean, sheet, recipe, recipeFrom, dedupKeys,
+        edaSample,
     )
-    stats = generate_stats(cleaned_df)
-    correlations = generate_correlations(cleaned_df)
-    charts = generate_charts(cleaned_df)
-
-    insights = generate_insights(cleaned_df, stats, cleaning_summary)
-
-    # Save cleaned file (preserve original format or default to CSV)
-    base_name = file.filename.rsplit('.', 1)[0]
-    if file_ext in ['xlsx', 'xls']:
-        cleaned_filename = f"cleaned_{base_name}.xlsx"
-        cleaned_path = CLEANED_DIR / cleaned_filename
-        cleaned_df.to_excel(cleaned_path, index=False)
-    else:
-        cleaned_filename = f"cleaned_{file.filename}"
-        cleaned_path = CLEANED_DIR / cleaned_filename
-        cleaned_df.to_csv(cleaned_path, index=False)
-
-    response = {
-        'filename': file.filename,
-        'cleaned_filename': cleaned_filename,
-        'file_type': file_ext,
-        'columns': cleaned_df.columns.tolist(),
-        'row_count': int(cleaned_df.shape[0]),
-        'cleaning_summary': cleaning_summary,
-        'stats': stats,
-        'correlations': correlations,
-        'charts': charts,
-        'insights': insights,
-        'settings_used': {
-            'autoClean': auto_clean_flag,
-            'outlierDetection': outlier_flag,
-            'aiProvider': aiProvider,
-            'chartHeight': chartHeight,
-        }
-    }
-    return response
+    job = upload_jobs.submit(
+        save_path, file.filename, file_ext, CLEANED_DIR, options,
+        on_complete=lambda result: _invalidate_cleaned(result['cleaned_filename']),
+    )
+    if job is None:
+        raise HTTPException(status_code=429, detail='Too many uploads in progress. Please retry shortly.')
+    return job
+
+
+@app.get('/upload/jobs/{job_id}')
+def get_upload_job(job_id: str):
+    job = upload_jobs.snapshot(job_id, include_result=True)
+    if job is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+    return FastJSONResponse(job)
+
+
+@app.get('/upload/jobs/{job_id}/events')
+async def upload_job_events(job_id: str):
+    """Server-sent events with job progress until the job completes or fails."""
+    if upload_jobs.snapshot(job_id) is None:
+        raise HTTPException(status_code=404, detail='Job not found')
+
+    async def event_stream():
+        last = None
+        while True:
+            job = upload_jobs.snapshot(job_id)
+            if job is None:
+                return
+            if job != last:
+                event = job['status'] if job['status'] in ('completed', 'failed') else 'progress'
+                yield f"event: {event}\ndata: {json.dumps(job)}\n\n"
+                last = job
+            if job['status'] in ('completed', 'failed'):
+                return
+            await asyncio.sleep(0.5)
+
+    return StreamingResponse(event_stream(), media_type='text/event-stream')
 
 @app.get('/schema/{filename}')
 def get_schema(filename: str):
     # Load cleaned file first if exists else original upload
-    cleaned_path = CLEANED_DIR / f"cleaned_{filename}"
-    original_path = UPLOAD_DIR / filename
-    if cleaned_path.exists():
-        df = pd.read_csv(cleaned_path) if cleaned_path.suffix == '.csv' else pd.read_excel(cleaned_path)
-    elif original_path.exists():
-        df = pd.read_csv(original_path) if original_path.suffix == '.csv' else pd.read_excel(original_path)
-    else:
+    dataset_path = _resolve_dataset_path(filename)
+    if dataset_path is None:
         raise HTTPException(status_code=404, detail='File not found')
+    df = dataset_registry.get(dataset_path)
     schema = infer_schema(df)
     return {'schema': schema}
 
 @app.post('/visualize/{filename}')
 def visualize(filename: str, payload: Dict[str, Any]):
-    cleaned_path = CLEANED_DIR / f"cleaned_{filename}"
-    original_path = UPLOAD_DIR / filename
-    if cleaned_path.exists():
-        df = pd.read_csv(cleaned_path) if cleaned_path.suffix == '.csv' else pd.read_excel(cleaned_path)
-    elif original_path.exists():
-        df = pd.read_csv(original_path) if original_path.suffix == '.csv' else pd.read_excel(original_path)
-    else:
+    dataset_path = _resolve_dataset_path(filename)
+    if dataset_path is None:
         raise HTTPException(status_code=404, detail='File not found')
+    df = dataset_registry.get(dataset_path)
     try:
-        figure = build_figure(df, payload)
-        return {'figure': figure}
+        cube = _dataset_rollup(filename, dataset_path, df) if payload.get('preset') == 'time_series' else None
+        figure = build_figure(df, payload, fingerprint=dataset_registry.fingerprint(dataset_path), rollup=cube)
+        return FastJSONResponse({'figure': figure})
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -158,30 +335,27 @@ def visualize(filename: str, payload: Dict[str, Any]):
 @app.post('/nlviz/{filename}')
 def nlviz(filename: str, payload: Dict[str, Any]):
     """Build a chart from a natural-language prompt.
-    Body: { "prompt": "show me sales last month" }
+    Body: { "prompt": "show me sales last month", "max_points": 5000 (optional) }
     """
     prompt = payload.get('prompt', '') if isinstance(payload, dict) else ''
     if not prompt or not isinstance(prompt, str):
         raise HTTPException(status_code=400, detail='prompt is required')
 
-    cleaned_path = CLEANED_DIR / f"cleaned_{filename}"
-    original_path = UPLOAD_DIR / filename
-    if cleaned_path.exists():
-        df = pd.read_csv(cleaned_path) if cleaned_path.suffix == '.csv' else pd.read_excel(cleaned_path)
-    elif original_path.exists():
-        df = pd.read_csv(original_path) if original_path.suffix == '.csv' else pd.read_excel(original_path)
-    else:
+    dataset_path = _resolve_dataset_path(filename)
+    if dataset_path is None:
         raise HTTPException(status_code=404, detail='File not found')
+    df = dataset_registry.get(dataset_path)
 
     schema = infer_schema(df)
     try:
         plan = interpret_prompt(prompt, df, schema)
         filtered_df = df
+        start_ts = end_ts = None
         # Apply time filter if present
         tf = plan.get('time_filter')
         if tf and tf.get('date_col') in df.columns:
             date_col = tf['date_col']
-            s = pd.to_datetime(df[date_col], errors='coerce')
+            s = column_to_datetime(df, date_col)
             # Make both series and bounds timezone-naive for robust comparison
             try:
                 s = s.dt.tz_localize(None)
@@ -204,8 +378,19 @@ def nlviz(filename: str, payload: Dict[str, Any]):
                 mask &= s <= end_ts
             filtered_df = df.loc[mask]
 
-        figure = build_figure(filtered_df, plan['config'])
-        return { 'figure': figure, 'config': plan['config'], 'applied_filter': plan.get('time_filter'), 'explanation': plan.get('explanation') }
+        if payload.get('max_points') is not None:
+            plan['config']['max_points'] = payload['max_points']
+        applied = tf if filtered_df is not df else None
+        cube = None
+        if plan['config'].get('preset') == 'time_series':
+            cube = _dataset_rollup(filename, dataset_path, df)
+            if applied:
+                cube = rollup.window(cube, tf['date_col'], start_ts, end_ts)
+        figure = build_figure(
+            filtered_df, plan['config'], fingerprint=dataset_registry.fingerprint(dataset_path), filters=applied,
+            rollup=cube,
+        )
+        return FastJSONResponse({ 'figure': figure, 'config': plan['config'], 'applied_filter': plan.get('time_filter'), 'explanation': plan.get('explanation') })
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
@@ -213,7 +398,12 @@ def nlviz(filename: str, payload: Dict[str, Any]):
 @app.get('/download/{filename}')
 def download_cleaned(filename: str):
     file_path = CLEANED_DIR / filename
-    if not file_path.exists():
+    sidecar_path = columnar_path(file_path)
+    if sidecar_path.exists():
+        # Export from the columnar copy on demand (or when the export is stale)
+        if not file_path.exists() or file_path.stat().st_mtime_ns < sidecar_path.stat().st_mtime_ns:
+            export_text(dataset_registry.get(sidecar_path), file_path)
+    elif not file_path.exists():
         raise HTTPException(status_code=404, detail='File not found')
     from fastapi.responses import FileResponse
     
@@ -245,25 +435,19 @@ async def chat(payload: Dict[str, Any]):
         raise HTTPException(status_code=400, detail='filename and question are required')
 
     # Load cleaned file first, fallback to original
-    cleaned_path = CLEANED_DIR / f"cleaned_{filename}"
-    original_path = UPLOAD_DIR / filename
+    dataset_path = _resolve_dataset_path(filename)
     
-    print(f"[CHAT DEBUG] Checking paths - cleaned: {cleaned_path.exists()}, original: {original_path.exists()}")
+    print(f"[CHAT DEBUG] Resolved dataset path: {dataset_path}")
     
-    if cleaned_path.exists():
-        file_ext = cleaned_path.suffix.lower()
-        df = pd.read_csv(cleaned_path) if file_ext == '.csv' else pd.read_excel(cleaned_path)
-    elif original_path.exists():
-        file_ext = original_path.suffix.lower()
-        df = pd.read_csv(original_path) if file_ext == '.csv' else pd.read_excel(original_path)
-    else:
-        print(f"[CHAT DEBUG] File not found - cleaned: {cleaned_path}, original: {original_path}")
+    if dataset_path is None:
+        print(f"[CHAT DEBUG] File not found - cleaned: {CLEANED_DIR / f'cleaned_{filename}'}, original: {UPLOAD_DIR / filename}")
         raise HTTPException(status_code=404, detail=f'File not found: {filename}')
+    df = dataset_registry.get(dataset_path)
 
     try:
         # Generate context about the data
-        print(f"[CHAT DEBUG] Generating stats for df with shape {df.shape}")
-        stats = generate_stats(df)
+        # Stats are computed once per dataset version, not per question
+        stats = cached_stats(dataset_registry.fingerprint(dataset_path), df)
         
         # Use AI to answer the question in simple terms
         from chat_handler import answer_question
@@ -347,6 +531,129 @@ def health():
     return {'status': 'ok'}
 
 
+@app.get('/datasets/cache/stats')
+def dataset_cache_stats():
+    """Hit/miss counters and memory usage of the in-process dataset registry."""
+    return dataset_registry.stats()
+
+
+@app.get('/visualize/cache/stats')
+def visualize_cache_stats():
+    """Hit/miss counters and memory usage of the aggregated-frame cache behind /visualize and /nlviz."""
+    return agg_cache.stats()
+
+
+@app.get('/datasets/{filename}/recipe')
+def get_dataset_recipe(filename: str):
+    """The cleaning recipe recorded for an uploaded dataset.
+
+    Send it back as the `recipe` form field of /upload (or name the dataset
+    in `recipeFrom`) to clean a new file of the same schema identically.
+    """
+    recipe = load_recipe(_cleaned_path(filename))
+    if recipe is None:
+        raise HTTPException(status_code=404, detail='No cleaning recipe stored for this dataset')
+    return recipe
+
+
+@app.get('/datasets/{filename}/correlations')
+def get_dataset_correlations(filename: str, method: str = 'pearson', top: int = 10):
+    """Full correlation matrix of the numeric columns, for heatmaps.
+
+    `method` is 'pearson' or 'spearman'; `top` strongest pairs are listed too.
+    Undefined entries (constant columns) are null.
+    """
+    if method not in CORRELATION_METHODS:
+        raise HTTPException(status_code=400, detail=f"method must be one of {list(CORRELATION_METHODS)}")
+    dataset_path = _resolve_dataset_path(filename)
+    if dataset_path is None:
+        raise HTTPException(status_code=404, detail='File not found')
+    cols, corr = get_correlations(dataset_registry.get(dataset_path), method)
+    return FastJSONResponse({
+        'method': method,
+        'columns': cols,
+        'matrix': matrix_payload(corr),
+        'top_pairs': top_pairs(cols, corr, max(top, 0)),
+    })
+
+
+@app.get('/datasets/{filename}/report')
+def get_dataset_report(filename: str):
+    """Stats, correlations, overview charts and insights of the dataset's current version.
+
+    Served from the EDA cache when neither the dataset nor the EDA code has
+    changed since the report was built (at upload, or by an earlier call);
+    computed and stored otherwise, with the insights of the dataset's last
+    report (insights are only generated at upload; null if there are none).
+    """
+    dataset_path = _resolve_dataset_path(filename)
+    if dataset_path is None:
+        raise HTTPException(status_code=404, detail='File not found')
+    options = eda_cache.recipe_options(load_recipe(_cleaned_path(filename)))
+    key = eda_cache.report_key(filename, dataset_path, options)
+    report = eda_cache.lookup(key)
+    cache_hit = report is not None
+    if report is None:
+        insights = eda_cache.latest_insights(filename)
+        report = eda_cache.store(key, filename, eda_cache.build_report(dataset_registry.get(dataset_path), insights))
+    return FastJSONResponse({'filename': filename, **report, 'eda_version': eda_cache.EDA_VERSION, 'cache_hit': cache_hit})
+
+
+@app.post('/datasets/{filename}/append')
+async def append_dataset(filename: str, file: UploadFile = File(...)):
+    """Append new rows (CSV/XLSX with the dataset's columns) to an uploaded dataset.
+
+    Only the new rows are cleaned, with the dataset's fills, date columns and
+    clip bounds; duplicates of any earlier row are skipped. Stats and
+    correlations are updated from running aggregates, not recomputed.
+    """
+    cleaned_path = _cleaned_path(filename)
+    sidecar_path = columnar_path(cleaned_path)
+    artifact_path = sidecar_path if sidecar_path.exists() else cleaned_path
+    if not artifact_path.exists():
+        raise HTTPException(status_code=404, detail='Dataset not found. Upload it first.')
+    delta_ext = (file.filename or '').lower().split('.')[-1]
+    if delta_ext not in ['csv', 'xlsx', 'xls']:
+        raise HTTPException(status_code=400, detail='Unsupported file type. Please upload a CSV or XLSX file.')
+
+    scratch_path = UPLOAD_DIR / f".append_{uuid.uuid4().hex}.{delta_ext}"
+    try:
+        await save_upload_stream(file, scratch_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    def bootstrap(options: Dict[str, Any], profile):
+        # No running state yet: clean the original upload once more to build it
+        raw_path = UPLOAD_DIR / filename
+        if not raw_path.exists():
+            raise HTTPException(status_code=409, detail='Original upload not found; re-upload the dataset before appending.')
+        df, memory_report = optimize_dtypes(read_upload(raw_path, filename.lower().split('.')[-1], options.get('sheet')))
+        profile(df)
+        if options.get('recipe'):
+            cleaned_df, summary = apply_recipe(df, options['recipe'])
+        else:
+            cleaned_df, summary = clean_csv_and_summary(
+                df, auto_clean=options.get('autoClean', True), outlier_detection=options.get('outlierDetection', True),
+                dedup_subset=options.get('dedupKeys'),
+            )
+        summary['memory_optimization'] = memory_report
+        return cleaned_df, summary
+
+    def run_append() -> Dict[str, Any]:
+        with dataset_append.dataset_lock(cleaned_path):
+            delta = read_upload(scratch_path, delta_ext)
+            return dataset_append.append_rows(cleaned_path, artifact_path, delta, bootstrap)
+
+    try:
+        result = await run_in_threadpool(run_append)
+    except (dataset_append.AppendSchemaError, RecipeError, DedupKeyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    finally:
+        scratch_path.unlink(missing_ok=True)
+    _invalidate_cleaned(cleaned_path.name)
+    return {'filename': filename, 'cleaned_filename': cleaned_path.name, **result}
+
+
 # ============================================
 # ANOMALY DETECTION ENDPOINTS
 # ============================================
@@ -354,23 +661,48 @@ def health():
 @app.post('/anomalies/detect')
 async def detect_anomalies(
     file: UploadFile = File(...),
-    sensitivity: str = Form(default='medium')
+    sensitivity: str = Form(default='medium'),
+    keyColumns: str | None = Form(default=None),
 ):
     """
     Detect anomalies in uploaded dataset
     Returns: Comprehensive anomaly report with alerts
     """
     from anomaly_detector import AnomalyDetector, save_alert
+    key_columns = _parse_columns(keyColumns, 'keyColumns')
     
-    # Read uploaded file
-    contents = await file.read()
+    # Stream uploaded file to a scratch file instead of buffering it; openpyxl
+    # goes by the extension, so the scratch file keeps the upload's
+    file_ext = (file.filename or '').lower().split('.')[-1]
+    scratch_path = UPLOAD_DIR / f".anomalies_{uuid.uuid4().hex}.{file_ext}"
     try:
-        df = pd.read_csv(io.BytesIO(contents))
-    except:
-        df = pd.read_excel(io.BytesIO(contents))
+        await save_upload_stream(file, scratch_path)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    try:
+        if file_ext in ('xlsx', 'xls'):
+            df = read_upload(scratch_path, file_ext)
+        else:
+            try:
+                df = read_upload(scratch_path, 'csv')
+            except ValueError:
+                # Not a CSV after all: an .xlsx workbook is a zip archive, anything else legacy .xls
+                if zipfile.is_zipfile(scratch_path):
+                    workbook = scratch_path.rename(scratch_path.with_suffix('.xlsx'))
+                    try:
+                        df = read_upload(workbook, 'xlsx')
+                    finally:
+                        workbook.unlink(missing_ok=True)
+                else:
+                    df = read_upload(scratch_path, 'xls')
+    finally:
+        scratch_path.unlink(missing_ok=True)
     
     # Run detection
-    detector = AnomalyDetector(sensitivity=sensitivity)
+    missing = [col for col in key_columns or [] if col not in df.columns]
+    if missing:
+        raise HTTPException(status_code=400, detail=f'keyColumns not found in the file: {missing}')
+    detector = AnomalyDetector(sensitivity=sensitivity, key_columns=key_columns)
     report = detector.run_full_analysis(df)
     
     # Save alert if anomalies found
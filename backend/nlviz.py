@@ -4,6 +4,8 @@ import re
 import pandas as pd
 from datetime import datetime, timedelta, timezone
 
+from date_detection import datetime_profile
+
 # Heuristic interpreter for natural-language viz prompts.
 # Returns a plan: { 'config': <viz_engine config>, 'time_filter': {'date_col': str, 'start': iso|None, 'end': iso|None} | None }
 
@@ -242,8 +244,7 @@ def interpret_prompt(prompt: str, df: pd.DataFrame, schema: Dict[str, List[str]]
         # try to detect from categorical if any look like date
         for c in categorical:
             try:
-                parsed = pd.to_datetime(df[c], errors='coerce')
-                if parsed.notna().mean() > 0.7:
+                if datetime_profile(df, c)['ratio'] > 0.7:
                     datetime_cols = [c]
                     break
             except Exception:
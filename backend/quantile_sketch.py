@@ -0,0 +1,127 @@
+"""Mergeable quantile sketch (KLL) for streaming IQR bounds and medians.
+
+A `QuantileSketch` keeps a few thousand values however many it has seen:
+values enter level 0, and a level that outgrows its capacity is sorted and
+every other value (odd or even positions, at random) moves up a level with
+twice the weight. Sketches of different chunks or workers `merge` into one
+that answers for all of them.
+
+Every compaction moves a quantile's rank by at most its weight, up or
+down with equal odds, so `rank_error()` turns the compactions actually
+done into a bound on the rank error (as a fraction of the count) that
+holds with the given confidence. A sketch that never compacted is exact.
+
+Approximate quantiles are opt-in: the exact paths stay the default.
+
+Config (env):
+- APPROX_QUANTILES: 'true' to use sketches where data is streamed (default false)
+- QUANTILE_SKETCH_ERROR: target rank error, sets the sketch size (default 0.01)
+"""
+from __future__ import annotations
+import math
+import os
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+
+APPROX_QUANTILES = os.getenv('APPROX_QUANTILES', 'false').lower() == 'true'
+QUANTILE_SKETCH_ERROR = float(os.getenv('QUANTILE_SKETCH_ERROR', '0.01'))
+SKETCH_CONFIDENCE = 0.99
+
+
+def sketch_size(error: float = QUANTILE_SKETCH_ERROR) -> int:
+    """Top-level capacity k whose rank_error() stays below `error`."""
+    return max(8, int(math.ceil(6.0 / error)))
+
+
+class QuantileSketch:
+    def __init__(self, error: float = QUANTILE_SKETCH_ERROR, seed: int = 0):
+        self.k = sketch_size(error)
+        self.n = 0
+        self.levels: List[np.ndarray] = [np.empty(0)]
+        # Sum of squared compaction weights: the variance of any rank's error
+        self.error_var = 0.0
+        self._rng = np.random.default_rng(seed)
+
+    def _capacity(self, h: int) -> int:
+        return max(2, int(math.ceil(self.k * (2 / 3) ** (len(self.levels) - 1 - h))))
+
+    def _compress(self) -> None:
+        h = 0
+        while h < len(self.levels):
+            items = self.levels[h]
+            if len(items) > self._capacity(h):
+                items = np.sort(items)
+                odd = len(items) % 2
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0))
+                promoted = items[odd + int(self._rng.integers(2))::2]
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], promoted])
+                self.levels[h] = items[:odd]
+                self.error_var += 4.0 ** h
+            h += 1
+
+    def update(self, values: np.ndarray) -> 'QuantileSketch':
+        """Add the non-NaN `values`; a whole chunk at a time is cheapest."""
+        values = np.asarray(values, dtype='float64').ravel()
+        values = values[~np.isnan(values)]
+        if len(values):
+            self.n += len(values)
+            self.levels[0] = np.concatenate([self.levels[0], values])
+            self._compress()
+        return self
+
+    def merge(self, other: 'QuantileSketch') -> 'QuantileSketch':
+        """Fold `other` (e.g. another chunk's sketch) into this one."""
+        for h, items in enumerate(other.levels):
+            if h == len(self.levels):
+                self.levels.append(np.empty(0))
+            self.levels[h] = np.concatenate([self.levels[h], items])
+        self.n += other.n
+        self.error_var += other.error_var
+        self._compress()
+        return self
+
+    def quantiles(self, qs: Sequence[float]) -> np.ndarray:
+        """Approximate quantiles; exact (linear interpolation) while nothing was compacted."""
+        if self.n == 0:
+            return np.full(len(qs), np.nan)
+        if self.error_var == 0:
+            return np.quantile(self.levels[0], qs)
+        values = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(items), 2.0 ** h) for h, items in enumerate(self.levels)])
+        order = np.argsort(values, kind='stable')
+        values, cum = values[order], np.cumsum(weights[order])
+        idx = np.searchsorted(cum, np.asarray(qs, dtype='float64') * (self.n - 1), side='right')
+        return values[np.minimum(idx, len(values) - 1)]
+
+    def rank_error(self, confidence: float = SKETCH_CONFIDENCE) -> float:
+        """Bound on |rank error| / n for any one quantile, holding with `confidence` (Hoeffding)."""
+        if self.n == 0 or self.error_var == 0:
+            return 0.0
+        return math.sqrt(2.0 * math.log(2.0 / (1.0 - confidence)) * self.error_var) / self.n
+
+    def to_state(self) -> Dict[str, Any]:
+        """JSON-able sizes and counters; `items()` holds the values."""
+        return {'k': self.k, 'n': self.n, 'error_var': self.error_var, 'sizes': [len(items) for items in self.levels]}
+
+    def items(self) -> np.ndarray:
+        return np.concatenate(self.levels)
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], items: np.ndarray) -> 'QuantileSketch':
+        sketch = cls(seed=int(state['n']))
+        sketch.k, sketch.n, sketch.error_var = int(state['k']), int(state['n']), float(state['error_var'])
+        bounds = np.cumsum([0] + list(state['sizes']))
+        sketch.levels = [np.asarray(items[bounds[h]:bounds[h + 1]], dtype='float64') for h in range(len(state['sizes']))]
+        return sketch
+
+
+def sketch_report(sketches: Dict[str, QuantileSketch]) -> Dict[str, Any]:
+    """Summary entry for quantiles taken from `sketches`: the worst column's error bound."""
+    return {
+        'method': 'kll',
+        'target_rank_error': QUANTILE_SKETCH_ERROR,
+        'rank_error': max((s.rank_error() for s in sketches.values()), default=0.0),
+        'confidence': SKETCH_CONFIDENCE,
+    }
@@ -0,0 +1,226 @@
+"""Daily rollup cube behind the time-series charts.
+
+A time_series figure groups every row by day, week, month, quarter or
+year, so switching the grain in the UI rescans the whole dataset. At
+upload the cleaned frame is rolled up once per (date column, numeric
+column) pair into daily count, sum, min, max and M2 (sum of squared
+deviations from the day's mean). Coarser grains and sum, mean, count, min,
+max, std and var are derived from those days, so a chart reads a few
+thousand cube rows instead of millions of dataset rows.
+
+The cube is a long frame with columns date_col, measure, day, count, sum,
+min, max, m2. It is stored as ``<cleaned name>.rollup.arrow``, stamped
+with the (mtime, size) of the dataset artifact it summarises. A cube whose
+stamp no longer matches is ignored and rebuilt on the next request. Appends
+fold the new rows' cube in and re-stamp it (see dataset_append). Days are
+merged with Chan's parallel update of M2, as in dataset_append's
+co-moments, which stays accurate where a plain sum of squares would
+cancel.
+
+Date columns are datetime columns and text columns that mostly parse as
+dates (with their sniffed format, as the charts parse them). A request the
+cube cannot answer (another aggregation such as median, a pair that is not
+in it, an unknown grain) returns None and the caller groups the rows.
+"""
+from __future__ import annotations
+import json
+from pathlib import Path
+from typing import Any, Dict, List
+
+import numpy as np
+import pandas as pd
+
+from date_detection import datetime_profile, parse_datetime
+from dataset_store import feather, pa, rollup_path
+
+GRAINS = ('D', 'W', 'M', 'Q', 'Y')
+AGGS = ('sum', 'mean', 'count', 'min', 'max', 'std', 'var')
+# Share of parseable values above which a text column counts as a date column
+TEXT_DATE_RATIO = 0.6
+_META_KEY = b'rollup'
+
+
+def _date_columns(df: pd.DataFrame) -> Dict[str, str | None]:
+    """Date column -> the format its text parses with (None for datetime columns)."""
+    formats: Dict[str, str | None] = {}
+    for col in df.columns:
+        s = df[col]
+        if pd.api.types.is_datetime64_any_dtype(s):
+            formats[col] = None
+        elif s.dtype == 'object' or isinstance(s.dtype, pd.CategoricalDtype):
+            profile = datetime_profile(df, col)
+            if profile['format'] is not None and profile['ratio'] > TEXT_DATE_RATIO:
+                formats[col] = profile['format']
+    return formats
+
+
+def build_rollup(
+    df: pd.DataFrame, formats: Dict[str, str | None] | None = None, measures: List[str] | None = None,
+) -> pd.DataFrame:
+    """The daily cube of `df` (date columns and measures detected unless given)."""
+    formats = _date_columns(df) if formats is None else formats
+    if measures is None:
+        measures = [c for c in df.select_dtypes(include=['number']).columns if c not in formats]
+    values = pd.DataFrame(
+        {m: df[m].to_numpy(dtype='float64', na_value=np.nan) for m in measures}, index=df.index,
+    )
+    parts = []
+    for col, fmt in formats.items():
+        when = df[col] if fmt is None else parse_datetime(df[col], fmt)
+        day = when.dt.to_period('D').dt.to_timestamp()
+        keep = day.notna().to_numpy()
+        grouped = values[keep].groupby(day[keep].to_numpy())
+        count, total = grouped.count(), grouped.sum()
+        low, high = grouped.min(), grouped.max()
+        m2 = grouped.var(ddof=0) * count
+        for m in measures:
+            part = pd.DataFrame({
+                'date_col': col, 'measure': m, 'day': count.index,
+                'count': count[m].to_numpy(dtype='int64'), 'sum': total[m].to_numpy(),
+                'min': low[m].to_numpy(), 'max': high[m].to_numpy(), 'm2': m2[m].fillna(0.0).to_numpy(),
+            })
+            # Days where the measure is all null have no (date, value) rows to plot
+            parts.append(part[part['count'] > 0])
+    columns = ['date_col', 'measure', 'day', 'count', 'sum', 'min', 'max', 'm2']
+    cube = pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=columns)
+    cube.attrs['rollup'] = {
+        'formats': formats,
+        'measures': list(measures),
+        'integer_measures': [m for m in measures if pd.api.types.is_integer_dtype(df[m])],
+    }
+    return cube
+
+
+def _combine(cube: pd.DataFrame, keys: List[pd.Series]) -> pd.DataFrame:
+    """count/sum/min/max/m2 of the cube rows sharing `keys`."""
+    grouped = cube.groupby(keys, sort=True)
+    out = grouped.agg(count=('count', 'sum'), sum=('sum', 'sum'), min=('min', 'min'), max=('max', 'max'))
+    # Chan et al.: the union's M2 is the parts' M2 plus their spread around the union's mean
+    group_mean = grouped['sum'].transform('sum') / grouped['count'].transform('sum')
+    spread = cube['count'] * (cube['sum'] / cube['count'] - group_mean) ** 2
+    out['m2'] = (cube['m2'] + spread).groupby(keys, sort=True).sum()
+    return out
+
+
+def merge(cube: pd.DataFrame, extra: pd.DataFrame) -> pd.DataFrame:
+    """One cube holding the rows summarised by both (same date columns and measures)."""
+    both = pd.concat([cube, extra], ignore_index=True)
+    merged = _combine(both, [both['date_col'], both['measure'], both['day']]).reset_index()
+    meta, extra_meta = cube.attrs['rollup'], extra.attrs['rollup']
+    merged.attrs['rollup'] = {
+        **meta,
+        'integer_measures': [m for m in meta['integer_measures'] if m in extra_meta['integer_measures']],
+    }
+    return merged
+
+
+def fold(cleaned_path: Path, cube: pd.DataFrame, rows: pd.DataFrame, dataset_path: Path) -> None:
+    """Store `cube` with `rows`, just appended to the artifact at `dataset_path`, rolled into it."""
+    meta = cube.attrs['rollup']
+    try:
+        merged = merge(cube, build_rollup(rows, meta['formats'], meta['measures']))
+    except (KeyError, TypeError, ValueError) as e:
+        # Left stale: the next time-series request rebuilds it from the whole dataset
+        print(f"[ROLLUP] Could not fold appended rows: {type(e).__name__}: {e}")
+        return
+    save_rollup(cleaned_path, merged, dataset_path)
+
+
+def time_series(cube: pd.DataFrame | None, x: str, y: str, grain: str, agg: str) -> pd.DataFrame | None:
+    """[x, y] frame of `agg` of `y` per `grain` period of `x`, as viz_engine groups it; None if the cube cannot tell."""
+    if cube is None or grain not in GRAINS or agg not in AGGS:
+        return None
+    part = cube[(cube['date_col'] == x) & (cube['measure'] == y)]
+    if part.empty:
+        return None
+    key = part['day'] if grain == 'D' else part['day'].dt.to_period(grain).dt.to_timestamp()
+    totals = _combine(part, [key.rename(x)])
+    if agg == 'mean':
+        values = totals['sum'] / totals['count']
+    elif agg in ('var', 'std'):
+        # ddof=1 like pandas: a single row has no variance
+        values = (totals['m2'] / (totals['count'] - 1)).where(totals['count'] > 1)
+        values = np.sqrt(values) if agg == 'std' else values
+    else:
+        values = totals[agg]
+        if agg != 'count' and y in cube.attrs.get('rollup', {}).get('integer_measures', []):
+            values = values.astype('int64')
+    return values.rename(y).reset_index()
+
+
+def window(cube: pd.DataFrame | None, date_col: str, start: pd.Timestamp | None, end: pd.Timestamp | None) -> pd.DataFrame | None:
+    """The part of the cube for rows of `date_col` within [start, end], or None unless that is whole days.
+
+    The windows /nlviz builds run from midnight to 23:59:59; such an end
+    is taken to cover its whole day.
+    """
+    if cube is None:
+        return None
+    if start is not None and start != start.normalize():
+        return None
+    if end is not None and end - end.normalize() < pd.Timedelta(hours=23, minutes=59, seconds=59):
+        return None
+    keep = cube['date_col'] == date_col
+    if start is not None:
+        keep &= cube['day'] >= start
+    if end is not None:
+        keep &= cube['day'] <= end.normalize()
+    part = cube[keep]
+    part.attrs = cube.attrs
+    return part
+
+
+def _stamp(dataset_path: Path) -> List[int]:
+    st = Path(dataset_path).stat()
+    return [st.st_mtime_ns, st.st_size]
+
+
+def save_rollup(cleaned_path: Path, cube: pd.DataFrame, dataset_path: Path) -> bool:
+    """Store `cube` as the rollup of the artifact at `dataset_path`. Returns False if not possible."""
+    if feather is None:
+        return False
+    path = rollup_path(Path(cleaned_path))
+    tmp_path = path.with_name(path.name + '.tmp')
+    try:
+        table = pa.Table.from_pandas(cube, preserve_index=False)
+        meta = {**cube.attrs['rollup'], 'dataset': _stamp(dataset_path)}
+        table = table.replace_schema_metadata({**(table.schema.metadata or {}), _META_KEY: json.dumps(meta)})
+        feather.write_feather(table, tmp_path, compression='uncompressed')
+        tmp_path.replace(path)
+        return True
+    except Exception as e:
+        print(f"[ROLLUP] Write failed for {path.name}: {type(e).__name__}: {e}")
+        tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def load_rollup(cleaned_path: Path, dataset_path: Path) -> pd.DataFrame | None:
+    """The stored cube if it summarises the artifact at `dataset_path` as it is now, else None."""
+    path = rollup_path(Path(cleaned_path))
+    if feather is None or not path.exists():
+        return None
+    try:
+        table = feather.read_table(path)
+        meta: Dict[str, Any] = json.loads(table.schema.metadata[_META_KEY])
+        if meta.pop('dataset') != _stamp(dataset_path):
+            return None
+        cube = table.to_pandas()
+    except Exception as e:
+        print(f"[ROLLUP] Read failed for {path.name}: {type(e).__name__}: {e}")
+        return None
+    cube.attrs['rollup'] = meta
+    return cube
+
+
+def get_rollup(cleaned_path: Path, dataset_path: Path, df: pd.DataFrame) -> pd.DataFrame | None:
+    """The cube of `df`, the dataset stored at `dataset_path`: the stored one, else built and stored now.
+
+    None when it cannot be stored (no pyarrow): building it per request
+    would cost as much as grouping the rows.
+    """
+    cube = load_rollup(cleaned_path, dataset_path)
+    if cube is None and feather is not None:
+        cube = build_rollup(df)
+        save_rollup(cleaned_path, cube, dataset_path)
+        print(f"[ROLLUP] Built for {Path(cleaned_path).name}: {len(cube)} rows")
+    return cube
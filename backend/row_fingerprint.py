@@ -0,0 +1,180 @@
+"""64-bit row fingerprints shared by deduplication and duplicate reporting.
+
+`row_hashes` hashes each column once with pandas' vectorised hash_array
+and folds the columns into one uint64 per row; pass `subset` to compare
+rows on key columns only. Numbers hash by value, so 5, 5.0 and a
+category holding 5 agree across chunks and dtypes, and large integer ids
+are not rounded through float64. `get_row_hashes` caches the result per
+frame object, so the cleaner's dedup, the append state and
+AnomalyDetector hash an upload once.
+
+Rows are duplicates when their fingerprints are equal; with 64 bits a
+false match needs billions of distinct rows to become likely.
+
+`SeenHashes` answers "seen before?" for a stream of chunks without a
+Python set: hashes are kept as sorted numpy runs and, past
+DEDUP_MEMORY_HASHES, spilled to sorted ``hashes_*.npy`` files
+(`HashRuns`) that are binary-searched through memory maps.
+
+Config (env):
+- DEDUP_MEMORY_HASHES: hashes held in memory before spilling to disk (default 16M, 128 MB)
+"""
+from __future__ import annotations
+import os
+import threading
+import weakref
+from pathlib import Path
+from typing import Any, Dict, List, Sequence
+
+import numpy as np
+import pandas as pd
+
+DEDUP_MEMORY_HASHES = int(os.getenv('DEDUP_MEMORY_HASHES', str(16 * 1024 * 1024)))
+MAX_HASH_RUNS = 8
+_MIX = np.uint64(0x100000001B3)
+
+# id(frame) -> {(shape, dtypes, subset): hashes}; entries are removed when the frame is collected
+_cache: Dict[int, Dict[Any, Any]] = {}
+_cache_lock = threading.Lock()
+
+
+def _column_hash(s: pd.Series) -> np.ndarray:
+    if pd.api.types.is_bool_dtype(s) or not pd.api.types.is_numeric_dtype(s):
+        return pd.util.hash_pandas_object(s, index=False).to_numpy()
+    if pd.api.types.is_integer_dtype(s) and not s.hasnans:
+        return pd.util.hash_array(s.to_numpy(dtype='int64'))
+    values = s.to_numpy(dtype='float64', na_value=np.nan)
+    hashes = pd.util.hash_array(values)
+    with np.errstate(invalid='ignore'):
+        integral = (np.floor(values) == values) & (np.abs(values) < 2.0 ** 63)
+    if integral.any():
+        hashes[integral] = pd.util.hash_array(values[integral].astype('int64'))
+    return hashes
+
+
+def row_hashes(df: pd.DataFrame, subset: Sequence[str] | None = None) -> np.ndarray:
+    """One uint64 fingerprint per row of `df` (or of its `subset` columns)."""
+    out = np.zeros(len(df), dtype='uint64')
+    for col in (subset or df.columns):
+        out *= _MIX
+        out ^= _column_hash(df[col])
+    return out
+
+
+def get_row_hashes(df: pd.DataFrame, subset: Sequence[str] | None = None) -> np.ndarray:
+    """`row_hashes(df, subset)`, cached per frame object like column_profile.get_profile."""
+    key = (df.shape, tuple(str(t) for t in df.dtypes), tuple(subset) if subset else None)
+    entry = _cache.get(id(df))
+    if entry is None or key not in entry:
+        with _cache_lock:
+            if id(df) not in _cache:
+                weakref.finalize(df, _cache.pop, id(df), None)
+                _cache[id(df)] = {}
+            entry = _cache[id(df)]
+            # Keep one entry per frame shape: a changed frame drops the rest
+            for stale in [k for k in entry if k[:2] != key[:2]]:
+                del entry[stale]
+            entry[key] = row_hashes(df, subset)
+    return entry[key]
+
+
+def first_occurrence(hashes: np.ndarray) -> np.ndarray:
+    """Mask of the first row of each fingerprint, like ~DataFrame.duplicated()."""
+    keep = np.zeros(len(hashes), dtype=bool)
+    keep[np.unique(hashes, return_index=True)[1]] = True
+    return keep
+
+
+def duplicate_report(hashes: np.ndarray) -> Dict[str, int]:
+    """Rows repeating an earlier row, and how many distinct rows are repeated."""
+    unique, counts = np.unique(hashes, return_counts=True)
+    return {
+        'duplicate_rows': int(len(hashes) - len(unique)),
+        'duplicate_groups': int((counts > 1).sum()),
+    }
+
+
+def _in_sorted(run: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+    if not len(run):
+        return np.zeros(len(hashes), dtype=bool)
+    idx = np.minimum(np.searchsorted(run, hashes), len(run) - 1)
+    return run[idx] == hashes
+
+
+class HashRuns:
+    """Sorted runs of hashes saved as ``hashes_NNNNNN.npy`` in `directory`.
+
+    With `max_runs`, adding a run past that many folds them back into one
+    (in memory) so lookups stay a handful of binary searches.
+    """
+
+    def __init__(self, directory: Path, max_runs: int | None = MAX_HASH_RUNS):
+        self.directory = directory
+        self.max_runs = max_runs
+
+    def paths(self) -> List[Path]:
+        return sorted(self.directory.glob('hashes_*.npy'))
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run_path in self.paths():
+            seen |= _in_sorted(np.load(run_path, mmap_mode='r'), hashes)
+        return seen
+
+    def add(self, hashes: np.ndarray) -> None:
+        runs = self.paths()
+        seq = int(runs[-1].stem.split('_')[1]) + 1 if runs else 1
+        np.save(self.directory / f"hashes_{seq:06d}.npy", np.sort(hashes, kind='stable'))
+        if self.max_runs is not None and len(runs) + 1 > self.max_runs:
+            runs = self.paths()
+            merged = np.sort(np.concatenate([np.load(p) for p in runs]), kind='stable')
+            np.save(self.directory / f"hashes_{seq + 1:06d}.npy", merged)
+            for p in runs:
+                p.unlink()
+
+
+class SeenHashes:
+    """Fingerprints of the rows kept so far in a stream of chunks.
+
+    In memory they are sorted runs merged like a binary counter (so a
+    lookup searches O(log n) runs); past `memory_hashes` they are written
+    to `spill_dir` as one more on-disk run. Without `spill_dir` everything
+    stays in memory.
+    """
+
+    def __init__(self, spill_dir: Path | None = None, memory_hashes: int = DEDUP_MEMORY_HASHES):
+        self.memory_hashes = memory_hashes
+        self._runs: List[np.ndarray] = []
+        self._disk: HashRuns | None = None
+        if spill_dir is not None:
+            spill_dir.mkdir(exist_ok=True)
+            self._disk = HashRuns(spill_dir, max_runs=None)
+
+    def contains(self, hashes: np.ndarray) -> np.ndarray:
+        """Membership of sorted `hashes` (sorted queries keep the searches cache-friendly)."""
+        seen = np.zeros(len(hashes), dtype=bool)
+        for run in self._runs:
+            seen |= _in_sorted(run, hashes)
+        if self._disk is not None:
+            seen |= self._disk.contains(hashes)
+        return seen
+
+    def add(self, hashes: np.ndarray) -> None:
+        """Record sorted `hashes`."""
+        run = hashes
+        while self._runs and len(self._runs[-1]) <= len(run):
+            # Timsort merges two sorted runs in linear time
+            run = np.sort(np.concatenate([self._runs.pop(), run]), kind='stable')
+        self._runs.append(run)
+        if self._disk is not None and sum(len(r) for r in self._runs) > self.memory_hashes:
+            self._disk.add(np.concatenate(self._runs))
+            self._runs = []
+
+    def keep_unseen(self, hashes: np.ndarray) -> np.ndarray:
+        """Mask of rows not seen before (first occurrence wins); records them as seen."""
+        unique, first = np.unique(hashes, return_index=True)
+        new = ~self.contains(unique)
+        keep = np.zeros(len(hashes), dtype=bool)
+        keep[first[new]] = True
+        self.add(unique[new])
+        return keep
@@ -0,0 +1,78 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from agg_cache import AggregationCache, config_key
+import viz_engine
+from viz_engine import build_figure
+
+tmp_dir = Path(tempfile.mkdtemp())
+rng = np.random.default_rng(0)
+n = 20_000
+df = pd.DataFrame({
+    'Date': pd.date_range('2024-01-01', periods=n, freq='h'),
+    'Region': rng.choice(['North', 'South', 'East', 'West'], n),
+    'Stage': rng.choice(['Visit', 'Cart', 'Order'], n),
+    'Sales': rng.gamma(2.0, 50.0, n),
+})
+path = tmp_dir / 'sales.csv'
+df.to_csv(path, index=False)
+fingerprint = (str(path.resolve()), 1, 100)
+
+# Test 1: the config key ignores presentation fields
+print('=== TEST 1: Canonical config key ===')
+bar = {'preset': 'bar', 'x': 'Region', 'y': 'Sales', 'agg': 'sum', 'top_n': 3}
+assert config_key(bar) == config_key({**bar, 'title': 'Other title', 'max_points': 10})
+assert config_key(bar) == config_key(dict(reversed(list(bar.items()))))
+assert config_key(bar) != config_key({**bar, 'agg': 'mean'})
+assert config_key(bar) != config_key(bar, {'date_col': 'Date', 'start': '2024-02-01'})
+
+# Test 2: repeated figures reuse the aggregation and match the uncached figure
+print('\n=== TEST 2: Cached figures ===')
+viz_engine.agg_cache = cache = AggregationCache(max_bytes=10 * 1024 * 1024)
+configs = [
+    bar,
+    {'preset': 'time_series', 'x': 'Date', 'y': 'Sales', 'agg': 'sum', 'time_grain': 'W'},
+    {'preset': 'pie', 'category': 'Region', 'value': 'Sales', 'agg': 'mean'},
+    {'preset': 'heatmap', 'x': 'Region', 'y': 'Stage', 'value': 'Sales', 'agg': 'sum'},
+    {'preset': 'funnel', 'stage': 'Stage', 'value': 'Sales', 'agg': 'sum'},
+]
+for cfg in configs:
+    fresh = build_figure(df, cfg)
+    first = build_figure(df, cfg, fingerprint=fingerprint)
+    again = build_figure(df, {**cfg, 'title': 'Renamed'}, fingerprint=fingerprint)
+    assert first == fresh
+    assert again['data'] == fresh['data'] and again['layout']['title']['text'] == 'Renamed'
+print('STATS:', cache.stats())
+assert cache.stats()['misses'] == len(configs) and cache.stats()['hits'] == len(configs)
+assert cache.stats()['hit_rate'] == 0.5
+
+# Scatter plots rows, not an aggregation: nothing to cache
+build_figure(df, {'preset': 'scatter', 'x': 'Sales', 'y': 'Sales'}, fingerprint=fingerprint)
+assert cache.stats()['entries'] == len(configs)
+
+# Test 3: a filtered frame and a new dataset version get their own entries
+print('\n=== TEST 3: Filters and versions ===')
+recent = df[df['Date'] >= '2024-02-01']
+window = {'date_col': 'Date', 'start': '2024-02-01', 'end': None}
+filtered = build_figure(recent, bar, fingerprint=fingerprint, filters=window)
+assert filtered == build_figure(recent, bar)
+assert filtered != build_figure(df, bar, fingerprint=fingerprint)
+build_figure(df, bar, fingerprint=(fingerprint[0], 2, 100))
+assert cache.stats()['entries'] == len(configs) + 2
+
+assert cache.invalidate(path)
+assert cache.stats()['entries'] == 0 and cache.stats()['total_bytes'] == 0
+
+# Test 4: eviction by total bytes keeps the most recently used frames
+print('\n=== TEST 4: Byte-bounded eviction ===')
+wide = pd.DataFrame({'v': np.arange(1000, dtype='float64')})
+size = int(wide.memory_usage(index=True, deep=True).sum())
+small = AggregationCache(max_bytes=size * 2)
+for i in range(3):
+    small.get(fingerprint, {'preset': 'bar', 'x': f'c{i}'}, lambda: wide.copy())
+print('STATS:', small.stats())
+assert small.stats()['entries'] == 2 and small.stats()['evictions'] == 1
+assert small.stats()['total_bytes'] <= small.max_bytes
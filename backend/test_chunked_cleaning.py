@@ -0,0 +1,48 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from data_cleaner import clean_csv_and_summary, clean_csv_chunked
+
+tmp_dir = Path(tempfile.mkdtemp())
+rng = np.random.default_rng(7)
+n = 2000
+df = pd.DataFrame({
+    'Order Date': pd.date_range('2024-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M'),
+    'Region': rng.choice(['North', 'South', 'East', 'West'], n),
+    'Units': rng.integers(1, 20, n),
+    'Revenue': rng.normal(100, 15, n).round(2),
+})
+df.loc[rng.choice(n, 40, replace=False), 'Revenue'] = np.nan
+df.loc[rng.choice(n, 30, replace=False), 'Region'] = np.nan
+df.loc[rng.choice(n, 5, replace=False), 'Revenue'] = 10_000.0
+# Duplicates that straddle chunk boundaries
+df = pd.concat([df, df.iloc[[3, 700, 1500]]], ignore_index=True)
+path = tmp_dir / 'sales.csv'
+df.to_csv(path, index=False)
+
+expected_df, expected = clean_csv_and_summary(pd.read_csv(path))
+
+for suffix in ['.csv', '.arrow']:
+    print(f'=== TEST: chunked cleaning to {suffix} matches in-memory cleaning ===')
+    out = tmp_dir / f'cleaned{suffix}'
+    summary = clean_csv_chunked(path, out, chunksize=256)
+    print('SUMMARY:', summary['summary_text'])
+    assert set(summary) == set(expected)
+    for key in ['original_rows', 'rows_after_cleaning', 'duplicates_removed', 'numeric_missing_filled',
+                'categorical_missing_filled', 'date_columns_converted', 'summary_text']:
+        assert summary[key] == expected[key], (key, summary[key], expected[key])
+    assert summary['outliers_capped'].keys() == expected['outliers_capped'].keys()
+    for col, info in expected['outliers_capped'].items():
+        assert info['total_capped'] == summary['outliers_capped'][col]['total_capped']
+        assert abs(info['upper_bound'] - summary['outliers_capped'][col]['upper_bound']) < 1e-6
+
+    if suffix == '.csv':
+        result = pd.read_csv(out, parse_dates=['Order Date'])
+    else:
+        import pyarrow.feather as feather
+        result = feather.read_table(out).to_pandas()
+    assert len(result) == len(expected_df)
+    assert np.allclose(result['Revenue'].to_numpy(), expected_df['Revenue'].to_numpy())
+    assert (result['Region'].to_numpy() == expected_df['Region'].to_numpy()).all()
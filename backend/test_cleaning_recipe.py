@@ -0,0 +1,73 @@
+import json
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from data_cleaner import RecipeError, apply_recipe, clean_csv_and_summary, clean_csv_chunked
+
+n = 2000
+
+
+def make_frame(seed: int) -> pd.DataFrame:
+    r = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'Date': pd.date_range('2024-01-01', periods=n, freq='h').strftime('%Y-%m-%d %H:%M'),
+        'Region': r.choice(['North', 'South', 'East'], n),
+        'Sales': r.normal(100, 10, n),
+        'Units': r.integers(1, 20, n).astype('float64'),
+    })
+    df.loc[::13, 'Sales'] = np.nan
+    df.loc[::17, 'Region'] = None
+    df.loc[5, 'Sales'] = 10_000.0
+    return df
+
+
+raw = make_frame(1)
+raw = pd.concat([raw, raw.iloc[:25]], ignore_index=True)
+
+# Test 1: the cleaner emits a JSON-serialisable recipe with its decisions
+print('=== TEST 1: Recipe emitted ===')
+cleaned, summary = clean_csv_and_summary(raw.copy())
+recipe = json.loads(json.dumps(summary['recipe']))
+print('RECIPE FILL:', recipe['fill'], 'CLIP:', recipe['clip'])
+assert recipe['dedup'] == {'subset': None}
+assert recipe['date_formats'] == {'Date': '%Y-%m-%d %H:%M'}
+assert set(recipe['fill']) == {'Date', 'Region', 'Sales', 'Units'}
+assert 'Sales' in recipe['clip'] and recipe['columns']['Region'] == 'object'
+
+# Test 2: replaying on the same input reproduces the cleaned frame and counts
+print('\n=== TEST 2: Replay on the same data ===')
+replayed, replay_summary = apply_recipe(raw.copy(), recipe)
+pd.testing.assert_frame_equal(replayed.reset_index(drop=True), cleaned.reset_index(drop=True))
+for key in ('rows_after_cleaning', 'numeric_missing_filled', 'categorical_missing_filled', 'date_columns_converted'):
+    assert replay_summary[key] == summary[key], key
+assert replay_summary['outliers_capped']['Sales']['upper_bound'] == summary['outliers_capped']['Sales']['upper_bound']
+
+# Test 3: new data is cleaned with the recipe's constants, not its own profile
+print('\n=== TEST 3: New data uses the fixed constants ===')
+fresh = make_frame(2)
+fresh['Sales'] = fresh['Sales'] + 50
+out, _ = apply_recipe(fresh.copy(), recipe)
+assert (out.loc[fresh['Sales'].isna(), 'Sales'] == min(recipe['fill']['Sales'], recipe['clip']['Sales'][1])).all()
+assert out['Sales'].max() <= recipe['clip']['Sales'][1]
+assert (out.loc[fresh['Region'].isna(), 'Region'] == recipe['fill']['Region']).all()
+
+# Test 4: a file that does not fit the recipe is rejected
+print('\n=== TEST 4: Schema mismatch ===')
+try:
+    apply_recipe(fresh.drop(columns=['Units']), recipe)
+    raise AssertionError('expected RecipeError')
+except RecipeError as e:
+    print('REJECTED:', e)
+
+# Test 5: the chunked replay matches the in-memory one
+print('\n=== TEST 5: Chunked replay ===')
+with tempfile.TemporaryDirectory() as tmp:
+    src, dst = Path(tmp) / 'in.csv', Path(tmp) / 'out.csv'
+    raw.to_csv(src, index=False)
+    chunk_summary = clean_csv_chunked(src, dst, chunksize=300, recipe=recipe)
+    expected, _ = apply_recipe(pd.read_csv(src), recipe)
+    streamed = pd.read_csv(dst, parse_dates=['Date'])
+    assert chunk_summary['rows_after_cleaning'] == len(expected) == len(streamed)
+    pd.testing.assert_frame_equal(streamed, expected.reset_index(drop=True), check_dtype=False)
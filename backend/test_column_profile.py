@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+from anomaly_detector import AnomalyDetector
+from column_profile import get_profile, profile_columns
+from eda_engine import cached_stats, generate_stats
+
+rng = np.random.default_rng(7)
+n = 6001
+df = pd.DataFrame({f'm{i}': rng.normal(50, 5, n) * 10 ** (i % 4) for i in range(12)})
+df['Units'] = rng.integers(0, 100_000, n)
+df['Region'] = rng.choice(['North', 'South', 'East', None], n)
+df['Tier'] = pd.Categorical(rng.choice(['gold', 'silver'], n))
+df['When'] = pd.date_range('2024-01-01', periods=n, freq='h')
+for i in range(0, 12, 3):
+    df.loc[rng.choice(n, 100 * (i + 1), replace=False), f'm{i}'] = np.nan
+df.loc[rng.choice(n, 5, replace=False), 'm1'] = 1e6
+
+# Test 1: numeric moments and quantiles equal the per-column pandas results
+print('=== TEST 1: Numeric parity with pandas ===')
+profile = profile_columns(df)
+for col in df.select_dtypes(include=['number']).columns:
+    s, p = df[col].dropna(), profile[col]
+    assert p['count'] == len(s) and p['nulls'] == df[col].isna().sum()
+    assert (p['mean'], p['std'], p['min'], p['max']) == (df[col].mean(), df[col].std(), s.min(), s.max()), col
+    assert p['quantiles'] == {q: s.quantile(q) for q in (0.25, 0.5, 0.75)}, col
+    assert abs(p['distinct'] - s.nunique()) <= 0.05 * s.nunique(), col
+print('UNITS:', {k: profile['Units'][k] for k in ('count', 'distinct', 'mean')})
+
+# Test 2: text and datetime columns
+print('\n=== TEST 2: Text and datetime columns ===')
+for col in ('Region', 'Tier'):
+    p = profile[col]
+    assert p['nulls'] == df[col].isna().sum() and p['distinct'] == df[col].nunique()
+    assert p['top'] == df[col].mode().iloc[0] and p['freq'] == df[col].value_counts().max()
+    assert sorted(p['top_values'], key=lambda vc: -vc[1]) == [[v, n] for v, n in df[col].value_counts().head(5).items()]
+    lengths = df[col].dropna().astype(str).str.len()
+    assert p['length'] == {'min': lengths.min(), 'mean': lengths.mean(), 'max': lengths.max()}
+assert profile['When']['min'] == df['When'].min() and profile['When']['max'] == df['When'].max()
+print('REGION:', profile['Region'])
+
+# Test 3: the profile is cached per frame and shared by the consumers
+print('\n=== TEST 3: Cached and shared ===')
+cached = get_profile(df)
+assert get_profile(df) is cached
+assert get_profile(df.head(100)) is not cached and get_profile(df.head(100))['m0']['count'] <= 100
+stats = generate_stats(df)
+assert stats['numeric']['m3'] == {k: cached['m3'][k] for k in ('mean', 'std', 'min', 'max', 'count', 'nulls')} | {
+    'median': df['m3'].median(), 'p25': df['m3'].quantile(0.25), 'p75': df['m3'].quantile(0.75)}
+outliers = AnomalyDetector().detect_statistical_anomalies(df)
+print('OUTLIER COLUMNS:', [a['column'] for a in outliers])
+planted = next(a for a in outliers if a['column'] == 'm1')
+assert planted['count'] == 5 and set(planted['values']) == {1e6}
+
+# Test 4: full stats cover text and datetime columns and are cached per dataset version
+print('\n=== TEST 4: Full stats and the fingerprint cache ===')
+assert set(stats['categorical']) == {'Region', 'Tier'} and set(stats['datetime']) == {'When'}
+print('WHEN:', stats['datetime']['When'])
+assert stats['categorical']['Region']['top'] == profile['Region']['top']
+assert stats['datetime']['When']['span_days'] == (n - 1) / 24
+first = cached_stats(('data.csv', 1, 2), df)
+assert cached_stats(('data.csv', 1, 2), df.head(10)) is first
+assert cached_stats(('data.csv', 3, 2), df.head(10))['numeric']['m0']['count'] <= 10
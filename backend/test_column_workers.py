@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+import column_workers
+from data_cleaner import clean_csv_and_summary
+
+rng = np.random.default_rng(5)
+n = 20_000
+df = pd.DataFrame({
+    'Date': pd.date_range('2023-01-01', periods=n, freq='h').strftime('%d/%m/%Y %H:%M'),
+    'Region': pd.Categorical(rng.choice(['N', 'S', 'E'], n)),
+    'Sales': rng.normal(100, 15, n),
+    'Units': rng.integers(1, 50, n),
+    'Store': pd.array(rng.integers(1, 9, n), dtype='Int64'),
+    'Note': pd.array(rng.choice(['x', 'y', None], n), dtype='string'),
+    'Mixed': np.array([1, 'a', 2.5], dtype=object)[rng.integers(0, 3, n)],
+    'Seen': pd.date_range('2023-01-01', periods=n, freq='min', tz='UTC'),
+})
+df.loc[::9, 'Date'] = None
+df.loc[::11, 'Region'] = None
+df.loc[::13, 'Sales'] = np.nan
+df.loc[::500, 'Sales'] = 10_000.0
+df = pd.concat([df, df.iloc[:200]], ignore_index=True)
+
+# Spawned pool workers import the main script again; only the parent runs the tests
+if __name__ != '__mp_main__':
+    # Test 1: columns reach the workers through shared memory with their dtypes intact
+    print('=== TEST 1: Column groups round trip ===')
+    parts = column_workers.map_column_groups(df, pd.DataFrame.copy, workers=3)
+    print('GROUPS:', [list(p.columns) for p in parts])
+    assert len(parts) == 4 and list(parts[-1].columns) == ['Mixed']
+    assert sorted(c for p in parts for c in p.columns) == sorted(df.columns)
+    pd.testing.assert_frame_equal(pd.concat(parts, axis=1)[df.columns], df)
+
+    # Test 2: parallel cleaning matches the in-process run exactly
+    print('\n=== TEST 2: Parallel cleaning parity ===')
+    column_workers.PARALLEL_MIN_CELLS = 0
+    for options in ({}, {'auto_clean': False}, {'outlier_detection': False}):
+        column_workers.CLEAN_WORKERS = 1
+        serial, serial_summary = clean_csv_and_summary(df.copy(), **options)
+        column_workers.CLEAN_WORKERS = 3
+        parallel, parallel_summary = clean_csv_and_summary(df.copy(), **options)
+        pd.testing.assert_frame_equal(parallel, serial)
+        assert parallel_summary == serial_summary, options
+        assert list(parallel_summary['recipe']['fill']) == list(serial_summary['recipe']['fill'])
+    print('SUMMARY:', parallel_summary['summary_text'])
+
+    # Test 3: small frames and a single worker stay in-process
+    print('\n=== TEST 3: Threshold ===')
+    column_workers.PARALLEL_MIN_CELLS = 2_000_000
+    assert not column_workers.parallel_enabled(df)
+    assert not column_workers.parallel_enabled(df.head(10), workers=1)
+    column_workers.CLEAN_WORKERS = 1
+    column_workers.shutdown()
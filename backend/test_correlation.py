@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import column_profile
+import correlation
+from correlation import correlation_matrix, get_correlations, matrix_payload, top_pairs
+
+rng = np.random.default_rng(17)
+n = 5_000
+base = rng.normal(0, 1, n)
+df = pd.DataFrame({
+    'a': base,
+    'b': base * 2 + rng.normal(0, 0.5, n),
+    'c': rng.integers(0, 100, n),
+    'd': -base + rng.normal(0, 2, n),
+    'flat': np.ones(n),
+    'label': rng.choice(['x', 'y'], n),
+})
+
+# Test 1: Pearson and Spearman match DataFrame.corr on a frame without gaps
+print('=== TEST 1: Parity with DataFrame.corr ===')
+numeric = df.select_dtypes(include=['number'])
+for method in ('pearson', 'spearman'):
+    cols, corr = correlation_matrix(df, method)
+    assert cols == list(numeric.columns)
+    expected = numeric.corr(method=method).to_numpy()
+    assert np.allclose(corr, expected, atol=1e-9, equal_nan=True), method
+print('PEARSON a~b:', round(correlation_matrix(df)[1][0, 1], 4))
+
+# Test 2: pairwise-complete Pearson with gaps, and blocks of any width agree
+print('\n=== TEST 2: Missing values and blocking ===')
+gappy = df.copy()
+gappy.loc[::3, 'a'] = np.nan
+gappy.loc[::5, 'c'] = np.nan
+_, whole = correlation_matrix(gappy)
+assert np.allclose(whole, gappy.select_dtypes(include=['number']).corr().to_numpy(), atol=1e-9, equal_nan=True)
+saved = column_profile.PROFILE_BLOCK_CELLS
+correlation.PROFILE_BLOCK_CELLS = 2 * n
+try:
+    _, blocked = correlation_matrix(gappy)
+finally:
+    correlation.PROFILE_BLOCK_CELLS = saved
+assert np.allclose(blocked, whole, atol=1e-12, equal_nan=True)
+
+# Test 3: top pairs by strength, ties in column order, undefined pairs skipped
+print('\n=== TEST 3: Top pairs ===')
+cols, corr = get_correlations(df)
+pairs = top_pairs(cols, corr, 2)
+print('TOP:', [(p['x'], p['y'], round(p['corr'], 3)) for p in pairs])
+strengths = np.abs(corr[np.triu_indices(len(cols), 1)])
+assert pairs[0]['abs_corr'] == np.nanmax(strengths) and (pairs[0]['x'], pairs[0]['y']) == ('a', 'b')
+assert all(p['x'] != 'flat' and p['y'] != 'flat' for p in top_pairs(cols, corr, 100))
+ties = np.array([[1, .5, .5, .5], [.5, 1, .5, .5], [.5, .5, 1, .5], [.5, .5, .5, 1]])
+assert [(p['x'], p['y']) for p in top_pairs(list('pqrs'), ties, 3)] == [('p', 'q'), ('p', 'r'), ('p', 's')]
+assert top_pairs(cols, corr, 0) == []
+
+# Test 4: cached per frame, JSON-ready with nulls
+print('\n=== TEST 4: Cache and payload ===')
+assert get_correlations(df)[1] is corr
+assert get_correlations(df, 'spearman')[1] is not corr
+payload = matrix_payload(corr)
+assert payload[4][4] is None and payload[0][0] == 1.0
+try:
+    correlation_matrix(df, 'kendall')
+    raise AssertionError('expected ValueError')
+except ValueError as e:
+    print('REJECTED:', e)
@@ -0,0 +1,84 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import dataset_append
+import db
+from dataset_store import columnar_path, columnar_parts, read_dataset_file
+from eda_engine import generate_stats, generate_correlations
+from upload_jobs import run_upload_pipeline
+
+tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = tmp_dir / 'no_code.db'
+rng = np.random.default_rng(3)
+n = 1500
+df = pd.DataFrame({
+    'Order Date': pd.date_range('2024-01-01', periods=n, freq='h').strftime('%Y-%m-%d'),
+    'Region': rng.choice(['North', 'South', 'East', None], n),
+    'Units': rng.integers(1, 50, n).astype(float),
+    'Revenue': rng.normal(100, 15, n).round(2),
+})
+df.loc[rng.choice(n, 40, replace=False), 'Units'] = np.nan
+df.loc[rng.choice(n, 5, replace=False), 'Revenue'] = 10_000.0
+base, delta = df.iloc[:1000], pd.concat([df.iloc[1000:], df.iloc[:10]])  # delta repeats 10 base rows
+src = tmp_dir / 'sales.csv'
+base.to_csv(src, index=False)
+res = run_upload_pipeline(src, 'sales.csv', 'csv', tmp_dir, {'autoClean': True, 'outlierDetection': True})
+cleaned = tmp_dir / res['cleaned_filename']
+sidecar = columnar_path(cleaned)
+
+# Test 1: appended rows are cleaned and deduplicated against earlier rows
+print('=== TEST 1: Append cleans and dedups the delta ===')
+out = dataset_append.append_rows(cleaned, sidecar, delta.reset_index(drop=True), bootstrap=None)
+stored = read_dataset_file(sidecar)
+print('APPENDED:', out['rows_appended'], 'ROWS:', out['row_count'], 'PARTS:', len(columnar_parts(sidecar)))
+assert out['rows_received'] == 510 and out['rows_appended'] == 500
+assert out['row_count'] == len(stored) == 1500
+assert stored['Units'].notna().all() and stored['Revenue'].max() < 10_000.0
+assert out['cleaning_summary']['duplicates_removed'] == 10
+
+# Test 2: merged aggregates equal a full recompute over the stored rows
+print('\n=== TEST 2: Stats and correlations match the stored data ===')
+expected = generate_stats(stored)
+for col, values in expected['numeric'].items():
+    for key, value in values.items():
+        assert np.isclose(value, out['stats']['numeric'][col][key], rtol=1e-9), (col, key)
+assert list(out['stats']) == list(expected)
+assert out['stats']['categorical'] == expected['categorical'] and out['stats']['datetime'] == expected['datetime']
+assert expected['categorical'] and expected['datetime']
+got_pairs = [(p['x'], p['y'], round(p['corr'], 9)) for p in out['correlations']['top_pairs']]
+assert got_pairs == [(p['x'], p['y'], round(p['corr'], 9)) for p in generate_correlations(stored)['top_pairs']]
+print('TOP PAIR:', got_pairs[0])
+
+# Test 3: columns must match the dataset
+print('\n=== TEST 3: Schema mismatch is rejected ===')
+try:
+    dataset_append.append_rows(cleaned, sidecar, delta.drop(columns=['Units']), bootstrap=None)
+    assert False, 'expected AppendSchemaError'
+except dataset_append.AppendSchemaError as e:
+    print('ERROR:', e)
+
+# Test 4: CSV datasets are appended in place; a failed append leaves the file as it was
+print('\n=== TEST 4: In-place CSV append ===')
+from dataset_store import append_text
+csv_path = tmp_dir / 'plain.csv'
+base.to_csv(csv_path, index=False)
+before = csv_path.read_bytes()
+append_text(delta.head(3), csv_path)
+assert len(pd.read_csv(csv_path)) == len(base) + 3
+
+
+class Unprintable:
+    def __str__(self):
+        raise RuntimeError('cannot format')
+
+
+csv_path.write_bytes(before)
+bad = pd.DataFrame({'a': [1] * 200_000 + [Unprintable()]})
+try:
+    append_text(bad, csv_path)
+    assert False, 'expected the append to fail'
+except RuntimeError:
+    pass
+assert csv_path.read_bytes() == before
@@ -0,0 +1,68 @@
+import os
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from dataset_registry import DatasetRegistry
+
+tmp_dir = Path(tempfile.mkdtemp())
+
+# Test 1: repeated reads are served from memory
+print('=== TEST 1: Hit/miss counters ===')
+path = tmp_dir / 'sales.csv'
+pd.DataFrame({'Product': ['A', 'B', 'C'], 'Sales': [1, 2, 3]}).to_csv(path, index=False)
+reg = DatasetRegistry(max_bytes=10 * 1024 * 1024)
+first = reg.get(path)
+second = reg.get(path)
+assert first is second
+print('STATS:', reg.stats())
+assert reg.stats()['hits'] == 1 and reg.stats()['misses'] == 1
+
+# Test 2: rewriting the file changes the key and replaces the old entry
+print('\n=== TEST 2: Rewritten file is reloaded ===')
+pd.DataFrame({'Product': ['A'], 'Sales': [10]}).to_csv(path, index=False)
+st = path.stat()
+os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+reloaded = reg.get(path)
+assert len(reloaded) == 1
+assert reg.stats()['entries'] == 1
+print('ROWS AFTER REWRITE:', len(reloaded))
+
+# Test 3: explicit invalidation
+print('\n=== TEST 3: Invalidation ===')
+assert reg.invalidate(path)
+assert reg.stats()['entries'] == 0 and reg.stats()['total_bytes'] == 0
+
+# Test 4: eviction by total bytes keeps the most recently used frame
+print('\n=== TEST 4: Byte-bounded eviction ===')
+paths = []
+for i in range(3):
+    p = tmp_dir / f'part_{i}.csv'
+    pd.DataFrame({'v': range(1000)}).to_csv(p, index=False)
+    paths.append(p)
+one_frame = int(pd.read_csv(paths[0]).memory_usage(index=True, deep=True).sum())
+small = DatasetRegistry(max_bytes=one_frame * 2)
+for p in paths:
+    small.get(p)
+print('STATS:', small.stats())
+assert small.stats()['entries'] == 2
+assert small.stats()['evictions'] == 1
+assert small.stats()['total_bytes'] <= small.max_bytes
+
+# Test 5: columnar sidecar keeps cleaned dtypes through the registry
+print('\n=== TEST 5: Columnar sidecar round trip ===')
+from dataset_store import columnar_path, write_columnar, feather
+if feather is not None:
+    cleaned = pd.DataFrame({
+        'Order Date': pd.to_datetime(['2025-01-01', '2025-01-02']),
+        'Product': pd.Categorical(['A', 'B']),
+        'Sales': [1.5, 2.5],
+    })
+    sidecar = columnar_path(tmp_dir / 'cleaned_sales.csv')
+    assert sidecar.name == 'cleaned_sales.csv.arrow'
+    assert write_columnar(cleaned, sidecar)
+    loaded = DatasetRegistry().get(sidecar)
+    print('DTYPES:', dict(loaded.dtypes.astype(str)))
+    assert pd.api.types.is_datetime64_any_dtype(loaded['Order Date'])
+    assert isinstance(loaded['Product'].dtype, pd.CategoricalDtype)
+    assert loaded['Sales'].tolist() == [1.5, 2.5]
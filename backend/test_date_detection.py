@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+from date_detection import column_to_datetime, datetime_profile, parse_datetime, sniff_datetime
+from data_cleaner import clean_csv_and_summary
+
+n = 5000
+dates = pd.date_range('2023-01-01', periods=n, freq='h')
+df = pd.DataFrame({
+    'Order Date': dates.strftime('%d %b %Y %H:%M'),
+    'Ship Date': pd.Categorical(dates.strftime('%Y-%m-%d')),
+    'Customer': np.random.default_rng(1).choice(['Ann', 'Bob', 'Cy'], n),
+    'Units': np.arange(n),
+})
+df.loc[::10, 'Order Date'] = None
+
+# Test 1: sampled detection picks an explicit format and estimates the parseable share
+print('=== TEST 1: Sampled detection ===')
+info = sniff_datetime(df['Order Date'])
+print('ORDER DATE:', info)
+assert info['format'] == '%d %b %Y %H:%M'
+assert abs(info['ratio'] - 0.9) < 0.05 and info['unique'] >= 10
+assert sniff_datetime(df['Customer'])['format'] is None
+
+# Test 2: conversion with the format matches a full pandas parse, categoricals included
+print('\n=== TEST 2: Vectorised conversion ===')
+assert parse_datetime(df['Order Date'], info['format']).equals(pd.to_datetime(df['Order Date'], format='%d %b %Y %H:%M'))
+ship = parse_datetime(df['Ship Date'])
+assert ship.dtype == 'datetime64[ns]' and ship.equals(pd.to_datetime(df['Ship Date'].astype(str)))
+
+# Test 3: results are cached on the frame and reused
+print('\n=== TEST 3: Per-column cache ===')
+first = datetime_profile(df, 'Order Date')
+assert datetime_profile(df, 'Order Date') is first
+# A derived frame (pandas copies attrs onto it) gets its own entry, not the parent's
+other = df.assign(**{'Order Date': df['Customer'].where(df['Order Date'].notna())})
+assert other['Order Date'].isna().sum() == df['Order Date'].isna().sum()
+assert datetime_profile(other, 'Order Date')['format'] is None
+assert column_to_datetime(df, 'Order Date').notna().sum() == n - len(df.loc[::10])
+
+# Test 4: the cleaner converts with the detected formats and records them
+print('\n=== TEST 4: Cleaner integration ===')
+cleaned, summary = clean_csv_and_summary(df.copy())
+print('CONVERTED:', summary['date_columns_converted'], cleaned.attrs['date_formats'])
+assert summary['date_columns_converted'] == ['Order Date', 'Ship Date']
+assert cleaned.attrs['date_formats'] == {'Order Date': '%d %b %Y %H:%M', 'Ship Date': '%Y-%m-%d'}
+assert pd.api.types.is_datetime64_any_dtype(cleaned['Ship Date'])
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import downsample
+from downsample import lttb, point_budget, sample_rows
+from figure_json import decode_array
+from viz_engine import build_figure
+
+rng = np.random.default_rng(23)
+n = 50_000
+df = pd.DataFrame({
+    'when': pd.date_range('2020-01-01', periods=n, freq='h'),
+    'x': rng.normal(0, 1, n),
+    'y': rng.normal(0, 1, n),
+    'group': rng.choice(['big', 'mid', 'rare'], n, p=[0.9, 0.0999, 0.0001]),
+})
+df['signal'] = np.sin(np.arange(n) / 500) + rng.normal(0, 0.05, n)
+df.loc[1234, 'signal'] = 25.0
+
+
+def points(fig):
+    return fig['layout']['meta']['points']
+
+
+# Test 1: LTTB keeps the ends and the spikes
+print('=== TEST 1: LTTB ===')
+keep = lttb(np.arange(n, dtype='float64'), df['signal'].to_numpy(), 500)
+assert len(keep) == 500 and keep[0] == 0 and keep[-1] == n - 1
+assert (np.diff(keep) > 0).all() and 1234 in keep
+assert (lttb(np.arange(10.0), np.arange(10.0), 50) == np.arange(10)).all()
+
+# Test 2: time series figures are reduced to the request's budget
+print('\n=== TEST 2: Line budget ===')
+fig = build_figure(df, {'preset': 'time_series', 'x': 'when', 'y': 'signal', 'time_grain': 'H', 'max_points': 800})
+print('POINTS:', points(fig))
+assert points(fig) == {'original': n, 'rendered': 800, 'method': 'lttb'}
+assert len(decode_array(fig['data'][0]['y'])) == 800
+small = build_figure(df, {'preset': 'time_series', 'x': 'when', 'y': 'signal', 'time_grain': 'M'})
+assert points(small)['method'] is None and not small['layout'].get('annotations')
+
+# Test 3: coloured scatter is sampled per colour, rare colours kept
+print('\n=== TEST 3: Stratified scatter ===')
+fig = build_figure(df, {'preset': 'scatter', 'x': 'x', 'y': 'y', 'color': 'group', 'max_points': 1_000})
+counts = {trace['name']: len(decode_array(trace['x'])) for trace in fig['data']}
+print('PER GROUP:', counts)
+assert points(fig)['rendered'] == sum(counts.values()) <= 1_001
+assert counts['rare'] >= 1 and abs(counts['big'] - 900) <= 2
+positions = sample_rows(n, 1_000, df['group'])
+assert (positions == sample_rows(n, 1_000, df['group'])).all()
+
+# Test 4: very large uncoloured scatters become a 2D histogram
+print('\n=== TEST 4: Density fallback ===')
+downsample.PLOT_DENSITY_ROWS = 10_000
+try:
+    fig = build_figure(df, {'preset': 'scatter', 'x': 'x', 'y': 'y'})
+finally:
+    downsample.PLOT_DENSITY_ROWS = 200_000
+print('POINTS:', points(fig))
+assert fig['data'][0]['type'] == 'heatmap' and points(fig)['method'] == 'histogram2d'
+z = np.array([[v or 0 for v in row] for row in fig['data'][0]['z']])
+assert z.sum() == n
+
+# Test 5: invalid budgets are rejected
+print('\n=== TEST 5: Budget validation ===')
+assert point_budget({}) == downsample.PLOT_MAX_POINTS and point_budget({'max_points': '250'}) == 250
+for bad in (0, 'many'):
+    try:
+        point_budget({'max_points': bad})
+        raise AssertionError('expected ValueError')
+    except ValueError as e:
+        print('REJECTED:', e)
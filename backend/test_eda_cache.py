@@ -0,0 +1,62 @@
+import os
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import db
+import eda_cache
+
+tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = tmp_dir / 'eda.db'
+db.init_db()
+
+rng = np.random.default_rng(31)
+df = pd.DataFrame({
+    'Sales': rng.normal(100, 10, 500),
+    'Units': rng.integers(1, 20, 500),
+    'Region': rng.choice(['N', 'S', 'E'], 500),
+})
+path = tmp_dir / 'cleaned_sales.csv'
+df.to_csv(path, index=False)
+options = eda_cache.recipe_options({'options': {'autoClean': True, 'outlierDetection': True}, 'dedup': None})
+
+# Test 1: a stored report is served back for the same dataset version
+print('=== TEST 1: Store and lookup ===')
+key = eda_cache.report_key('sales.csv', path, options)
+assert eda_cache.lookup(key) is None
+report = eda_cache.store(key, 'sales.csv', eda_cache.build_report(df))
+print('FIELDS:', sorted(report))
+assert sorted(report) == sorted(eda_cache.REPORT_FIELDS)
+assert eda_cache.lookup(key) == report
+assert report['row_count'] == 500 and report['charts']
+
+# Test 2: the key changes with the file, the cleaning options and the code version
+print('\n=== TEST 2: Invalidation ===')
+assert eda_cache.report_key('sales.csv', path, {}) != key
+st = path.stat()
+os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+assert eda_cache.report_key('sales.csv', path, options) != key
+saved = eda_cache.EDA_VERSION
+eda_cache.EDA_VERSION = 'older'
+try:
+    old_key = eda_cache.report_key('sales.csv', path, options)
+finally:
+    eda_cache.EDA_VERSION = saved
+assert old_key != eda_cache.report_key('sales.csv', path, options)
+
+# Test 3: only the newest report of a dataset is kept
+print('\n=== TEST 3: One row per dataset ===')
+new_key = eda_cache.report_key('sales.csv', path, options)
+eda_cache.store(new_key, 'sales.csv', report)
+assert eda_cache.lookup(key) is None and eda_cache.lookup(new_key) == report
+conn = db.get_conn()
+assert conn.execute("SELECT COUNT(*) FROM eda_reports").fetchone()[0] == 1
+conn.close()
+
+# Test 4: rebuilt reports carry the stored insights over instead of generating new ones
+print('\n=== TEST 4: Insights ===')
+assert report['insights'] is None and eda_cache.latest_insights('sales.csv') is None
+eda_cache.store(new_key, 'sales.csv', {**report, 'insights': ['Sales are steady.']})
+assert eda_cache.latest_insights('sales.csv') == ['Sales are steady.']
+assert eda_cache.latest_insights('other.csv') is None
@@ -0,0 +1,89 @@
+import time
+
+import numpy as np
+import pandas as pd
+import eda_engine
+from eda_engine import generate_charts
+
+rng = np.random.default_rng(29)
+n = 5_000
+base = rng.normal(100, 10, n)
+df = pd.DataFrame({
+    'Date': pd.date_range('2023-01-01', periods=n, freq='h'),
+    'Sales': base,
+    'Profit': base * 0.3 + rng.normal(0, 2, n),
+    'Region': rng.choice(['N', 'S', 'E', 'W'], n),
+})
+
+# Test 1: the three overview charts come back in their usual order
+print('=== TEST 1: Overview charts ===')
+charts = generate_charts(df)
+print('CHARTS:', [c['id'] for c in charts])
+assert [c['id'] for c in charts] == ['timeseries', 'top_categories', 'scatter_top_corr']
+
+# Test 2: the histogram fills in when fewer charts apply
+print('\n=== TEST 2: Histogram fallback ===')
+assert [c['id'] for c in generate_charts(df[['Sales', 'Region']])] == ['top_categories', 'histogram']
+
+# Test 3: a chart over its budget is left out without holding up the others
+print('\n=== TEST 3: Chart timeout ===')
+original = eda_engine._top_categories_chart
+
+
+def slow_chart(*args):
+    time.sleep(2)
+    return original(*args)
+
+
+eda_engine._top_categories_chart = slow_chart
+try:
+    start = time.monotonic()
+    charts = generate_charts(df, timeout=0.5)
+    elapsed = time.monotonic() - start
+finally:
+    eda_engine._top_categories_chart = original
+print('CHARTS:', [c['id'] for c in charts], f"in {elapsed:.2f}s")
+assert [c['id'] for c in charts] == ['timeseries', 'histogram', 'scatter_top_corr']
+assert elapsed < 1.5
+
+# Test 4: a chart that raises is replaced, not propagated
+print('\n=== TEST 4: Failing chart ===')
+
+
+def broken_chart(*args):
+    raise ValueError('bad figure')
+
+
+original_scatter = eda_engine._scatter_chart
+eda_engine._scatter_chart = broken_chart
+try:
+    charts = generate_charts(df)
+finally:
+    eda_engine._scatter_chart = original_scatter
+print('CHARTS:', [c['id'] for c in charts])
+assert [c['id'] for c in charts] == ['timeseries', 'top_categories', 'histogram']
+
+# Test 5: a queued chart's budget starts when a thread picks it up
+print('\n=== TEST 5: Budget per chart ===')
+eda_engine.shutdown_charts()
+workers, eda_engine.CHART_WORKERS = eda_engine.CHART_WORKERS, 1
+original_series = eda_engine._timeseries_chart
+
+
+def steady_chart(build):
+    def run(*args):
+        time.sleep(0.3)
+        return build(*args)
+    return run
+
+
+eda_engine._timeseries_chart = steady_chart(original_series)
+eda_engine._top_categories_chart = steady_chart(original)
+try:
+    charts = generate_charts(df, timeout=0.5)
+finally:
+    eda_engine._timeseries_chart, eda_engine._top_categories_chart = original_series, original
+    eda_engine.CHART_WORKERS = workers
+print('CHARTS:', [c['id'] for c in charts])
+assert [c['id'] for c in charts] == ['timeseries', 'top_categories', 'scatter_top_corr']
+eda_engine.shutdown_charts()
@@ -0,0 +1,111 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import db
+import eda_cache
+import openai_summary
+import upload_cache
+from dataset_store import rollup_path
+from eda_engine import generate_correlations, generate_stats
+from eda_sampling import draw_sample, sampled_charts, sampled_correlations, sampled_stats
+from upload_jobs import run_upload_pipeline
+
+tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = tmp_dir / 'no_code.db'
+
+rng = np.random.default_rng(37)
+n = 300_000
+base = rng.gamma(2.0, 50.0, n)
+df = pd.DataFrame({
+    'Date': pd.date_range('2022-01-01', periods=n, freq='min'),
+    'Revenue': base,
+    'Cost': base * 0.6 + rng.normal(0, 20, n),
+    'Units': rng.integers(1, 40, n).astype(float),
+    'Region': rng.choice(['North', 'South', 'East', 'Islands'], n, p=[0.5, 0.3, 0.1995, 0.0005]),
+})
+df.loc[rng.choice(n, 6_000, replace=False), 'Units'] = np.nan
+
+# Test 1: a uniform sample, so every row stands for population/rows rows
+print('=== TEST 1: Uniform sample ===')
+sample, info = draw_sample(df, 20_000)
+print('SAMPLE:', info)
+assert info['rows'] == 20_000 and info['method'] == 'uniform'
+assert abs((sample['Region'] == 'South').mean() - (df['Region'] == 'South').mean()) < 0.01
+# A category too rare to expect one sampled row is not forced in (and inflated to population/rows)
+rare = df.copy()
+rare.loc[rare.index[:3], 'Region'] = 'Atoll'
+rare_sample, rare_info = draw_sample(rare, 20_000)
+atoll = sampled_stats(rare_sample, rare_info)['categorical']['Region']['top_values']
+assert (rare_sample['Region'] == 'Atoll').sum() == 0 and 'Atoll' not in [v for v, _ in atoll]
+
+# Test 2: the exact values fall inside the sampled intervals; counts are full-frame estimates
+print('\n=== TEST 2: Confidence intervals ===')
+exact = generate_stats(df)['numeric']
+approx = sampled_stats(sample, info)['numeric']
+for col in ('Revenue', 'Cost', 'Units'):
+    for stat in ('mean', 'median', 'p25', 'p75', 'std', 'nulls'):
+        lo, hi = approx[col]['ci'][stat]
+        assert lo <= exact[col][stat] <= hi, (col, stat, lo, exact[col][stat], hi)
+    assert approx[col]['count'] + approx[col]['nulls'] == n
+print('UNITS MEAN:', round(exact['Units']['mean'], 3), [round(v, 3) for v in approx['Units']['ci']['mean']])
+region = sampled_stats(sample, info)['categorical']['Region']
+assert region['top'] == 'North'
+assert region['ci']['freq'][0] <= (df['Region'] == 'North').sum() <= region['ci']['freq'][1]
+pair = sampled_correlations(sample, info)['top_pairs'][0]
+exact_pair = generate_correlations(df)['top_pairs'][0]
+assert (pair['x'], pair['y']) == (exact_pair['x'], exact_pair['y'])
+assert pair['ci'][0] <= exact_pair['corr'] <= pair['ci'][1] and pair['sample_size'] == 20_000
+
+# Test 3: summed charts are scaled back to full-frame totals
+print('\n=== TEST 3: Sampled charts ===')
+charts = {c['id']: c for c in sampled_charts(sample, info)}
+assert all(c['approximate'] for c in charts.values())
+from figure_json import decode_array
+bars = charts['top_categories']['figure']['data'][0]
+got = dict(zip(bars['x'], decode_array(bars['y'])))
+want = df.groupby('Region')['Revenue'].sum()
+assert abs(got['North'] / want['North'] - 1) < 0.03
+
+# Test 4: a sampled upload is approximate; the exact report replaces it in the background
+print('\n=== TEST 4: Upload sample mode ===')
+src = tmp_dir / 'big.csv'
+df.head(50_000).to_csv(src, index=False)
+upload_cache.UPLOAD_CACHE_DIR = tmp_dir / 'cache'
+upload_cache.UPLOAD_CACHE_DIR.mkdir()
+options = {'edaSample': 5_000, 'content_sha256': 'big'}
+fingerprint = upload_cache.upload_fingerprint('big', 'csv', options)
+result = run_upload_pipeline(src, 'big.csv', 'csv', tmp_dir, options)
+print('APPROXIMATE:', result['approximate'], result['eda_sample']['rows'])
+assert result['approximate'] and result['stats']['sample']['population_rows'] == result['row_count']
+# Sampled charts do not read the rollup, so none is built; nor is the approximate response cached
+assert not rollup_path(tmp_dir / 'cleaned_big.csv').exists()
+assert upload_cache.lookup(fingerprint) is None
+
+
+def no_second_call(*args):
+    raise AssertionError('the exact pass must reuse the upload insights')
+
+
+generate_insights, openai_summary.generate_insights = openai_summary.generate_insights, no_second_call
+dataset_path = tmp_dir / 'cleaned_big.csv.arrow'
+dataset_path = dataset_path if dataset_path.exists() else tmp_dir / 'cleaned_big.csv'
+key = eda_cache.report_key('big.csv', dataset_path, eda_cache.recipe_options(result['cleaning_summary']['recipe']))
+deadline = time.monotonic() + 60
+while eda_cache.lookup(key)['approximate'] and time.monotonic() < deadline:
+    time.sleep(0.2)
+openai_summary.generate_insights = generate_insights
+report = eda_cache.lookup(key)
+assert report['approximate'] is False and report['eda_sample'] is None
+assert 'ci' not in report['stats']['numeric']['Revenue']
+# The exact pass keeps the upload's insights; the upload cache gets the exact response
+assert report['insights'] == result['insights']
+while upload_cache.lookup(fingerprint) is None and time.monotonic() < deadline:
+    time.sleep(0.2)
+again = run_upload_pipeline(src, 'big.csv', 'csv', tmp_dir, options)
+assert again['cache_hit'] and again['approximate'] is False and again['stats'] == report['stats']
+eda_cache.shutdown()
+shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,57 @@
+import json
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.io as pio
+from figure_json import FastJSONResponse, decode_array, figure_payload
+
+df = pd.DataFrame({
+    'when': pd.date_range('2023-03-25', periods=6, freq='12h', tz='Europe/London'),
+    'value': [1.5, np.nan, 3.0, 4.25, 5.0, 6.0],
+    'units': [1, 2, 3, 4, 5, 2**40],
+    'small': [1, 2, 3, 4, 5, 6],
+    'group': pd.Categorical(['a', 'b', 'a', 'b', 'a', 'b']),
+})
+
+
+def decoded(obj):
+    """Figure JSON with typed arrays read back and NaN as None, for comparing with plotly's own output."""
+    if isinstance(obj, dict):
+        if 'bdata' in obj:
+            return decoded(decode_array(obj).tolist())
+        return {k: decoded(v) for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [decoded(v) for v in obj]
+    return None if isinstance(obj, float) and np.isnan(obj) else obj
+
+
+# Test 1: payloads carry the same figure as pio.to_json, for every kind of trace array
+print('=== TEST 1: Parity with pio.to_json ===')
+figures = [
+    px.line(df, x='when', y='value'),
+    px.scatter(df, x='small', y='value', color='group'),
+    px.bar(df, x='group', y='units'),
+    px.imshow(np.arange(6.0).reshape(2, 3)),
+    px.pie(df, names='group', values='small'),
+]
+for fig in figures:
+    payload = figure_payload(fig)
+    json.dumps(payload, allow_nan=False)
+    assert decoded(payload) == decoded(json.loads(pio.to_json(fig)))
+
+# Test 2: numeric arrays are typed, narrowed where int64 fits; dates stay ISO strings
+print('\n=== TEST 2: Typed arrays ===')
+trace = figure_payload(px.scatter(df, x='small', y='value'))['data'][0]
+print('X SPEC:', trace['x'])
+assert trace['x']['dtype'] == 'i1' and trace['y']['dtype'] == 'f8'
+assert isinstance(figure_payload(px.bar(df, x='group', y='units'))['data'][0]['y'], list)
+heat = figure_payload(px.imshow(np.arange(6.0).reshape(2, 3)))['data'][0]['z']
+assert heat['shape'] == '2, 3' and decode_array(heat).shape == (2, 3)
+line_x = figure_payload(px.line(df, x='when', y='value'))['data'][0]['x']
+assert line_x[0] == '2023-03-25T00:00:00+00:00' and line_x[-1] == '2023-03-27T13:00:00+01:00'
+
+# Test 3: the response encodes numpy leftovers and NaN safely
+print('\n=== TEST 3: FastJSONResponse ===')
+body = FastJSONResponse({'figure': figure_payload(figures[0]), 'n': np.int64(3)}).body
+assert json.loads(body)['n'] == 3
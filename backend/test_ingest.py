@@ -0,0 +1,108 @@
+import asyncio
+import hashlib
+import io
+import tempfile
+from pathlib import Path
+
+import pandas as pd
+from fastapi import UploadFile
+from ingest import save_upload_stream, read_upload, UploadTooLargeError
+
+tmp_dir = Path(tempfile.mkdtemp())
+payload = pd.DataFrame({'Product': ['A', 'B'] * 500, 'Sales': range(1000)}).to_csv(index=False).encode()
+
+# Test 1: chunked copy matches the payload and its hash
+print('=== TEST 1: Streamed upload ===')
+dest = tmp_dir / 'sales.csv'
+size, digest = asyncio.run(save_upload_stream(UploadFile(io.BytesIO(payload), filename='sales.csv'), dest, chunk_size=1024))
+print('SIZE:', size, 'SHA256:', digest[:12])
+assert size == len(payload)
+assert digest == hashlib.sha256(payload).hexdigest()
+assert dest.read_bytes() == payload
+assert len(read_upload(dest, 'csv')) == 1000
+
+# Test 2: oversized uploads are rejected without touching the destination
+print('\n=== TEST 2: Size limit ===')
+try:
+    asyncio.run(save_upload_stream(UploadFile(io.BytesIO(payload * 2), filename='sales.csv'), dest, chunk_size=1024, max_bytes=len(payload)))
+    raise AssertionError('expected UploadTooLargeError')
+except UploadTooLargeError as e:
+    print('REJECTED:', e)
+assert dest.read_bytes() == payload
+assert not (tmp_dir / 'sales.csv.part').exists()
+
+# Test 3: compact dtypes shrink memory without changing cleaner/EDA/viz results
+print('\n=== TEST 3: Dtype optimisation ===')
+import numpy as np
+from ingest import optimize_dtypes
+from data_cleaner import clean_csv_and_summary
+from eda_engine import generate_stats, generate_correlations
+from viz_engine import build_figure
+
+rng = np.random.default_rng(3)
+raw = pd.DataFrame({
+    'Region': rng.choice(['North', 'South', 'East', None], 5000),
+    'Units': rng.integers(0, 100, 5000),
+    'Revenue': rng.normal(50, 5, 5000),
+})
+compact, report = optimize_dtypes(raw)
+print('REPORT:', report)
+assert report['bytes_after'] < report['bytes_before']
+assert report['columns']['Region']['to'] == 'category'
+assert report['columns']['Units']['to'] == 'int8'
+assert compact['Revenue'].dtype == 'float64'
+
+expected_df, expected_summary = clean_csv_and_summary(raw.copy())
+got_df, got_summary = clean_csv_and_summary(compact.copy())
+assert got_summary == expected_summary
+assert generate_stats(got_df) == generate_stats(expected_df)
+assert generate_correlations(got_df) == generate_correlations(expected_df)
+cfg = {'preset': 'bar', 'x': 'Region', 'y': 'Revenue', 'agg': 'sum'}
+assert build_figure(got_df, cfg)['data'][0]['y'] == build_figure(expected_df, cfg)['data'][0]['y']
+
+# Test 4: sniffing and engine fallback
+print('\n=== TEST 4: CSV sniffing ===')
+from ingest import read_csv_fast
+semi = tmp_dir / 'semi.csv'
+semi.write_bytes('Name;Price\nCafé;1.5\nBär;2\n'.encode('latin-1'))
+df_semi, info = read_csv_fast(semi)
+print('INFO:', info)
+assert info['delimiter'] == ';' and info['encoding'] == 'latin-1'
+assert df_semi['Name'].tolist() == ['Café', 'Bär']
+
+mismatch = tmp_dir / 'mismatch.csv'
+mismatch.write_text('a,b\n' + '1,x\n' * 2000 + '1.5,y\n')
+df_mismatch, info = read_csv_fast(mismatch)
+print('INFO:', info)
+assert info['engine'] == 'c' and df_mismatch['a'].dtype == 'float64'
+
+df_dates, _ = read_csv_fast(Path(__file__).resolve().parent / 'test_sales.csv')
+assert df_dates.equals(pd.read_csv(Path(__file__).resolve().parent / 'test_sales.csv'))
+
+# Test 5: streamed XLSX matches pandas.read_excel, per sheet and across batches
+print('\n=== TEST 5: Streaming Excel ===')
+import numpy as np
+import ingest
+from ingest import read_excel_streaming, SheetNotFoundError
+book = tmp_dir / 'book.xlsx'
+n = 250
+sales = pd.DataFrame({
+    'Date': pd.date_range('2024-01-01', periods=n, freq='D'),
+    'Region': np.where(np.arange(n) % 7 == 0, None, 'North'),
+    'Units': np.arange(n),
+    'Price': np.where(np.arange(n) < 120, np.nan, 1.5),
+})
+with pd.ExcelWriter(book) as writer:
+    sales.to_excel(writer, sheet_name='Sales', index=False)
+    pd.DataFrame({'a': [1, 2], 'b': ['x', 'y']}).to_excel(writer, sheet_name='Lookup', index=False)
+ingest.EXCEL_BATCH_ROWS = 100
+for sheet in [None, 'Lookup', 1]:
+    got, info = read_excel_streaming(book, sheet)
+    print('SHEET:', sheet, info)
+    assert got.equals(pd.read_excel(book, sheet_name=sheet or 0))
+assert info == {'sheet': 'Lookup', 'sheets': ['Sales', 'Lookup']}
+try:
+    read_excel_streaming(book, 'Missing')
+    assert False, 'expected SheetNotFoundError'
+except SheetNotFoundError as e:
+    print('ERROR:', e)
@@ -0,0 +1,57 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from data_cleaner import clean_csv_chunked
+from quantile_sketch import QuantileSketch
+
+rng = np.random.default_rng(3)
+qs = [0.01, 0.25, 0.5, 0.75, 0.99]
+
+# Test 1: streamed quantiles stay within the reported rank error
+print('=== TEST 1: Streaming accuracy ===')
+x = rng.lognormal(0, 1, 1_000_000)
+sketch = QuantileSketch(error=0.01)
+for start in range(0, len(x), 50_000):
+    sketch.update(x[start:start + 50_000])
+ranks = np.searchsorted(np.sort(x), sketch.quantiles(qs)) / len(x)
+print('BOUND:', sketch.rank_error(), 'ACTUAL:', np.abs(ranks - qs).max(), 'ITEMS:', len(sketch.items()))
+assert 0 < sketch.rank_error() <= 0.01
+assert np.abs(ranks - qs).max() <= sketch.rank_error()
+assert len(sketch.items()) < 5000
+
+# Test 2: merging sketches of separate chunks; small inputs stay exact
+print('\n=== TEST 2: Merge and exact small inputs ===')
+left, right = QuantileSketch().update(x[:400_000]), QuantileSketch().update(x[400_000:])
+merged = left.merge(right)
+assert merged.n == len(x)
+ranks = np.searchsorted(np.sort(x), merged.quantiles(qs)) / len(x)
+assert np.abs(ranks - qs).max() <= merged.rank_error()
+small = QuantileSketch().update(np.array([3.0, np.nan, 1.0, 2.0, 10.0]))
+assert small.rank_error() == 0 and np.allclose(small.quantiles(qs), np.quantile([1.0, 2.0, 3.0, 10.0], qs))
+
+# Test 3: the sketch survives a save/load round trip
+print('\n=== TEST 3: State round trip ===')
+restored = QuantileSketch.from_state(sketch.to_state(), sketch.items().copy())
+assert np.array_equal(restored.quantiles(qs), sketch.quantiles(qs))
+assert restored.rank_error() == sketch.rank_error()
+
+# Test 4: chunked cleaning with approximate IQR bounds
+print('\n=== TEST 4: Approximate chunked cleaning ===')
+n = 60_000
+df = pd.DataFrame({'Sales': rng.normal(100, 15, n), 'Units': rng.integers(1, 50, n), 'Region': rng.choice(['N', 'S'], n)})
+df.loc[::500, 'Sales'] = 1000.0
+df.loc[::97, 'Sales'] = np.nan
+with tempfile.TemporaryDirectory() as tmp:
+    src = Path(tmp) / 'in.csv'
+    df.to_csv(src, index=False)
+    exact = clean_csv_chunked(src, Path(tmp) / 'exact.csv', chunksize=7_000, approx_quantiles=False)
+    approx = clean_csv_chunked(src, Path(tmp) / 'approx.csv', chunksize=7_000, approx_quantiles=True)
+    out = pd.read_csv(Path(tmp) / 'approx.csv')
+print('APPROXIMATE:', approx['approximate_quantiles'])
+assert 'approximate_quantiles' not in exact
+assert approx['approximate_quantiles']['rank_error'] <= 0.01
+e, a = exact['outliers_capped']['Sales'], approx['outliers_capped']['Sales']
+assert abs(a['upper_bound'] - e['upper_bound']) < 1.0 and a['count_above'] >= n // 500
+assert out['Sales'].max() == a['upper_bound'] and out['Sales'].notna().all()
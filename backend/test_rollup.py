@@ -0,0 +1,96 @@
+import os
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import dataset_append
+import db
+import rollup
+from dataset_store import columnar_path, read_dataset_file, rollup_path
+from upload_jobs import run_upload_pipeline
+from viz_engine import _aggregate, build_figure
+
+tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = tmp_dir / 'no_code.db'
+rng = np.random.default_rng(5)
+n = 30_000
+df = pd.DataFrame({
+    'When': pd.date_range('2022-01-01', periods=n, freq='37min'),
+    'Order Date': pd.date_range('2021-06-01', periods=n, freq='11min').strftime('%d/%m/%Y %H:%M'),
+    'Units': rng.integers(0, 40, n),
+    'Revenue': rng.gamma(2.0, 50.0, n) + 1e6,
+})
+df.loc[rng.choice(n, 800, replace=False), 'Revenue'] = np.nan
+
+# Test 1: every grain and aggregation matches grouping the rows
+print('=== TEST 1: Cube answers match the row groupby ===')
+cube = rollup.build_rollup(df)
+print('CUBE ROWS:', len(cube), cube.attrs['rollup']['formats'])
+assert set(cube.attrs['rollup']['formats']) == {'When', 'Order Date'}
+for x in ('When', 'Order Date'):
+    for y in ('Units', 'Revenue'):
+        for grain in rollup.GRAINS:
+            for agg in rollup.AGGS:
+                cfg = {'preset': 'time_series', 'x': x, 'y': y, 'time_grain': grain, 'agg': agg}
+                rows, fast = _aggregate(df, cfg), rollup.time_series(cube, x, y, grain, agg)
+                assert list(fast.columns) == [x, y] and (fast[x].to_numpy() == rows[x].to_numpy()).all(), cfg
+                assert np.allclose(fast[y].astype(float), rows[y].astype(float), rtol=1e-9, equal_nan=True), cfg
+assert rollup.time_series(cube, 'When', 'Units', 'M', 'sum')['Units'].dtype == 'int64'
+assert rollup.time_series(cube, 'When', 'Revenue', 'M', 'median') is None
+assert rollup.time_series(cube, 'When', 'Nope', 'M', 'sum') is None
+
+# Test 2: merging the cubes of two halves gives the cube of the whole
+print('\n=== TEST 2: Merge ===')
+meta = cube.attrs['rollup']
+halves = rollup.merge(rollup.build_rollup(df.iloc[:n // 2]), rollup.build_rollup(df.iloc[n // 2:], meta['formats'], meta['measures']))
+for agg in rollup.AGGS:
+    whole = rollup.time_series(cube, 'Order Date', 'Revenue', 'W', agg)
+    merged = rollup.time_series(halves, 'Order Date', 'Revenue', 'W', agg)
+    assert np.allclose(whole['Revenue'], merged['Revenue'], rtol=1e-9, equal_nan=True), agg
+
+# Test 3: whole-day windows, as /nlviz builds them
+print('\n=== TEST 3: Windows ===')
+start, end = pd.Timestamp('2022-03-01'), pd.Timestamp('2022-03-31 23:59:59')
+when = df['When']
+part = rollup.window(cube, 'When', start, end)
+rows = _aggregate(df[(when >= start) & (when <= end)], {'preset': 'time_series', 'x': 'When', 'y': 'Units', 'time_grain': 'D'})
+assert rollup.time_series(part, 'When', 'Units', 'D', 'sum').equals(rows)
+assert rollup.time_series(part, 'Order Date', 'Units', 'D', 'sum') is None
+assert rollup.window(cube, 'When', start, pd.Timestamp('2022-03-31 12:00')) is None
+assert rollup.window(cube, 'When', pd.Timestamp('2022-03-01 06:00'), end) is None
+
+# Test 4: the upload stores the cube; figures and appends use it
+print('\n=== TEST 4: Upload, figures and appends ===')
+src = tmp_dir / 'orders.csv'
+df.iloc[:20_000].to_csv(src, index=False)
+res = run_upload_pipeline(src, 'orders.csv', 'csv', tmp_dir, {'autoClean': False, 'outlierDetection': False})
+cleaned = tmp_dir / res['cleaned_filename']
+artifact = columnar_path(cleaned)
+stored = rollup.load_rollup(cleaned, artifact)
+assert rollup_path(cleaned).exists() and stored is not None
+assert [c['id'] for c in res['charts']][0] == 'timeseries'
+
+frame = read_dataset_file(artifact)
+cfg = {'preset': 'time_series', 'x': 'When', 'y': 'Revenue', 'time_grain': 'M', 'agg': 'mean'}
+fast, slow = build_figure(frame, cfg, rollup=stored), build_figure(frame, cfg)
+assert fast['layout'] == slow['layout'] and len(fast['data']) == len(slow['data'])
+
+out = dataset_append.append_rows(cleaned, artifact, df.iloc[20_000:].reset_index(drop=True), bootstrap=None)
+folded = rollup.load_rollup(cleaned, artifact)
+assert folded is not None, 'append should re-stamp the cube'
+full = read_dataset_file(artifact)
+assert len(full) == out['row_count'] == n
+for agg in ('sum', 'std'):
+    want = _aggregate(full, {**cfg, 'agg': agg})
+    assert np.allclose(rollup.time_series(folded, 'When', 'Revenue', 'M', agg)['Revenue'], want['Revenue'], rtol=1e-9)
+
+# A rewritten artifact leaves the cube stale
+st = artifact.stat()
+os.utime(artifact, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+assert rollup.load_rollup(cleaned, artifact) is None
+rebuilt = rollup.get_rollup(cleaned, artifact, full)
+assert rollup.load_rollup(cleaned, artifact) is not None and len(rebuilt) == len(folded)
+shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,63 @@
+import tempfile
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from anomaly_detector import AnomalyDetector
+from data_cleaner import DedupKeyError, clean_csv_and_summary, clean_csv_chunked
+from row_fingerprint import SeenHashes, first_occurrence, get_row_hashes, row_hashes
+
+rng = np.random.default_rng(11)
+n = 20_000
+df = pd.DataFrame({
+    'id': rng.integers(0, 5_000, n),
+    'region': rng.choice(['N', 'S', None], n),
+    'amount': rng.integers(0, 4, n) * 0.5,
+})
+df.loc[::7, 'amount'] = np.nan
+
+# Test 1: fingerprints find the same duplicates as pandas, across dtypes
+print('=== TEST 1: Fingerprints match DataFrame.duplicated ===')
+assert (first_occurrence(row_hashes(df)) == ~df.duplicated()).all()
+assert (first_occurrence(row_hashes(df, ['id'])) == ~df.duplicated(subset=['id'])).all()
+compact = df.astype({'region': 'category', 'id': 'int32'})
+assert (row_hashes(compact) == row_hashes(df)).all()
+big = pd.DataFrame({'id': [2**60, 2**60 + 1]})
+assert first_occurrence(row_hashes(big)).all()
+
+# Test 2: cleaner dedup on a key subset, recorded in the recipe
+print('\n=== TEST 2: Key-column dedup ===')
+cleaned, summary = clean_csv_and_summary(df.copy(), dedup_subset=['id'])
+print('DUPLICATES REMOVED:', summary['duplicates_removed'])
+assert summary['duplicates_removed'] == int(df.duplicated(subset=['id']).sum())
+assert summary['recipe']['dedup'] == {'subset': ['id']}
+try:
+    clean_csv_and_summary(df.copy(), dedup_subset=['nope'])
+    raise AssertionError('expected DedupKeyError')
+except DedupKeyError as e:
+    print('REJECTED:', e)
+
+# Test 3: the streaming filter spills to disk past its memory budget
+print('\n=== TEST 3: External-memory dedup ===')
+hashes = row_hashes(df)
+with tempfile.TemporaryDirectory() as tmp:
+    seen = SeenHashes(Path(tmp), memory_hashes=1_000)
+    keep = np.concatenate([seen.keep_unseen(hashes[i:i + 1_500]) for i in range(0, n, 1_500)])
+    assert len(list(Path(tmp).glob('hashes_*.npy'))) > 1
+assert (keep == first_occurrence(hashes)).all()
+
+# Test 4: chunked cleaning dedups on the key the same way
+print('\n=== TEST 4: Chunked key dedup ===')
+with tempfile.TemporaryDirectory() as tmp:
+    src = Path(tmp) / 'in.csv'
+    df.to_csv(src, index=False)
+    chunk_summary = clean_csv_chunked(src, Path(tmp) / 'out.csv', chunksize=3_000, dedup_subset=['id'])
+assert chunk_summary['duplicates_removed'] == summary['duplicates_removed']
+
+# Test 5: duplicate reporting reuses the frame's cached fingerprints
+print('\n=== TEST 5: Anomaly duplicate report ===')
+assert get_row_hashes(df) is get_row_hashes(df)
+report = AnomalyDetector(key_columns=['id']).detect_duplicate_anomalies(df)[0]
+print('REPORT:', {k: report[k] for k in ('duplicate_count', 'duplicate_groups')})
+assert report['duplicate_count'] == int(df.duplicated(subset=['id']).sum())
+assert report['duplicate_groups'] == int((df['id'].value_counts() > 1).sum())
@@ -0,0 +1,65 @@
+import shutil
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+
+import db
+import upload_cache
+from upload_jobs import run_upload_pipeline
+
+tmp_dir = Path(tempfile.mkdtemp())
+db.DB_PATH = tmp_dir / 'no_code.db'
+upload_cache.UPLOAD_CACHE_DIR = tmp_dir / 'cache'
+upload_cache.UPLOAD_CACHE_DIR.mkdir()
+src = tmp_dir / 'sales.csv'
+shutil.copy(Path(__file__).resolve().parent / 'test_sales.csv', src)
+options = {'autoClean': True, 'outlierDetection': True, 'content_sha256': 'abc123', 'file_size': src.stat().st_size}
+
+# Test 1: first upload runs the pipeline, second one is served from the cache
+print('=== TEST 1: Repeat upload is a cache hit ===')
+first = run_upload_pipeline(src, 'sales.csv', 'csv', tmp_dir, options)
+assert first['cache_hit'] is False
+start = time.perf_counter()
+second = run_upload_pipeline(src, 'renamed.csv', 'csv', tmp_dir, options)
+print(f'HIT IN {(time.perf_counter() - start) * 1000:.1f} ms')
+assert second['cache_hit'] is True
+assert second['cleaned_filename'] == 'cleaned_renamed.csv'
+assert second['stats'] == first['stats'] and second['charts'] == first['charts']
+assert any(p.name.startswith('cleaned_renamed.csv') for p in tmp_dir.iterdir())
+
+# Test 2: different cleaning flags are a different fingerprint
+print('\n=== TEST 2: Cleaning flags are part of the fingerprint ===')
+third = run_upload_pipeline(src, 'sales.csv', 'csv', tmp_dir, dict(options, outlierDetection=False))
+assert third['cache_hit'] is False
+assert third['settings_used']['outlierDetection'] is False
+
+# Test 3: appending to a dataset does not change the cached artifact
+print('\n=== TEST 3: Appends do not reach the cache ===')
+import dataset_append
+import dataset_store
+from dataset_store import read_dataset_file
+# Without pyarrow the artifact is the cleaned CSV, which appends extend in place
+feather, dataset_store.feather = dataset_store.feather, None
+text_options = dict(options, content_sha256='def456')
+plain = run_upload_pipeline(src, 'plain.csv', 'csv', tmp_dir, text_options)
+cleaned = tmp_dir / plain['cleaned_filename']
+new_row = pd.DataFrame({'Order Date': ['2025-10-01'], 'Product': ['Gamma'], 'Selling Price': [99], 'Discount': [3]})
+dataset_append.append_rows(cleaned, cleaned, new_row, bootstrap=None)
+assert len(read_dataset_file(cleaned)) == plain['row_count'] + 1
+again = run_upload_pipeline(src, 'plain.csv', 'csv', tmp_dir, text_options)
+dataset_store.feather = feather
+assert again['cache_hit'] is True
+assert len(read_dataset_file(cleaned)) == again['row_count'] == plain['row_count']
+
+# Test 4: the cache directory is bounded by size, least recently used first
+print('\n=== TEST 4: Byte-bounded eviction ===')
+upload_cache.lookup(upload_cache.upload_fingerprint('abc123', 'csv', options))
+sizes = {fp: nbytes for _, fp, nbytes, _ in upload_cache._entries()}
+assert len(sizes) == 3
+keep = upload_cache.upload_fingerprint('abc123', 'csv', options)
+assert upload_cache.evict(max_bytes=sizes[keep]) == 2
+assert upload_cache.lookup(keep) is not None
+assert [fp for _, fp, _, _ in upload_cache._entries()] == [keep]
+shutil.rmtree(tmp_dir, ignore_errors=True)
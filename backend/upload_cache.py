@@ -0,0 +1,138 @@
+"""Content-addressed cache of upload results.
+
+An upload is fingerprinted by the SHA-256 of its bytes plus the options
+that change the cleaned output (file type, autoClean, outlierDetection,
+Excel sheet, cleaning recipe, dedup key columns, EDA sample size).
+When the same fingerprint is uploaded again, the stored cleaned artifact
+is copied into place and the stored response (stats, correlations, charts,
+insights) is returned without re-running cleaning, EDA or the LLM call.
+
+Each entry is ``<fingerprint>.json`` (the response) plus
+``<fingerprint><suffix>`` (the cleaned artifact) in UPLOAD_CACHE_DIR.
+Artifacts are copied in and out rather than hardlinked: appends and
+exports write to the dataset's files, which must not reach the cache.
+The directory is an LRU bounded by its total size on disk; a hit touches
+the entry's JSON, and the least recently used entries are deleted after
+each store.
+
+Config (env):
+- UPLOAD_CACHE_MAX_BYTES: total size of cached artifacts and responses (default 2 GB, 0 = unbounded)
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+UPLOAD_CACHE_DIR = Path(__file__).resolve().parent / 'upload_cache'
+UPLOAD_CACHE_DIR.mkdir(exist_ok=True)
+UPLOAD_CACHE_MAX_BYTES = int(os.getenv('UPLOAD_CACHE_MAX_BYTES', str(2 * 1024 * 1024 * 1024)))
+
+
+def upload_fingerprint(content_sha256: str, file_ext: str, options: Dict[str, Any]) -> str:
+    key = json.dumps({
+        'sha256': content_sha256,
+        'file_ext': file_ext,
+        'autoClean': bool(options.get('autoClean', True)),
+        'outlierDetection': bool(options.get('outlierDetection', True)),
+        'sheet': options.get('sheet'),
+        'recipe': options.get('recipe'),
+        'dedupKeys': options.get('dedupKeys'),
+        'edaSample': options.get('edaSample'),
+    }, sort_keys=True)
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _copy(src: Path, dest: Path) -> None:
+    """Copy `src` to `dest` through a temporary file, so `dest` is never seen half-written."""
+    tmp_path = dest.with_name(dest.name + '.tmp')
+    try:
+        shutil.copyfile(src, tmp_path)
+        tmp_path.replace(dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def lookup(fingerprint: str) -> Dict[str, Any] | None:
+    """Return the cached entry ({'response', 'artifact'}) or None."""
+    meta_path = UPLOAD_CACHE_DIR / f"{fingerprint}.json"
+    if not meta_path.exists():
+        return None
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    artifact = UPLOAD_CACHE_DIR / f"{fingerprint}{entry.get('artifact_suffix', '')}"
+    if not artifact.exists():
+        return None
+    try:
+        # Recently used: the last to be evicted
+        os.utime(meta_path)
+    except OSError:
+        pass
+    return {'response': entry['response'], 'artifact': artifact, 'artifact_suffix': entry['artifact_suffix']}
+
+
+def store(fingerprint: str, response: Dict[str, Any], artifact_path: Path) -> None:
+    """Remember a finished upload; failures only cost a future cache miss."""
+    try:
+        suffix = '.arrow' if artifact_path.name.endswith('.arrow') else artifact_path.suffix
+        _copy(artifact_path, UPLOAD_CACHE_DIR / f"{fingerprint}{suffix}")
+        tmp_path = UPLOAD_CACHE_DIR / f"{fingerprint}.json.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({'artifact_suffix': suffix, 'response': response}, f)
+        tmp_path.replace(UPLOAD_CACHE_DIR / f"{fingerprint}.json")
+    except Exception as e:
+        print(f"[UPLOAD CACHE] Failed to store {fingerprint[:12]}: {type(e).__name__}: {e}")
+        return
+    evict(keep=fingerprint)
+
+
+def restore_artifact(entry: Dict[str, Any], dest: Path) -> None:
+    """Copy the cached cleaned artifact to `dest`."""
+    _copy(entry['artifact'], dest)
+
+
+def _entries() -> List[Tuple[float, str, int, List[Path]]]:
+    """(last used, fingerprint, total bytes, files) of every entry in the cache directory."""
+    files: Dict[str, List[Path]] = {}
+    for path in UPLOAD_CACHE_DIR.iterdir():
+        if not path.name.endswith('.tmp'):
+            files.setdefault(path.name.split('.', 1)[0], []).append(path)
+    entries = []
+    for fingerprint, paths in files.items():
+        try:
+            used = (UPLOAD_CACHE_DIR / f"{fingerprint}.json").stat().st_mtime
+        except OSError:
+            used = 0.0  # An artifact without its response is unusable: evict first
+        try:
+            nbytes = sum(p.stat().st_size for p in paths)
+        except OSError:
+            continue
+        entries.append((used, fingerprint, nbytes, paths))
+    return entries
+
+
+def evict(keep: str | None = None, max_bytes: int | None = None) -> int:
+    """Delete least recently used entries until the cache fits `max_bytes`. Returns how many were deleted."""
+    max_bytes = UPLOAD_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    if max_bytes <= 0:
+        return 0
+    entries = sorted(_entries())
+    total = sum(e[2] for e in entries)
+    evicted = 0
+    for _, fingerprint, nbytes, paths in entries:
+        if total <= max_bytes:
+            break
+        if fingerprint == keep:
+            continue
+        for path in paths:
+            path.unlink(missing_ok=True)
+        total -= nbytes
+        evicted += 1
+    if evicted:
+        print(f"[UPLOAD CACHE] Evicted {evicted} entries; {total} bytes kept")
+    return evicted
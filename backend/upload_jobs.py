@@ -0,0 +1,414 @@
+"""Upload pipeline and background job runner.
+
+`run_upload_pipeline` is the parse -> clean -> stats -> rollup -> charts ->
+insights pipeline behind /upload. /upload runs it in a worker thread; the job API
+(/upload/jobs) submits it to a process pool so large files never block the
+event loop, and reports per-stage progress that can be polled or streamed.
+
+Config (env):
+- UPLOAD_JOB_WORKERS: worker processes in the pool (default 2)
+- UPLOAD_JOB_MAX_PENDING: queued + running jobs accepted before rejecting (default 8)
+- UPLOAD_JOB_TTL_SECONDS: how long finished jobs stay queryable (default 3600)
+- CHUNKED_CLEAN_MIN_BYTES: CSV uploads at least this large use two-pass chunked
+  cleaning; 0 disables the automatic switch (default 512 MiB)
+"""
+from __future__ import annotations
+import functools
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+UPLOAD_JOB_WORKERS = int(os.getenv('UPLOAD_JOB_WORKERS', '2'))
+UPLOAD_JOB_MAX_PENDING = int(os.getenv('UPLOAD_JOB_MAX_PENDING', '8'))
+UPLOAD_JOB_TTL_SECONDS = int(os.getenv('UPLOAD_JOB_TTL_SECONDS', '3600'))
+CHUNKED_CLEAN_MIN_BYTES = int(os.getenv('CHUNKED_CLEAN_MIN_BYTES', str(512 * 1024 * 1024)))
+
+STAGES = ['parse', 'clean', 'stats', 'rollup', 'charts', 'insights', 'save']
+
+
+def run_upload_pipeline(
+    save_path: Path,
+    filename: str,
+    file_ext: str,
+    cleaned_dir: Path,
+    options: Dict[str, Any],
+    progress: Optional[Callable[[str], None]] = None,
+) -> Dict[str, Any]:
+    """Run the full upload pipeline on a file already saved to disk.
+
+    `progress` is called with each stage name as that stage starts.
+    Returns the /upload response body.
+
+    The new artifact is built under a staging name and only replaces the
+    dataset's files once the upload succeeded, so a rejected or failed
+    upload leaves the previous version in place (and servable meanwhile).
+    """
+    staged: List[Path] = []
+    try:
+        return _run_pipeline(save_path, filename, file_ext, cleaned_dir, options, progress, staged)
+    finally:
+        for path in staged:
+            path.unlink(missing_ok=True)
+
+
+def _staging_path(path: Path, staged: List[Path]) -> Path:
+    """A unique sibling of `path` with the same suffixes, recorded in `staged` for cleanup."""
+    staging = path.with_name(f".staging-{uuid.uuid4().hex[:12]}-{path.name}")
+    staged.append(staging)
+    return staging
+
+
+def _install_artifact(staging: Path, final: Path, cleaned_path: Path, sidecar_path: Path) -> None:
+    """Move the new artifact into place and drop the files of the previous upload."""
+    import dataset_append
+    from dataset_store import recipe_path, remove_columnar_parts, rollup_path
+
+    # Appended rows, append state, recipe and rollup describe the previous version
+    remove_columnar_parts(sidecar_path)
+    dataset_append.clear_state(cleaned_path)
+    recipe_path(cleaned_path).unlink(missing_ok=True)
+    rollup_path(cleaned_path).unlink(missing_ok=True)
+    # So does an artifact in the other format, or a /download export of the sidecar
+    (cleaned_path if final == sidecar_path else sidecar_path).unlink(missing_ok=True)
+    staging.replace(final)
+
+
+def _run_pipeline(
+    save_path: Path,
+    filename: str,
+    file_ext: str,
+    cleaned_dir: Path,
+    options: Dict[str, Any],
+    progress: Optional[Callable[[str], None]],
+    staged: List[Path],
+) -> Dict[str, Any]:
+    # Imported here so pool workers only pay for them when a job runs
+    from data_cleaner import apply_recipe, clean_csv_and_summary, clean_csv_chunked
+    from eda_engine import generate_stats, generate_correlations, generate_charts
+    from eda_sampling import draw_sample, sampled_charts, sampled_correlations, sampled_stats
+    from openai_summary import generate_insights
+    from rollup import build_rollup, save_rollup
+    from dataset_store import columnar_path, write_columnar, export_text, read_dataset_file, feather, save_recipe
+    from ingest import read_upload_with_info, optimize_dtypes, sniff_csv
+
+    import dataset_append
+    import upload_cache
+
+    report = progress or (lambda stage: None)
+    reader_info: Dict[str, Any] = {}
+    # A recipe from an earlier run replaces the cleaning decisions, flags included
+    recipe = options.get('recipe')
+    auto_clean_flag = recipe['options'].get('autoClean', True) if recipe else options.get('autoClean', True)
+    outlier_flag = recipe['options'].get('outlierDetection', True) if recipe else options.get('outlierDetection', True)
+    dedup_keys = dataset_append.dedup_key(options)
+
+    base_name = filename.rsplit('.', 1)[0]
+    if file_ext in ['xlsx', 'xls']:
+        cleaned_filename = f"cleaned_{base_name}.xlsx"
+    else:
+        cleaned_filename = f"cleaned_{filename}"
+    cleaned_path = Path(cleaned_dir) / cleaned_filename
+    sidecar_path = columnar_path(cleaned_path)
+
+    chunked_flag = file_ext == 'csv' and (
+        options.get('chunkedClean')
+        or bool(CHUNKED_CLEAN_MIN_BYTES and (options.get('file_size') or 0) >= CHUNKED_CLEAN_MIN_BYTES)
+    )
+    settings_used = {
+        'autoClean': auto_clean_flag,
+        'outlierDetection': outlier_flag,
+        'chunkedClean': chunked_flag,
+        'aiProvider': options.get('aiProvider'),
+        'chartHeight': options.get('chartHeight'),
+        'recipe': recipe is not None,
+        'dedupKeys': dedup_keys,
+        'edaSample': options.get('edaSample'),
+    }
+
+    # Same bytes + same cleaning options: reuse the stored artifact and response
+    fingerprint = None
+    if options.get('content_sha256'):
+        fingerprint = upload_cache.upload_fingerprint(options['content_sha256'], file_ext, options)
+        cached = upload_cache.lookup(fingerprint)
+        if cached is not None:
+            final = sidecar_path if cached['artifact_suffix'] == '.arrow' else cleaned_path
+            staging = _staging_path(final, staged)
+            upload_cache.restore_artifact(cached, staging)
+            _install_artifact(staging, final, cleaned_path, sidecar_path)
+            dataset_append.save_pending(cleaned_path, options)
+            if 'recipe' in cached['response']['cleaning_summary']:
+                save_recipe(cleaned_path, cached['response']['cleaning_summary']['recipe'])
+            response = dict(cached['response'])
+            response.update({
+                'filename': filename,
+                'cleaned_filename': cleaned_filename,
+                'file_size': options.get('file_size'),
+                'settings_used': settings_used,
+                'cache_hit': True,
+            })
+            _store_report(filename, final, response)
+            return response
+
+    if chunked_flag:
+        # Two-pass cleaning streams the raw file straight into the cleaned output
+        report('parse')
+        report('clean')
+        final = sidecar_path if feather is not None else cleaned_path
+        output_path = _staging_path(final, staged)
+        cleaning_summary = clean_csv_chunked(
+            Path(save_path), output_path, auto_clean=auto_clean_flag, outlier_detection=outlier_flag,
+            read_options=sniff_csv(Path(save_path))['read_options'], recipe=recipe, dedup_subset=dedup_keys,
+        )
+        cleaned_df, memory_report = optimize_dtypes(read_dataset_file(output_path))
+    else:
+        report('parse')
+        df, reader_info = read_upload_with_info(Path(save_path), file_ext, options.get('sheet'))
+        df, memory_report = optimize_dtypes(df)
+        raw_profile = dataset_append.profile_raw(df, auto_clean_flag, dedup_keys)
+
+        report('clean')
+        if recipe is not None:
+            cleaned_df, cleaning_summary = apply_recipe(df, recipe)
+        else:
+            cleaned_df, cleaning_summary = clean_csv_and_summary(
+                df, auto_clean=auto_clean_flag, outlier_detection=outlier_flag, dedup_subset=dedup_keys
+            )
+    cleaning_summary['memory_optimization'] = memory_report
+
+    report('stats')
+    # Sample mode: approximate EDA now, the exact report follows in the background
+    sample_info = None
+    if options.get('edaSample') and len(cleaned_df) > options['edaSample']:
+        eda_df, sample_info = draw_sample(cleaned_df, options['edaSample'])
+        stats = sampled_stats(eda_df, sample_info)
+        correlations = sampled_correlations(eda_df, sample_info)
+    else:
+        stats = generate_stats(cleaned_df)
+        correlations = generate_correlations(cleaned_df)
+
+    # Daily aggregates of every (date, numeric) pair, so time-series charts skip the rows.
+    # Sampled charts do not read it: in sample mode the first time-series request builds it
+    report('rollup')
+    cube = build_rollup(cleaned_df) if sample_info is None else None
+
+    report('charts')
+    charts = sampled_charts(eda_df, sample_info) if sample_info else generate_charts(cleaned_df, rollup=cube)
+
+    report('insights')
+    insights = generate_insights(cleaned_df, stats, cleaning_summary)
+
+    # Save cleaned file as a columnar sidecar; the CSV/XLSX export (original
+    # format or default to CSV) is only materialised on /download
+    report('save')
+    if not chunked_flag:
+        final, output_path = sidecar_path, _staging_path(sidecar_path, staged)
+        if not write_columnar(cleaned_df, output_path):
+            final, output_path = cleaned_path, _staging_path(cleaned_path, staged)
+            export_text(cleaned_df, output_path)
+    _install_artifact(output_path, final, cleaned_path, sidecar_path)
+    save_recipe(cleaned_path, cleaning_summary['recipe'])
+    if cube is not None:
+        save_rollup(cleaned_path, cube, final)
+    # Running aggregates for /datasets/{name}/append; chunked uploads build them on first append
+    if chunked_flag:
+        dataset_append.save_pending(cleaned_path, options)
+    else:
+        dataset_append.save_state(
+            cleaned_path, dataset_append.build_state(raw_profile, cleaned_df, cleaning_summary, options)
+        )
+
+    response = {
+        'filename': filename,
+        'cleaned_filename': cleaned_filename,
+        'file_type': file_ext,
+        'sheet': reader_info.get('sheet'),
+        'sheets': reader_info.get('sheets'),
+        'file_size': options.get('file_size'),
+        'content_sha256': options.get('content_sha256'),
+        'columns': cleaned_df.columns.tolist(),
+        'row_count': int(cleaned_df.shape[0]),
+        'cleaning_summary': cleaning_summary,
+        'stats': stats,
+        'correlations': correlations,
+        'charts': charts,
+        'insights': insights,
+        'approximate': sample_info is not None,
+        'eda_sample': sample_info,
+        'settings_used': settings_used,
+        'cache_hit': False,
+    }
+    # An approximate response is cached only once its exact report exists
+    on_exact = None
+    if fingerprint and sample_info is None:
+        upload_cache.store(fingerprint, response, final)
+    elif fingerprint:
+        on_exact = functools.partial(_cache_exact, fingerprint, response, final)
+    _store_report(filename, final, response, on_exact)
+    return response
+
+
+def _cache_exact(fingerprint: str, response: Dict[str, Any], artifact_path: Path, report: Dict[str, Any]) -> None:
+    """Cache a sampled upload's response with its exact report in place of the approximate results."""
+    import upload_cache
+
+    upload_cache.store(fingerprint, {**response, **report}, artifact_path)
+
+
+def _store_report(
+    filename: str, dataset_path: Path, response: Dict[str, Any],
+    on_exact: Callable[[Dict[str, Any]], None] | None = None,
+) -> None:
+    """Keep the response's EDA results for GET /datasets/{filename}/report.
+
+    A sampled (approximate) report is replaced by the exact one once the
+    background computation finishes; `on_exact(report)` is then called.
+    """
+    import eda_cache
+
+    options = eda_cache.recipe_options(response['cleaning_summary'].get('recipe'))
+    eda_cache.store(eda_cache.report_key(filename, dataset_path, options), filename, response)
+    if response.get('approximate'):
+        eda_cache.refresh_exact(filename, dataset_path, options, response['insights'], on_exact)
+
+
+def _run_job(job_id: str, progress_store, args: tuple) -> Dict[str, Any]:
+    """Pool entry point: run the pipeline, publishing stages to the shared store."""
+    completed: List[str] = []
+
+    def report(stage: str) -> None:
+        state = progress_store.get(job_id) or {}
+        if state.get('stage'):
+            completed.append(state['stage'])
+        progress_store[job_id] = {
+            'stage': stage,
+            'completed_stages': list(completed),
+            'progress': round(len(completed) / len(STAGES), 2),
+        }
+
+    return run_upload_pipeline(*args, progress=report)
+
+
+class UploadJobManager:
+    """Tracks upload jobs running in a lazily created process pool."""
+
+    def __init__(self, workers: int = UPLOAD_JOB_WORKERS, max_pending: int = UPLOAD_JOB_MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor: ProcessPoolExecutor | None = None
+        self._mp_manager = None
+        self._progress = None
+
+    def _ensure_pool(self) -> None:
+        if self._executor is None:
+            # spawn: the API process runs threads, which fork does not copy safely
+            ctx = multiprocessing.get_context('spawn')
+            self._mp_manager = ctx.Manager()
+            self._progress = self._mp_manager.dict()
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=ctx)
+
+    def pending_count(self) -> int:
+        return sum(1 for j in self.jobs.values() if j['status'] in ('queued', 'running'))
+
+    def submit(
+        self,
+        save_path: Path,
+        filename: str,
+        file_ext: str,
+        cleaned_dir: Path,
+        options: Dict[str, Any],
+        on_complete: Optional[Callable[[Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Any] | None:
+        """Queue a pipeline run. Returns None when the pending limit is reached."""
+        with self._lock:
+            self._prune_locked()
+            if self.pending_count() >= self.max_pending:
+                return None
+            self._ensure_pool()
+            job_id = uuid.uuid4().hex
+            job = {
+                'job_id': job_id,
+                'filename': filename,
+                'status': 'queued',
+                'created_at': time.time(),
+                'finished_at': None,
+                'result': None,
+                'error': None,
+            }
+            self.jobs[job_id] = job
+            args = (save_path, filename, file_ext, cleaned_dir, options)
+            future = self._executor.submit(_run_job, job_id, self._progress, args)
+
+        def _done(fut: Future) -> None:
+            with self._lock:
+                job['finished_at'] = time.time()
+                try:
+                    job['result'] = fut.result()
+                    job['status'] = 'completed'
+                except Exception as e:
+                    job['error'] = f"{type(e).__name__}: {e}"
+                    job['status'] = 'failed'
+            if job['status'] == 'completed' and on_complete:
+                try:
+                    on_complete(job['result'])
+                except Exception as e:
+                    print(f"[JOBS] on_complete failed for {job_id}: {e}")
+
+        future.add_done_callback(_done)
+        return self.snapshot(job_id)
+
+    def snapshot(self, job_id: str, include_result: bool = False) -> Dict[str, Any] | None:
+        """Public view of a job: status, current stage and progress."""
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        state = dict(self._progress.get(job_id) or {}) if self._progress is not None else {}
+        status = job['status']
+        if status == 'queued' and state:
+            status = 'running'
+        view = {
+            'job_id': job_id,
+            'filename': job['filename'],
+            'status': status,
+            'stage': state.get('stage'),
+            'completed_stages': state.get('completed_stages', []),
+            'progress': state.get('progress', 0.0),
+            'stages': STAGES,
+            'created_at': job['created_at'],
+            'finished_at': job['finished_at'],
+            'error': job['error'],
+        }
+        if status == 'completed':
+            view['stage'] = None
+            view['completed_stages'] = list(STAGES)
+            view['progress'] = 1.0
+            if include_result:
+                view['result'] = job['result']
+        return view
+
+    def _prune_locked(self) -> None:
+        cutoff = time.time() - UPLOAD_JOB_TTL_SECONDS
+        expired = [jid for jid, j in self.jobs.items() if j['finished_at'] and j['finished_at'] < cutoff]
+        for jid in expired:
+            self.jobs.pop(jid, None)
+            if self._progress is not None:
+                self._progress.pop(jid, None)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        if self._mp_manager is not None:
+            self._mp_manager.shutdown()
+            self._mp_manager = None
+            self._progress = None
+
+
+# Global job manager instance
+jobs = UploadJobManager()
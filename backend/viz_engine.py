@@ -6,14 +6,27 @@ Presets supported:
 - pie (category share of a numeric measure)
 - scatter (x: numeric, y: numeric, color optional)
 - heatmap (x: category, y: category, z: numeric agg)
+
+Scatter and time-series figures are reduced to a point budget (`max_points`
+in the config, else PLOT_MAX_POINTS) by the downsample module. Every other
+preset plots a grouped frame; callers that pass the dataset fingerprint get
+it from agg_cache. Time series are derived from the dataset's daily rollup
+cube when the caller passes one.
 """
 from __future__ import annotations
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Tuple
 import pandas as pd
 import numpy as np
 import plotly.express as px
-import plotly.io as pio
-import json
+
+from agg_cache import agg_cache
+from date_detection import datetime_profile, parse_datetime
+from downsample import line_figure, point_budget, px_lock, scatter_figure
+from rollup import time_series as rollup_series
+from figure_json import figure_payload
+
+# Presets whose figure plots a grouped frame (cached in agg_cache)
+AGG_PRESETS = ('time_series', 'bar', 'pie', 'heatmap', 'funnel')
 
 
 def infer_schema(df: pd.DataFrame) -> Dict[str, List[str]]:
@@ -24,9 +37,8 @@ def infer_schema(df: pd.DataFrame) -> Dict[str, List[str]]:
     if not datetime_cols:
         for c in df.columns:
             s = df[c]
-            if s.dtype == 'object':
-                parsed = pd.to_datetime(s, errors='coerce')
-                if parsed.notna().mean() > 0.7:
+            if s.dtype == 'object' or isinstance(s.dtype, pd.CategoricalDtype):
+                if datetime_profile(df, c)['ratio'] > 0.7:
                     datetime_cols.append(c)
     return {
         'numeric': numeric,
@@ -35,9 +47,9 @@ def infer_schema(df: pd.DataFrame) -> Dict[str, List[str]]:
     }
 
 
-def _apply_time_grain(s: pd.Series, grain: str) -> pd.Series:
+def _apply_time_grain(s: pd.Series, grain: str, fmt: str | None = None) -> pd.Series:
     if not pd.api.types.is_datetime64_any_dtype(s):
-        s = pd.to_datetime(s, errors='coerce')
+        s = parse_datetime(s, fmt)
     s = s.dropna()
     if grain == 'D':
         return s.dt.to_period('D').dt.to_timestamp()
@@ -52,64 +64,94 @@ def _apply_time_grain(s: pd.Series, grain: str) -> pd.Series:
     return s
 
 
-def build_figure(df: pd.DataFrame, cfg: Dict[str, Any]) -> Dict[str, Any]:
+def _aggregate(df: pd.DataFrame, cfg: Dict[str, Any], rollup: pd.DataFrame | None = None) -> pd.DataFrame:
+    """The grouped frame an aggregating preset plots."""
     preset = cfg.get('preset')
     agg = cfg.get('agg', 'sum')
     if preset == 'time_series':
         x = cfg['x']
         y = cfg['y']
         grain = cfg.get('time_grain', 'M')
+        grouped = rollup_series(rollup, x, y, grain, agg)
+        if grouped is not None:
+            return grouped
         dfx = df[[x, y]].dropna()
         dfx = dfx.copy()
-        dfx[x] = _apply_time_grain(dfx[x], grain)
-        grouped = getattr(dfx.groupby(x)[y], agg)().reset_index()
-        title = cfg.get('title', f"{y} over time")
-        fig = px.line(grouped, x=x, y=y, title=title)
-        return json.loads(pio.to_json(fig))
+        fmt = None if pd.api.types.is_datetime64_any_dtype(df[x]) else datetime_profile(df, x)['format']
+        dfx[x] = _apply_time_grain(dfx[x], grain, fmt)
+        return getattr(dfx.groupby(x, observed=True)[y], agg)().reset_index()
 
     if preset == 'bar':
         x = cfg['x']  # category
         y = cfg['y']  # numeric
         top_n = int(cfg.get('top_n', 10))
-        grouped = getattr(df.groupby(x)[y], agg)().sort_values(ascending=False).head(top_n).reset_index()
-        title = cfg.get('title', f"Top {top_n} {x} by {y}")
-        fig = px.bar(grouped, x=x, y=y, title=title)
-        return json.loads(pio.to_json(fig))
+        return getattr(df.groupby(x, observed=True)[y], agg)().sort_values(ascending=False).head(top_n).reset_index()
 
     if preset == 'pie':
         category = cfg['category']
         value = cfg['value']
-        grouped = getattr(df.groupby(category)[value], agg)().reset_index()
+        grouped = getattr(df.groupby(category, observed=True)[value], agg)().reset_index()
         # Apply top_n limit if specified
         top_n = cfg.get('top_n')
         if top_n and isinstance(top_n, int):
             grouped = grouped.sort_values(by=value, ascending=False).head(top_n)
-        fig = px.pie(grouped, names=category, values=value, title=cfg.get('title', f"{category} share of {value}"), hole=0.4)
-        return json.loads(pio.to_json(fig))
-
-    if preset == 'scatter':
-        x = cfg['x']
-        y = cfg['y']
-        color = cfg.get('color')
-        fig = px.scatter(df, x=x, y=y, color=color, title=cfg.get('title', f"{y} vs {x}"))
-        return json.loads(pio.to_json(fig))
+        return grouped
 
     if preset == 'heatmap':
         x = cfg['x']  # category
         y = cfg['y']  # category
         value = cfg['value']  # numeric
-        grouped = getattr(df.groupby([y, x])[value], agg)().reset_index()
-        pivot = grouped.pivot(index=y, columns=x, values=value).fillna(0)
-        fig = px.imshow(pivot, aspect='auto', title=cfg.get('title', f"Heatmap of {value} by {y} x {x}"))
-        return json.loads(pio.to_json(fig))
+        grouped = getattr(df.groupby([y, x], observed=True)[value], agg)().reset_index()
+        return grouped.pivot(index=y, columns=x, values=value).fillna(0)
 
     if preset == 'funnel':
         stage = cfg['stage']
         value = cfg['value']
-        grouped = getattr(df.groupby(stage)[value], agg)().reset_index()
+        grouped = getattr(df.groupby(stage, observed=True)[value], agg)().reset_index()
         # Ensure order resembles funnel by value desc
-        grouped = grouped.sort_values(by=value, ascending=False)
-        fig = px.funnel(grouped, x=value, y=stage, title=cfg.get('title', 'Funnel'))
-        return json.loads(pio.to_json(fig))
+        return grouped.sort_values(by=value, ascending=False)
 
     raise ValueError(f"Unsupported preset: {preset}")
+
+
+def build_figure(
+    df: pd.DataFrame, cfg: Dict[str, Any], fingerprint: Tuple[str, int, int] | None = None, filters: Any = None,
+    rollup: pd.DataFrame | None = None,
+) -> Dict[str, Any]:
+    """The figure payload for `cfg`.
+
+    With the dataset's `fingerprint` (and the row `filters` that produced
+    `df` from it), the aggregated frame is served from agg_cache. `rollup`
+    is the daily cube of `df` (see rollup.window for filtered frames).
+    """
+    preset = cfg.get('preset')
+    if preset == 'scatter':
+        x = cfg['x']
+        y = cfg['y']
+        color = cfg.get('color')
+        fig = scatter_figure(df, x, y, cfg.get('title', f"{y} vs {x}"), color=color, max_points=point_budget(cfg))
+        return figure_payload(fig)
+
+    if fingerprint is not None and preset in AGG_PRESETS:
+        grouped = agg_cache.get(fingerprint, cfg, lambda: _aggregate(df, cfg, rollup), filters)
+    else:
+        grouped = _aggregate(df, cfg, rollup)
+
+    if preset == 'time_series':
+        x, y = cfg['x'], cfg['y']
+        return figure_payload(line_figure(grouped, x, y, cfg.get('title', f"{y} over time"), point_budget(cfg)))
+
+    # Requests and the overview charts build figures on concurrent threads
+    with px_lock:
+        if preset == 'bar':
+            x, y = cfg['x'], cfg['y']
+            top_n = int(cfg.get('top_n', 10))
+            fig = px.bar(grouped, x=x, y=y, title=cfg.get('title', f"Top {top_n} {x} by {y}"))
+        elif preset == 'pie':
+            category, value = cfg['category'], cfg['value']
+            fig = px.pie(grouped, names=category, values=value, title=cfg.get('title', f"{category} share of {value}"), hole=0.4)
+        elif preset == 'heatmap':
+            fig = px.imshow(grouped, aspect='auto', title=cfg.get('title', f"Heatmap of {cfg['value']} by {cfg['y']} x {cfg['x']}"))
+        else:  # funnel
+            fig = px.funnel(grouped, x=cfg['value'], y=cfg['stage'], title=cfg.get('title', 'Funnel'))
+    return figure_payload(fig)